@@ -0,0 +1,68 @@
+"""Compare generator acceleration options against the float32 baseline on a CPU host."""
+
+from __future__ import annotations
+
+import json
+import tempfile
+from dataclasses import asdict
+from pathlib import Path
+
+import typer
+
+from caricature_generator.benchmarking import (
+    ACCELERATION_VARIANTS,
+    compare_generator_variants,
+    synthesize_corpus,
+)
+from caricature_generator.config import PipelineConfig
+from caricature_generator.logging_utils import configure_logging
+from caricature_generator.preprocessing import ImageLoader, PreprocessingPipeline
+
+
+def benchmark(
+    config: Path = typer.Option(Path("configs/default.yaml"), "--config", "-c"),
+    variants: str = typer.Option(
+        ",".join(ACCELERATION_VARIANTS),
+        help="Comma separated variants to run; the first one is the baseline.",
+    ),
+    images: int = typer.Option(4, help="Synthetic portraits per pass."),
+    repeats: int = typer.Option(2, help="Timed passes per variant after the first."),
+    save: Path | None = typer.Option(None, help="Write the results as JSON."),
+) -> None:
+    cfg = PipelineConfig.load(config)
+    cfg = cfg.model_copy(
+        update={
+            "device": "cpu",
+            "preprocessing": cfg.preprocessing.model_copy(update={"align_faces": False}),
+        }
+    )
+    configure_logging("WARNING", cfg.logging.log_dir)
+    selected = {}
+    for name in variants.split(","):
+        if name not in ACCELERATION_VARIANTS:
+            raise typer.BadParameter(
+                f"unknown variant {name!r}; expected {sorted(ACCELERATION_VARIANTS)}",
+                param_hint="--variants",
+            )
+        selected[name] = ACCELERATION_VARIANTS[name]
+
+    preprocess = PreprocessingPipeline(cfg.preprocessing)
+    with tempfile.TemporaryDirectory() as corpus_dir:
+        corpus = synthesize_corpus(Path(corpus_dir), [(640, 480)], per_resolution=images)
+        loader = ImageLoader(Path(corpus_dir))
+        crops = []
+        for path in corpus:
+            batch = loader.load_path(path)
+            if batch is not None:
+                crops.append(preprocess.process(batch).image)
+
+    results = compare_generator_variants(cfg, crops, selected, repeats=repeats)
+    payload = [asdict(result) for result in results]
+    typer.echo(json.dumps(payload, indent=2))
+    if save:
+        save.parent.mkdir(parents=True, exist_ok=True)
+        save.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    typer.run(benchmark)
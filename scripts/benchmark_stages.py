@@ -0,0 +1,67 @@
+"""Benchmark the pipeline stages around generation on a synthetic portrait corpus."""
+
+from __future__ import annotations
+
+import json
+import tempfile
+from pathlib import Path
+
+import typer
+
+from caricature_generator.benchmarking import (
+    DEFAULT_RESOLUTIONS,
+    run_benchmark,
+    synthesize_corpus,
+)
+from caricature_generator.config import PipelineConfig
+from caricature_generator.logging_utils import configure_logging
+
+
+def _parse_resolutions(value: str) -> list[tuple[int, int]]:
+    resolutions = []
+    for item in value.split(","):
+        width, height = item.lower().split("x")
+        resolutions.append((int(width), int(height)))
+    return resolutions
+
+
+def benchmark(
+    config: Path = typer.Option(Path("configs/default.yaml"), "--config", "-c"),
+    resolutions: str = typer.Option(
+        ",".join(f"{w}x{h}" for w, h in DEFAULT_RESOLUTIONS),
+        help="Comma separated WIDTHxHEIGHT list of synthetic input sizes.",
+    ),
+    per_resolution: int = typer.Option(4, help="Synthetic images per resolution."),
+    align_faces: bool = typer.Option(False, help="Run face detection (needs mediapipe)."),
+    save: Path | None = typer.Option(None, help="Write the report as JSON."),
+    baseline: Path | None = typer.Option(None, help="Compare against a saved JSON report."),
+    tolerance: float = typer.Option(0.15, help="Allowed relative regression vs the baseline."),
+) -> None:
+    cfg = PipelineConfig.load(config)
+    cfg = cfg.model_copy(
+        update={
+            "device": "cpu",
+            "preprocessing": cfg.preprocessing.model_copy(update={"align_faces": align_faces}),
+        }
+    )
+    configure_logging("WARNING", cfg.logging.log_dir)
+
+    with tempfile.TemporaryDirectory() as corpus_dir:
+        corpus = synthesize_corpus(
+            Path(corpus_dir), _parse_resolutions(resolutions), per_resolution=per_resolution
+        )
+        report = run_benchmark(cfg, corpus)
+
+    typer.echo(json.dumps(report.to_dict(), indent=2))
+    if save:
+        report.save(save)
+    if baseline:
+        regressions = report.compare(json.loads(baseline.read_text()), tolerance=tolerance)
+        for regression in regressions:
+            typer.echo(f"REGRESSION: {regression}", err=True)
+        if regressions:
+            raise typer.Exit(code=1)
+
+
+if __name__ == "__main__":
+    typer.run(benchmark)
@@ -1,6 +1,5 @@
 from caricature_generator.cli import main
 
-
 if __name__ == "__main__":
     main()
 
@@ -0,0 +1,212 @@
+"""Tar shard input and output for corpora too large for one file per image."""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import queue
+import re
+import tarfile
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from .logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+ARCHIVE_SUFFIX = ".tar"
+INDEX_SUFFIX = ".idx.jsonl"
+_END = object()
+
+
+@dataclass
+class ArchiveMember:
+    """One file read from a tar shard; ``path`` is ``<shard>/<member name>``."""
+
+    path: Path
+    data: bytes
+    sha256: str
+
+
+def archive_member_path(path: Path) -> Path | None:
+    """The shard holding ``path`` when it names a member inside a tar shard, else ``None``."""
+    return path.parent if path.parent.suffix == ARCHIVE_SUFFIX else None
+
+
+class TarShardReader:
+    """Stream members out of tar shards in order, reading ahead on a background thread.
+
+    Shards are opened in streaming mode, so each one is read front to back exactly once
+    without seeking. Up to ``prefetch`` members are buffered, which overlaps network or disk
+    latency with downstream decoding. Members whose suffix is not in ``suffixes`` (metadata
+    sidecars, for example) are skipped.
+    """
+
+    def __init__(self, shards: Iterable[Path], suffixes: Iterable[str], prefetch: int = 32) -> None:
+        self._shards = shards
+        self._suffixes = {suffix.lower() for suffix in suffixes}
+        self._buffer: queue.Queue[Any] = queue.Queue(maxsize=max(1, prefetch))
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _put(self, entry: Any) -> bool:
+        while not self._stop.is_set():
+            try:
+                self._buffer.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _wanted(self, info: tarfile.TarInfo) -> bool:
+        return info.isfile() and Path(info.name).suffix.lower() in self._suffixes
+
+    def _read(self) -> None:
+        try:
+            for shard in self._shards:
+                with tarfile.open(shard, mode="r|*") as archive:
+                    for info in archive:
+                        if not self._wanted(info):
+                            continue
+                        handle = archive.extractfile(info)
+                        if handle is None:
+                            continue
+                        data = handle.read()
+                        member = ArchiveMember(
+                            path=shard / info.name,
+                            data=data,
+                            sha256=hashlib.sha256(data).hexdigest(),
+                        )
+                        if not self._put(member):
+                            return
+        except BaseException as exc:
+            # Anything, not just I/O errors, must reach the consumer, which would wait forever.
+            self._put(exc)
+            return
+        self._put(_END)
+
+    def __iter__(self) -> Iterator[ArchiveMember]:
+        self._thread = threading.Thread(target=self._read, name="tar-prefetch", daemon=True)
+        self._thread.start()
+        try:
+            while True:
+                entry = self._buffer.get()
+                if entry is _END:
+                    return
+                if isinstance(entry, BaseException):
+                    raise entry
+                yield entry
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+class TarShardWriter:
+    """Pack outputs and their metadata into rolling tar shards with a random-access index.
+
+    Every output is stored as ``<key>.<ext>`` next to a ``<key>.json`` metadata member, the
+    layout WebDataset readers expect. A shard is closed and a new one started once it holds
+    ``max_members`` outputs or ``max_bytes`` of data. Each shard has a JSON Lines index with
+    the byte offset and size of every output, appended as it is written, so single outputs can
+    be read with one seek. Writes are serialised by a lock, so stages may share one writer.
+    """
+
+    def __init__(
+        self, directory: Path, prefix: str, max_members: int = 10_000, max_bytes: int = 1 << 30
+    ) -> None:
+        self.directory = directory
+        self._prefix = prefix
+        self._max_members = max_members
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._archive: tarfile.TarFile | None = None
+        self._index: Any | None = None
+        self._path: Path | None = None
+        self._members = 0
+        self._next_number: int | None = None
+
+    def _open_next(self) -> None:
+        self._close_current()
+        if self._next_number is None:
+            # Never append to shards from earlier runs; continue numbering after them.
+            # Other files matching the glob, such as ``<prefix>-final.tar``, are not our shards.
+            pattern = re.compile(rf"{re.escape(self._prefix)}-(\d+)")
+            existing = self.directory.glob(f"{self._prefix}-*{ARCHIVE_SUFFIX}")
+            matches = [pattern.fullmatch(path.stem) for path in existing]
+            numbers = [int(match.group(1)) for match in matches if match is not None]
+            self._next_number = max(numbers, default=-1) + 1
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._path = self.directory / f"{self._prefix}-{self._next_number:06d}{ARCHIVE_SUFFIX}"
+        self._next_number += 1
+        self._archive = tarfile.open(self._path, mode="w")
+        self._index = self._path.with_suffix(INDEX_SUFFIX).open("a", encoding="utf-8")
+        self._members = 0
+        logger.info("Writing output shard %s", self._path)
+
+    def _add(self, name: str, data: bytes) -> int:
+        """Append a member and return the byte offset of its data within the shard."""
+        assert self._archive is not None
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mtime = int(time.time())
+        header = info.tobuf(self._archive.format, self._archive.encoding, self._archive.errors)
+        offset = self._archive.offset + len(header)
+        self._archive.addfile(info, io.BytesIO(data))
+        return offset
+
+    def write(self, name: str, data: bytes, metadata: dict[str, Any]) -> Path:
+        """Append one output and its metadata; returns ``<shard>/<name>``."""
+        key = name.rsplit(".", 1)[0]
+        sidecar = json.dumps(metadata, default=str, sort_keys=True).encode("utf-8")
+        with self._lock:
+            if (
+                self._archive is None
+                or self._members >= self._max_members
+                or self._archive.offset >= self._max_bytes
+            ):
+                self._open_next()
+            assert self._archive is not None and self._index is not None and self._path
+            offset = self._add(name, data)
+            self._add(f"{key}.json", sidecar)
+            self._members += 1
+            self._archive.fileobj.flush()  # type: ignore[union-attr]
+            record = {"name": name, "offset": offset, "size": len(data), "metadata": metadata}
+            self._index.write(json.dumps(record, default=str) + "\n")
+            self._index.flush()
+            return self._path / name
+
+    def _close_current(self) -> None:
+        if self._archive is not None:
+            self._archive.close()
+            self._archive = None
+        if self._index is not None:
+            self._index.close()
+            self._index = None
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_current()
+
+
+def read_indexed(shard: Path, name: str) -> bytes:
+    """Read one output from a shard through its index, without scanning the archive."""
+    with shard.with_suffix(INDEX_SUFFIX).open("r", encoding="utf-8") as fh:
+        for line in fh:
+            record = json.loads(line)
+            if record["name"] == name:
+                break
+        else:
+            raise KeyError(f"{name} is not indexed in {shard}")
+    with shard.open("rb") as fh:
+        fh.seek(record["offset"])
+        return fh.read(record["size"])
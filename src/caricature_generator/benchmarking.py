@@ -0,0 +1,322 @@
+"""Stage-level throughput benchmarks that run offline on a CPU-only host."""
+
+from __future__ import annotations
+
+import importlib.util
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, TypeVar
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from .config import PipelineConfig
+from .logging_utils import get_logger
+from .memory import peak_rss_mb
+from .postprocessing import PostProcessingPipeline
+from .preprocessing import ImageLoader, PreprocessingPipeline
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+STAGES = ("load", "preprocess", "generate", "postprocess", "save")
+HEAVY_MODULES = ("torch", "diffusers", "transformers", "mediapipe", "cv2", "huggingface_hub")
+DEFAULT_RESOLUTIONS = ((640, 480), (1920, 1080), (4032, 3024))
+# Generator acceleration options compared against the float32 baseline, which has none enabled.
+ACCELERATION_VARIANTS: dict[str, dict[str, bool]] = {
+    "float32": {},
+    "bf16_autocast": {"bf16_autocast": True},
+    "channels_last": {"channels_last": True},
+    "attention_slicing": {"attention_slicing": True},
+    "compile": {"compile": True},
+    "all": {
+        "bf16_autocast": True,
+        "channels_last": True,
+        "attention_slicing": True,
+        "compile": True,
+    },
+}
+
+
+def synthesize_corpus(
+    directory: Path,
+    resolutions: Sequence[tuple[int, int]] = DEFAULT_RESOLUTIONS,
+    per_resolution: int = 4,
+    seed: int = 0,
+) -> list[Path]:
+    """Write deterministic portrait-like JPEGs (noisy backdrop, face ellipse, eyes, mouth)."""
+    rng = np.random.default_rng(seed)
+    directory.mkdir(parents=True, exist_ok=True)
+    paths: list[Path] = []
+    for width, height in resolutions:
+        for idx in range(per_resolution):
+            backdrop = rng.integers(
+                40, 215, size=(height // 8 + 1, width // 8 + 1, 3), dtype=np.uint8
+            )
+            image = Image.fromarray(backdrop).resize((width, height), Image.Resampling.BILINEAR)
+            draw = ImageDraw.Draw(image)
+            cx, cy = width / 2, height / 2
+            rx, ry = width * 0.18, height * 0.3
+            skin = tuple(int(value) for value in rng.integers(150, 240, size=3))
+            draw.ellipse((cx - rx, cy - ry, cx + rx, cy + ry), fill=skin)
+            for side in (-1, 1):
+                ex, ey = cx + side * rx * 0.4, cy - ry * 0.2
+                ew, eh, pupil = rx * 0.12, ry * 0.06, rx * 0.05
+                draw.ellipse((ex - ew, ey - eh, ex + ew, ey + eh), fill="white")
+                draw.ellipse((ex - pupil, ey - pupil, ex + pupil, ey + pupil), fill="black")
+            mouth = (cx - rx * 0.4, cy + ry * 0.2, cx + rx * 0.4, cy + ry * 0.55)
+            draw.arc(mouth, 20, 160, fill="darkred", width=max(2, width // 200))
+            path = directory / f"portrait_{width}x{height}_{idx:03d}.jpg"
+            image.save(path, format="JPEG", quality=92)
+            paths.append(path)
+    return paths
+
+
+@dataclass
+class StartupReport:
+    """Cold-start cost of a snippet run in a fresh interpreter."""
+
+    seconds: float
+    heavy_modules: list[str]
+
+
+def measure_startup(code: str) -> StartupReport:
+    """Run ``code`` in a new interpreter and report wall time and heavy modules it imported."""
+    probe = (
+        "import sys, json\n"
+        f"{code}\n"
+        f"print(json.dumps([name for name in {HEAVY_MODULES!r} if name in sys.modules]))\n"
+    )
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-c", probe], capture_output=True, text=True, check=True
+    )
+    elapsed = time.perf_counter() - start
+    return StartupReport(
+        seconds=elapsed, heavy_modules=json.loads(completed.stdout.strip().splitlines()[-1])
+    )
+
+
+@dataclass
+class StageStats:
+    """Latency samples (seconds) collected for one stage."""
+
+    samples: list[float] = field(default_factory=list)
+
+    def summary(self) -> dict[str, float]:
+        if not self.samples:
+            return {"count": 0}
+        values = np.asarray(self.samples) * 1000.0
+        return {
+            "count": len(self.samples),
+            "mean_ms": float(values.mean()),
+            "p50_ms": float(np.percentile(values, 50)),
+            "p90_ms": float(np.percentile(values, 90)),
+            "p99_ms": float(np.percentile(values, 99)),
+            "total_s": float(values.sum() / 1000.0),
+        }
+
+
+@dataclass
+class BenchmarkReport:
+    """Per-stage latency percentiles, end-to-end throughput and memory of one benchmark run."""
+
+    images: int
+    wall_seconds: float
+    peak_rss_mb: float
+    stages: dict[str, dict[str, float]]
+
+    @property
+    def images_per_second(self) -> float:
+        return self.images / self.wall_seconds if self.wall_seconds else 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "images": self.images,
+            "wall_seconds": self.wall_seconds,
+            "images_per_second": self.images_per_second,
+            "peak_rss_mb": self.peak_rss_mb,
+            "stages": self.stages,
+        }
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_dict(), indent=2), encoding="utf-8")
+
+    def compare(self, baseline: dict[str, Any], tolerance: float = 0.15) -> list[str]:
+        """Describe every metric that regressed by more than ``tolerance`` against ``baseline``."""
+        regressions: list[str] = []
+        base_rate = baseline.get("images_per_second", 0.0)
+        if base_rate and self.images_per_second < base_rate * (1.0 - tolerance):
+            regressions.append(
+                f"throughput {self.images_per_second:.2f} img/s < baseline {base_rate:.2f} img/s"
+            )
+        base_rss = baseline.get("peak_rss_mb", 0.0)
+        if base_rss and self.peak_rss_mb > base_rss * (1.0 + tolerance):
+            regressions.append(f"peak RSS {self.peak_rss_mb:.0f} MiB > baseline {base_rss:.0f} MiB")
+        for stage, stats in self.stages.items():
+            base_p50 = baseline.get("stages", {}).get(stage, {}).get("p50_ms", 0.0)
+            current = stats.get("p50_ms", 0.0)
+            if base_p50 and current > base_p50 * (1.0 + tolerance):
+                regressions.append(f"{stage} p50 {current:.1f} ms > baseline {base_p50:.1f} ms")
+        return regressions
+
+
+def _timed(stats: StageStats, fn: Callable[..., T], *args: Any) -> T:
+    start = time.perf_counter()
+    result = fn(*args)
+    stats.samples.append(time.perf_counter() - start)
+    return result
+
+
+def run_benchmark(
+    config: PipelineConfig, corpus: Sequence[Path], output_dir: Path | None = None
+) -> BenchmarkReport:
+    """Time every stage the pipeline controls, with a stub standing in for the diffusion model.
+
+    Images are pushed through one stage at a time in ``batch_size`` groups so each stage's
+    latency is measured in isolation; generation latency is recorded per image.
+    """
+    from .models.stub import StubCaricatureModel
+    from .pipeline import default_prompts
+
+    loader = ImageLoader(config.input_dir, decode_size=config.preprocessing.decode_size)
+    preprocess = PreprocessingPipeline(config.preprocessing)
+    generator = StubCaricatureModel(config.model, batch_size=config.batch_size)
+    postprocess = PostProcessingPipeline(config.postprocessing)
+    prompts = default_prompts(config)
+    stats = {stage: StageStats() for stage in STAGES}
+
+    with tempfile.TemporaryDirectory() as scratch:
+        destination = output_dir or Path(scratch)
+        start = time.perf_counter()
+        images = 0
+        for offset in range(0, len(corpus), config.batch_size):
+            group = []
+            for path in corpus[offset : offset + config.batch_size]:
+                batch = _timed(stats["load"], loader.load_path, path)
+                if batch is not None:
+                    group.append((batch, _timed(stats["preprocess"], preprocess.process, batch)))
+            if not group:
+                continue
+
+            generate_start = time.perf_counter()
+            generated = generator.generate_batch(
+                [processed.image for _, processed in group], [prompts] * len(group)
+            )
+            per_image = (time.perf_counter() - generate_start) / len(group)
+            stats["generate"].samples.extend([per_image] * len(group))
+
+            for (batch, processed), outputs in zip(group, generated, strict=True):
+                for idx, output in enumerate(outputs):
+                    composed = _timed(
+                        stats["postprocess"], postprocess.apply, output, processed.image
+                    )
+                    target = destination / f"{batch.path.stem}_caricature_{idx}"
+                    _timed(stats["save"], postprocess.save, composed, target)
+                images += 1
+        wall = time.perf_counter() - start
+
+    return BenchmarkReport(
+        images=images,
+        wall_seconds=wall,
+        peak_rss_mb=peak_rss_mb(),
+        stages={stage: stage_stats.summary() for stage, stage_stats in stats.items()},
+    )
+
+
+def image_drift(reference: Image.Image, candidate: Image.Image) -> tuple[float | None, float]:
+    """PSNR in dB (``None`` for identical images) and mean absolute error on the 0-255 scale."""
+    diff = np.asarray(reference.convert("RGB"), dtype=np.float64) - np.asarray(
+        candidate.convert("RGB"), dtype=np.float64
+    )
+    mse = float((diff**2).mean())
+    psnr = 10.0 * float(np.log10(255.0**2 / mse)) if mse else None
+    return psnr, float(np.abs(diff).mean())
+
+
+@dataclass
+class VariantResult:
+    """Speed and output drift of one generator configuration against the baseline."""
+
+    name: str
+    load_seconds: float
+    seconds_per_image: float
+    speedup: float
+    psnr_db: float | None
+    mean_abs_error: float
+
+
+def _seed(seed: int) -> None:
+    # Diffusion noise comes from torch's global generator; reseeding makes variants comparable.
+    if importlib.util.find_spec("torch") is not None:
+        import torch
+
+        torch.manual_seed(seed)
+
+
+def compare_generator_variants(
+    config: PipelineConfig,
+    images: Sequence[Image.Image],
+    variants: dict[str, dict[str, bool]] = ACCELERATION_VARIANTS,
+    repeats: int = 2,
+    seed: int = 0,
+) -> list[VariantResult]:
+    """Time ``config.model`` with each set of acceleration options and measure output drift.
+
+    Every variant starts from all options disabled; the first variant is the baseline that the
+    others are compared with. ``load_seconds`` covers loading, compilation warm-up and the first
+    pass over ``images``; ``seconds_per_image`` is the mean of ``repeats`` further passes, each
+    with the same seed. Drift compares the last pass with the baseline's: the worst per-image
+    PSNR and the mean absolute error.
+    """
+    from .models.registry import create_generator
+    from .pipeline import default_prompts
+
+    prompts = [default_prompts(config)[0]] * len(images)
+    disabled = config.model.acceleration.model_copy(
+        update={option: False for option in ACCELERATION_VARIANTS["all"]}
+    )
+    results: list[VariantResult] = []
+    reference: list[Image.Image] = []
+    for name, options in variants.items():
+        model_config = config.model.model_copy(
+            update={"acceleration": disabled.model_copy(update=options)}
+        )
+        generator = create_generator(
+            model_config, device=config.device, batch_size=config.batch_size
+        )
+        start = time.perf_counter()
+        _seed(seed)
+        generator.generate_batch(images, prompts)
+        load_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            _seed(seed)
+            outputs = [per_image[0] for per_image in generator.generate_batch(images, prompts)]
+        seconds_per_image = (time.perf_counter() - start) / (repeats * len(images))
+
+        if not results:
+            reference = outputs
+        drifts = [image_drift(ref, out) for ref, out in zip(reference, outputs, strict=True)]
+        finite = [psnr for psnr, _ in drifts if psnr is not None]
+        results.append(
+            VariantResult(
+                name=name,
+                load_seconds=load_seconds,
+                seconds_per_image=seconds_per_image,
+                speedup=results[0].seconds_per_image / seconds_per_image if results else 1.0,
+                psnr_db=min(finite) if finite else None,
+                mean_abs_error=float(np.mean([error for _, error in drifts])),
+            )
+        )
+        logger.info("Variant %s: %s s/image", name, round(seconds_per_image, 3))
+    return results
@@ -0,0 +1,163 @@
+"""Content-addressed on-disk cache of pipeline outputs."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from .logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class CacheEntry:
+    """Stored outputs for one cache key."""
+
+    key: str
+    files: list[Path]
+    metadata: list[dict[str, Any]]
+
+
+@dataclass
+class CacheStats:
+    """Counters describing cache effectiveness during a run."""
+
+    hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+
+
+class ResultCache:
+    """Persist generated outputs keyed by input content and output-affecting settings.
+
+    Output files live under ``root/objects`` and are tracked in a SQLite index holding their
+    total size and last access time, which drives least-recently-used eviction once the cache
+    grows beyond ``max_bytes``. All operations are serialised by a lock so the cache can be
+    shared between pipeline threads.
+    """
+
+    def __init__(self, root: Path, max_bytes: int, link_mode: str = "hardlink") -> None:
+        self.root = root
+        self._max_bytes = max_bytes
+        self._link_mode = link_mode
+        self._lock = threading.Lock()
+        self.stats = CacheStats()
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.root / "index.sqlite", check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, size INTEGER NOT NULL, last_access REAL NOT NULL, "
+            "payload TEXT NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_lru ON entries (last_access)")
+        self._db.commit()
+
+    @staticmethod
+    def make_key(content_hash: str, settings: Mapping[str, Any]) -> str:
+        """Combine an input content hash with the settings that influence the output."""
+        encoded = json.dumps(settings, sort_keys=True, default=str)
+        return hashlib.sha256(f"{content_hash}:{encoded}".encode()).hexdigest()
+
+    def _object_dir(self, key: str) -> Path:
+        return self.root / "objects" / key[:2] / key
+
+    def lookup(self, key: str) -> CacheEntry | None:
+        """Return the stored entry for ``key`` and mark it as recently used."""
+        with self._lock:
+            row = self._db.execute("SELECT payload FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.stats.misses += 1
+                return None
+
+            payload = json.loads(row[0])
+            files = [self._object_dir(key) / name for name in payload["files"]]
+            if not all(path.exists() for path in files):
+                logger.warning("Cache entry %s is incomplete; discarding it", key)
+                self._remove(key)
+                self._db.commit()
+                self.stats.misses += 1
+                return None
+
+            self._db.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+            self.stats.hits += 1
+            return CacheEntry(key=key, files=files, metadata=payload["metadata"])
+
+    def restore(self, entry: CacheEntry, destinations: Sequence[Path]) -> list[Path]:
+        """Materialise cached files at ``destinations`` (suffixes are taken from the cache)."""
+        restored: list[Path] = []
+        for source, destination in zip(entry.files, destinations, strict=True):
+            target = destination.with_suffix(source.suffix)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            if target.exists():
+                target.unlink()
+            if self._link_mode == "hardlink":
+                try:
+                    os.link(source, target)
+                except OSError:
+                    shutil.copyfile(source, target)
+            else:
+                shutil.copyfile(source, target)
+            restored.append(target)
+        return restored
+
+    def store(
+        self, key: str, outputs: Sequence[Path], metadata: Sequence[Mapping[str, Any]]
+    ) -> None:
+        """Copy freshly generated outputs into the cache and evict old entries if needed."""
+        object_dir = self._object_dir(key)
+        object_dir.mkdir(parents=True, exist_ok=True)
+        names: list[str] = []
+        size = 0
+        for idx, output in enumerate(outputs):
+            name = f"{idx}{output.suffix}"
+            target = object_dir / name
+            shutil.copyfile(output, target)
+            names.append(name)
+            size += target.stat().st_size
+
+        payload = json.dumps(
+            {"files": names, "metadata": [dict(item) for item in metadata]}, default=str
+        )
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (key, size, last_access, payload) "
+                "VALUES (?, ?, ?, ?)",
+                (key, size, time.time(), payload),
+            )
+            self.stats.stores += 1
+            self._evict()
+            self._db.commit()
+
+    def _evict(self) -> None:
+        (total,) = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()
+        if total <= self._max_bytes:
+            return
+        rows = self._db.execute("SELECT key, size FROM entries ORDER BY last_access").fetchall()
+        for key, size in rows:
+            if total <= self._max_bytes:
+                break
+            self._remove(key)
+            total -= size
+            self.stats.evictions += 1
+            logger.debug("Evicted cache entry %s (%s bytes)", key, size)
+
+    def _remove(self, key: str) -> None:
+        self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+        shutil.rmtree(self._object_dir(key), ignore_errors=True)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -2,13 +2,15 @@
 
 from __future__ import annotations
 
+import threading
+from contextlib import nullcontext
 from pathlib import Path
-from typing import Optional
 
 import typer
 
-from .config import PipelineConfig
-from .pipeline import CaricaturePipeline
+from .config import AccelerationConfig, PipelineConfig
+from .profiling import PROFILERS, profile_run
+from .sharding import limit_threads, parse_shard, run_workers
 
 app = typer.Typer(help="Generate tasteful caricatures from input images.")
 
@@ -18,15 +20,39 @@ def run(
     config: Path = typer.Option(
         Path("configs/default.yaml"), "--config", "-c", help="Path to pipeline configuration."
     ),
-    input_dir: Optional[Path] = typer.Option(
+    input_dir: Path | None = typer.Option(
         None, "--input", "-i", help="Override input directory set in the config."
     ),
-    output_dir: Optional[Path] = typer.Option(
+    output_dir: Path | None = typer.Option(
         None, "--output", "-o", help="Override output directory set in the config."
     ),
-    device: Optional[str] = typer.Option(
+    device: str | None = typer.Option(
         None, "--device", "-d", help="Override compute device (cuda/cpu)."
     ),
+    resume: bool = typer.Option(
+        False, "--resume", help="Skip inputs already completed according to the run manifest."
+    ),
+    metrics_dir: Path | None = typer.Option(
+        None, "--metrics-dir", help="Write metrics.json and metrics.prom here after the run."
+    ),
+    shard: str | None = typer.Option(
+        None, "--shard", help="Process only shard i/N of the inputs (e.g. 0/4)."
+    ),
+    workers: int | None = typer.Option(
+        None, "--workers", "-w", min=1, help="Number of local pipeline processes."
+    ),
+    torch_threads: int | None = typer.Option(
+        None, "--torch-threads", min=0, help="Intra-op threads per process (0 splits cores)."
+    ),
+    interop_threads: int | None = typer.Option(
+        None, "--interop-threads", min=0, help="Inter-op threads per process (0 keeps default)."
+    ),
+    profile: str | None = typer.Option(
+        None, "--profile", help=f"Profile the run with one of {sorted(PROFILERS)}."
+    ),
+    profile_out: Path | None = typer.Option(
+        None, "--profile-out", help="Profiler output (default: logs/profile.pstats or .json)."
+    ),
 ) -> None:
     """Run the full caricature generation pipeline."""
     cfg = PipelineConfig.load(config)
@@ -37,13 +63,155 @@ def run(
         overrides["output_dir"] = output_dir
     if device:
         overrides["device"] = device
+    if metrics_dir:
+        overrides["metrics_dir"] = metrics_dir
+
+    execution_overrides: dict[str, int] = {}
+    if shard:
+        try:
+            shard_index, shard_count = parse_shard(shard)
+        except ValueError as exc:
+            raise typer.BadParameter(str(exc), param_hint="--shard") from None
+        execution_overrides.update(shard_index=shard_index, shard_count=shard_count)
+    if workers is not None:
+        execution_overrides["workers"] = workers
+    if torch_threads is not None:
+        execution_overrides["torch_threads"] = torch_threads
+    if interop_threads is not None:
+        execution_overrides["interop_threads"] = interop_threads
+    if execution_overrides:
+        overrides["execution"] = cfg.execution.model_copy(update=execution_overrides)
+
+    if overrides:
+        cfg = cfg.model_copy(update=overrides)
+
+    if profile and profile not in PROFILERS:
+        raise typer.BadParameter(f"must be one of {sorted(PROFILERS)}", param_hint="--profile")
+    if profile and cfg.execution.workers > 1:
+        # The parent only waits on its workers, so its profile would say nothing useful.
+        raise typer.BadParameter(
+            "profile a single-worker run (--workers 1)", param_hint="--profile"
+        )
+
+    profiler = nullcontext()
+    if profile:
+        suffix = ".pstats" if profile == "cprofile" else ".json"
+        profiler = profile_run(profile, profile_out or cfg.logging.log_dir / f"profile{suffix}")
+
+    if cfg.execution.workers > 1:
+        generated = len(run_workers(cfg, resume=resume))
+    else:
+        from .pipeline import CaricaturePipeline
+
+        if cfg.execution.torch_threads or cfg.execution.interop_threads:
+            limit_threads(cfg.execution.torch_threads, cfg.execution.interop_threads)
+        pipeline = CaricaturePipeline(cfg)
+        with profiler:
+            generated = sum(1 for _ in pipeline.iter_run(resume=resume))
+    typer.echo(f"Generated {generated} caricature(s). Outputs stored in {cfg.output_dir}.")
+
+
+@app.command()
+def watch(
+    config: Path = typer.Option(
+        Path("configs/default.yaml"), "--config", "-c", help="Path to pipeline configuration."
+    ),
+    input_dir: Path | None = typer.Option(
+        None, "--input", "-i", help="Override the watched input directory."
+    ),
+    output_dir: Path | None = typer.Option(
+        None, "--output", "-o", help="Override output directory set in the config."
+    ),
+    device: str | None = typer.Option(
+        None, "--device", "-d", help="Override compute device (cuda/cpu)."
+    ),
+    poll: bool = typer.Option(
+        False, "--poll", help="Poll the input directory instead of using inotify."
+    ),
+) -> None:
+    """Keep the model warm and process images as they arrive, until SIGINT or SIGTERM."""
+    cfg = PipelineConfig.load(config)
+    overrides: dict[str, object] = {}
+    if input_dir:
+        overrides["input_dir"] = input_dir
+    if output_dir:
+        overrides["output_dir"] = output_dir
+    if device:
+        overrides["device"] = device
+    if poll:
+        overrides["watch"] = cfg.watch.model_copy(update={"backend": "poll"})
+    if overrides:
+        cfg = cfg.model_copy(update=overrides)
+
+    from .watch import drain_on_signal, run_watch
+
+    if cfg.execution.torch_threads or cfg.execution.interop_threads:
+        limit_threads(cfg.execution.torch_threads, cfg.execution.interop_threads)
+    stop = threading.Event()
+    drain_on_signal(stop)
+    generated = run_watch(cfg, stop)
+    typer.echo(f"Generated {generated} caricature(s). Outputs stored in {cfg.output_dir}.")
 
+
+@app.command()
+def serve(
+    config: Path = typer.Option(
+        Path("configs/default.yaml"), "--config", "-c", help="Path to pipeline configuration."
+    ),
+    host: str | None = typer.Option(None, "--host", help="Override the bind address."),
+    port: int | None = typer.Option(None, "--port", "-p", help="Override the listen port."),
+    device: str | None = typer.Option(
+        None, "--device", "-d", help="Override compute device (cuda/cpu)."
+    ),
+) -> None:
+    """Serve caricatures over HTTP from a warm model with dynamic micro-batching."""
+    cfg = PipelineConfig.load(config)
+    serving_overrides = {}
+    if host:
+        serving_overrides["host"] = host
+    if port is not None:
+        serving_overrides["port"] = port
+    overrides: dict[str, object] = {}
+    if serving_overrides:
+        overrides["serving"] = cfg.serving.model_copy(update=serving_overrides)
+    if device:
+        overrides["device"] = device
     if overrides:
         cfg = cfg.model_copy(update=overrides)
 
-    pipeline = CaricaturePipeline(cfg)
-    artifacts = pipeline.run()
-    typer.echo(f"Generated {len(artifacts)} caricature(s). Outputs stored in {cfg.output_dir}.")
+    from .serving import serve as serve_forever
+
+    serve_forever(cfg)
+
+
+@app.command()
+def snapshot(
+    config: Path = typer.Option(
+        Path("configs/default.yaml"), "--config", "-c", help="Path to pipeline configuration."
+    ),
+    output: Path | None = typer.Option(
+        None, "--output", "-o", help="Snapshot directory (default: model.snapshot_dir)."
+    ),
+    device: str | None = typer.Option(
+        None, "--device", "-d", help="Device the snapshot will be loaded on (cuda/cpu)."
+    ),
+) -> None:
+    """Save the configured diffusion model as a local safetensors snapshot for fast loading."""
+    cfg = PipelineConfig.load(config)
+    target = output or cfg.model.snapshot_dir
+    if target is None:
+        raise typer.BadParameter("set model.snapshot_dir or pass --output", param_hint="--output")
+
+    from .models.diffusers_wrapper import DiffusersCaricatureModel
+
+    # Always start from pretrained_model, even when an older snapshot is configured, and store
+    # plain weights: acceleration options are applied again when the snapshot is loaded.
+    model_config = cfg.model.model_copy(
+        update={"snapshot_dir": None, "acceleration": AccelerationConfig()}
+    )
+    model = DiffusersCaricatureModel(model_config, device=device or cfg.device)
+    model.save_snapshot(target)
+    typer.echo(f"Saved snapshot of {cfg.model.pretrained_model} to {target}.")
 
 
 def main() -> None:
@@ -9,6 +9,24 @@ import yaml
 from pydantic import BaseModel, Field, validator
 
 
+class AccelerationConfig(BaseModel):
+    bf16_autocast: bool = Field(default=False, description="bfloat16 autocast on CPU")
+    compile: bool = Field(default=False, description="torch.compile the UNet and VAE decoder")
+    compile_mode: str = Field(default="default")
+    compile_warmup_size: int = Field(
+        default=512, ge=64, le=2048, description="Image side of the compile warm-up step"
+    )
+    channels_last: bool = Field(default=False, description="channels-last UNet and VAE weights")
+    attention_slicing: bool = Field(default=False)
+
+    @validator("compile_mode")
+    def validate_compile_mode(cls, value: str) -> str:
+        allowed = {"default", "reduce-overhead", "max-autotune"}
+        if value not in allowed:
+            raise ValueError(f"compile_mode must be one of {allowed}")
+        return value
+
+
 class ModelConfig(BaseModel):
     backend: str = Field(default="diffusers", description="Name of the generator backend")
     pretrained_model: str = Field(
@@ -17,14 +35,45 @@ class ModelConfig(BaseModel):
     scheduler: str = Field(default="DPMSolverMultistepScheduler", description="Diffusion scheduler")
     guidance_scale: float = Field(default=7.5, ge=0.0, le=20.0)
     num_inference_steps: int = Field(default=25, ge=1, le=150)
+    prompt_cache_size: int = Field(
+        default=64, ge=0, description="Prompt embeddings kept in memory; 0 disables the cache"
+    )
+    snapshot_dir: Path | None = Field(
+        default=None, description="Local safetensors snapshot loaded instead of pretrained_model"
+    )
+    acceleration: AccelerationConfig = Field(default_factory=AccelerationConfig)
 
 
 class PreprocessingConfig(BaseModel):
     image_size: int = Field(default=512, ge=64, le=2048)
+    decode_size: int = Field(
+        default=1024, ge=0, le=8192, description="Minimum decoded side for JPEG draft; 0 disables"
+    )
     align_faces: bool = Field(default=True)
+    detection_size: int = Field(
+        default=640,
+        ge=0,
+        le=8192,
+        description="Longest side face detection runs at; 0 is full size",
+    )
+    align_margin: float = Field(
+        default=0.25,
+        ge=0.0,
+        le=1.0,
+        description="Padding around the face as a fraction of its size",
+    )
+    exaggeration: float = Field(
+        default=0.0, ge=0.0, le=1.5, description="Scale of landmark offsets from the mean face"
+    )
+    mean_face_path: Path | None = Field(
+        default=None, description="Mean face (.npy or .obj); defaults to MediaPipe's canonical face"
+    )
     background_mode: str = Field(default="preserve")
     safety_filter: bool = Field(default=True)
     face_detector: str = Field(default="mediapipe")
+    landmark_cache_dir: Path | None = Field(
+        default=None, description="Directory of the persistent landmark store; None disables it"
+    )
 
     @validator("background_mode")
     def validate_background_mode(cls, value: str) -> str:
@@ -38,6 +87,17 @@ class PostprocessingConfig(BaseModel):
     blend_alpha: float = Field(default=0.75, ge=0.0, le=1.0)
     output_format: str = Field(default="png")
     upscale: int = Field(default=1, ge=1, le=4)
+    upscale_filter: str = Field(default="lanczos", description="Resampling filter for upscaling")
+    encode_preset: str = Field(default="balanced", description="Encoder speed/size trade-off")
+    png_compress_level: int | None = Field(
+        default=None, ge=0, le=9, description="zlib level for PNG; overrides the preset"
+    )
+    quality: int | None = Field(
+        default=None, ge=1, le=100, description="JPEG/WebP quality; defaults to Pillow's"
+    )
+    atomic_writes: bool = Field(
+        default=False, description="Write to a temporary file and rename it into place"
+    )
 
     @validator("output_format")
     def validate_output_format(cls, value: str) -> str:
@@ -46,6 +106,129 @@ class PostprocessingConfig(BaseModel):
             raise ValueError(f"output_format must be one of {allowed}")
         return value
 
+    @validator("upscale_filter")
+    def validate_upscale_filter(cls, value: str) -> str:
+        allowed = {"nearest", "bilinear", "bicubic", "lanczos"}
+        if value not in allowed:
+            raise ValueError(f"upscale_filter must be one of {allowed}")
+        return value
+
+    @validator("encode_preset")
+    def validate_encode_preset(cls, value: str) -> str:
+        allowed = {"fast", "balanced", "small"}
+        if value not in allowed:
+            raise ValueError(f"encode_preset must be one of {allowed}")
+        return value
+
+
+class ExecutionConfig(BaseModel):
+    decode_workers: int = Field(default=2, ge=1, le=64)
+    preprocess_workers: int = Field(default=2, ge=1, le=64)
+    postprocess_workers: int = Field(default=2, ge=1, le=64)
+    encode_workers: int = Field(default=2, ge=1, le=64, description="Workers encoding outputs")
+    queue_size: int = Field(default=8, ge=1, le=1024, description="Items buffered between stages")
+    pool: str = Field(default="thread", description="Worker pool for CPU-bound stages")
+    workers: int = Field(default=1, ge=1, le=256, description="Pipeline processes to run locally")
+    torch_threads: int = Field(
+        default=0, ge=0, le=1024, description="Intra-op threads per process; 0 splits cores evenly"
+    )
+    interop_threads: int = Field(
+        default=0, ge=0, le=1024, description="Inter-op threads per process; 0 keeps the default"
+    )
+    memory_budget_mb: int = Field(
+        default=0, ge=0, description="Hold back new inputs while RSS exceeds this; 0 disables"
+    )
+    shard_count: int = Field(default=1, ge=1, description="Number of shards the inputs split into")
+    shard_index: int = Field(default=0, ge=0, description="Shard processed by this run")
+
+    @validator("pool")
+    def validate_pool(cls, value: str) -> str:
+        allowed = {"thread", "process"}
+        if value not in allowed:
+            raise ValueError(f"pool must be one of {allowed}")
+        return value
+
+    @validator("shard_index")
+    def validate_shard_index(cls, value: int, values: dict[str, Any]) -> int:
+        count = values.get("shard_count", 1)
+        if value >= count:
+            raise ValueError(f"shard_index must be below shard_count ({count})")
+        return value
+
+
+class CacheConfig(BaseModel):
+    enabled: bool = Field(default=False)
+    directory: Path = Field(default=Path(".cache/results"))
+    max_size_mb: int = Field(
+        default=2048, ge=1, description="Evict least recently used beyond this"
+    )
+    link_mode: str = Field(default="hardlink", description="How cached outputs are restored")
+
+    @validator("link_mode")
+    def validate_link_mode(cls, value: str) -> str:
+        allowed = {"hardlink", "copy"}
+        if value not in allowed:
+            raise ValueError(f"link_mode must be one of {allowed}")
+        return value
+
+
+class ArchiveConfig(BaseModel):
+    read: bool = Field(default=False, description="Stream inputs from .tar shards in input_dir")
+    write: bool = Field(default=False, description="Pack outputs into .tar shards")
+    prefetch: int = Field(default=32, ge=1, le=4096, description="Input members read ahead")
+    shard_max_members: int = Field(default=10_000, ge=1)
+    shard_max_mb: int = Field(default=1024, ge=1)
+
+
+class DedupConfig(BaseModel):
+    enabled: bool = Field(default=False, description="Skip near-duplicates of indexed inputs")
+    index_path: Path = Field(default=Path(".cache/dedup.sqlite"))
+    threshold: int = Field(
+        default=4, ge=0, le=7, description="Largest Hamming distance between 64-bit dHashes"
+    )
+    action: str = Field(default="reuse", description="Link the matched outputs, or only report")
+
+    @validator("action")
+    def validate_action(cls, value: str) -> str:
+        allowed = {"reuse", "report"}
+        if value not in allowed:
+            raise ValueError(f"action must be one of {allowed}")
+        return value
+
+
+class ServingConfig(BaseModel):
+    host: str = Field(default="127.0.0.1")
+    port: int = Field(default=8080, ge=0, le=65535)
+    max_batch_wait_ms: float = Field(
+        default=20.0, ge=0.0, le=10_000.0, description="Longest a request waits for batch-mates"
+    )
+    max_queue_size: int = Field(
+        default=64, ge=1, le=10_000, description="Queued requests beyond this are rejected with 503"
+    )
+    max_body_mb: int = Field(default=20, ge=1, le=512)
+    warmup: bool = Field(default=True, description="Run one request through the model at startup")
+
+
+class WatchConfig(BaseModel):
+    backend: str = Field(default="auto", description="inotify, poll, or auto (inotify if present)")
+    settle_seconds: float = Field(
+        default=1.0, ge=0.0, le=600.0, description="Unchanged this long, a file counts as written"
+    )
+    poll_interval: float = Field(default=1.0, gt=0.0, le=600.0)
+    queue_size: int = Field(
+        default=64, ge=1, le=100_000, description="Detected files waiting for the pipeline"
+    )
+    max_batch_wait_ms: float = Field(
+        default=200.0, ge=0.0, le=60_000.0, description="Longest a partial batch waits for arrivals"
+    )
+
+    @validator("backend")
+    def validate_backend(cls, value: str) -> str:
+        allowed = {"auto", "inotify", "poll"}
+        if value not in allowed:
+            raise ValueError(f"backend must be one of {allowed}")
+        return value
+
 
 class LoggingConfig(BaseModel):
     level: str = Field(default="INFO")
@@ -60,14 +243,23 @@ class PipelineConfig(BaseModel):
     model: ModelConfig = Field(default_factory=ModelConfig)
     preprocessing: PreprocessingConfig = Field(default_factory=PreprocessingConfig)
     postprocessing: PostprocessingConfig = Field(default_factory=PostprocessingConfig)
+    execution: ExecutionConfig = Field(default_factory=ExecutionConfig)
+    cache: CacheConfig = Field(default_factory=CacheConfig)
+    archives: ArchiveConfig = Field(default_factory=ArchiveConfig)
+    dedup: DedupConfig = Field(default_factory=DedupConfig)
+    serving: ServingConfig = Field(default_factory=ServingConfig)
+    watch: WatchConfig = Field(default_factory=WatchConfig)
+    metrics_dir: Path | None = Field(
+        default=None, description="Directory receiving metrics.json and metrics.prom after a run"
+    )
     logging: LoggingConfig = Field(default_factory=LoggingConfig)
 
     @classmethod
-    def from_dict(cls, data: dict[str, Any]) -> "PipelineConfig":
+    def from_dict(cls, data: dict[str, Any]) -> PipelineConfig:
         return cls(**data)
 
     @classmethod
-    def load(cls, path: Path) -> "PipelineConfig":
+    def load(cls, path: Path) -> PipelineConfig:
         with path.open("r", encoding="utf-8") as fh:
             payload = yaml.safe_load(fh)
         return cls.from_dict(payload or {})
@@ -0,0 +1,238 @@
+"""Perceptual hashing and a persistent Hamming-distance index of near-duplicate inputs."""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import sqlite3
+import threading
+from collections.abc import Sequence
+from dataclasses import dataclass
+from itertools import combinations
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from .archives import archive_member_path
+from .logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+_CHUNKS = 4
+_CHUNK_BITS = 16
+_CHUNK_MASK = (1 << _CHUNK_BITS) - 1
+# Each chunk is then probed within one bit: 17 buckets per chunk instead of 137 for two.
+MAX_THRESHOLD = 2 * _CHUNKS - 1
+
+
+def dhash(image: Image.Image) -> int:
+    """64-bit difference hash: is each pixel of a 9x8 grey thumbnail brighter than its neighbour.
+
+    The hash survives resizing, recompression and small exposure changes, so bursts and
+    re-uploads of one photo land within a few bits of each other.
+    """
+    thumbnail = np.asarray(image.convert("L").resize((9, 8), Image.Resampling.BOX), np.int16)
+    bits = np.packbits(thumbnail[:, 1:] > thumbnail[:, :-1])
+    return int.from_bytes(bits.tobytes(), "big")
+
+
+def _masks(radius: int) -> list[int]:
+    """Every chunk-sized XOR mask with at most ``radius`` bits set, fewest bits first."""
+    masks = [0]
+    for bits in range(1, radius + 1):
+        for positions in combinations(range(_CHUNK_BITS), bits):
+            masks.append(sum(1 << position for position in positions))
+    return masks
+
+
+class HammingIndex:
+    """In-memory multi-index hashing over 64-bit hashes.
+
+    Every hash is split into four 16-bit chunks, each with its own exact-match table. Two
+    hashes within ``threshold`` bits of each other differ by at most ``threshold // 4`` bits in
+    at least one chunk, so a query probes only the chunk values within that radius and verifies
+    the candidates with a popcount. A million random hashes leave about 15 entries per bucket,
+    so a lookup checks around a thousand candidates regardless of the index size.
+    """
+
+    def __init__(self, threshold: int) -> None:
+        if not 0 <= threshold <= MAX_THRESHOLD:
+            raise ValueError(f"threshold must be between 0 and {MAX_THRESHOLD}")
+        self.threshold = threshold
+        self._hashes: list[int] = []
+        self._tables: list[dict[int, list[int]]] = [{} for _ in range(_CHUNKS)]
+        self._masks = _masks(threshold // _CHUNKS)
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def add(self, value: int) -> int:
+        """Insert ``value`` and return its entry number."""
+        entry = len(self._hashes)
+        self._hashes.append(value)
+        for chunk, table in enumerate(self._tables):
+            table.setdefault((value >> (chunk * _CHUNK_BITS)) & _CHUNK_MASK, []).append(entry)
+        return entry
+
+    def replace(self, entry: int, value: int) -> None:
+        """Give ``entry`` the hash ``value``, moving it out of the buckets of its old hash."""
+        old = self._hashes[entry]
+        for chunk, table in enumerate(self._tables):
+            shift = chunk * _CHUNK_BITS
+            table[(old >> shift) & _CHUNK_MASK].remove(entry)
+            table.setdefault((value >> shift) & _CHUNK_MASK, []).append(entry)
+        self._hashes[entry] = value
+
+    def nearest(self, value: int) -> tuple[int, int] | None:
+        """``(entry, distance)`` of the closest hash within ``threshold`` bits, or ``None``."""
+        hashes = self._hashes
+        best_entry, best_distance = -1, self.threshold + 1
+        for chunk, table in enumerate(self._tables):
+            part = (value >> (chunk * _CHUNK_BITS)) & _CHUNK_MASK
+            for mask in self._masks:
+                # Entries found through several chunks are simply verified again.
+                for entry in table.get(part ^ mask, ()):
+                    distance = (hashes[entry] ^ value).bit_count()
+                    if distance < best_distance:
+                        if distance == 0:
+                            return entry, 0
+                        best_entry, best_distance = entry, distance
+        return (best_entry, best_distance) if best_entry >= 0 else None
+
+
+@dataclass
+class IndexedInput:
+    """Outcome of registering an input: the entry it owns, or the earlier input it duplicates."""
+
+    entry: int
+    duplicate_of: str | None = None
+    distance: int = 0
+
+
+@dataclass
+class _Record:
+    input: str
+    outputs: list[str] | None
+
+
+def _signed(value: int) -> int:
+    # SQLite integers are signed 64-bit.
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _outputs_exist(outputs: Sequence[str]) -> bool:
+    for output in outputs:
+        path = Path(output)
+        shard = archive_member_path(path)
+        if not (path.exists() or (shard is not None and shard.is_file())):
+            return False
+    return True
+
+
+class DuplicateIndex:
+    """Perceptual hashes of processed inputs and their outputs, persisted in SQLite.
+
+    Rows are tagged with the settings digest of the run that wrote them; only rows for the
+    current settings are loaded into a :class:`HammingIndex`, so outputs are never reused
+    across settings. An input is registered as soon as it is hashed, letting later
+    near-duplicates in the same run match it before its outputs exist; :meth:`complete` then
+    records the outputs. Entries whose outputs have been deleted are taken over by the next
+    input that matches them.
+    """
+
+    def __init__(self, path: Path, threshold: int, settings_digest: str) -> None:
+        self.path = path
+        self._settings = settings_digest
+        self._lock = threading.Lock()
+        self._index = HammingIndex(threshold)
+        self._records: list[_Record] = []
+        self._hashes: list[int] = []
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS hashes ("
+            "input TEXT NOT NULL, settings TEXT NOT NULL, hash INTEGER NOT NULL, "
+            "outputs TEXT NOT NULL, PRIMARY KEY (input, settings))"
+        )
+        self._db.commit()
+        rows = self._db.execute(
+            "SELECT input, hash, outputs FROM hashes WHERE settings = ?", (settings_digest,)
+        )
+        for input_path, value, outputs in rows:
+            self._add(value & ((1 << 64) - 1), _Record(input_path, json.loads(outputs)))
+        logger.info("Loaded %s perceptual hash(es) from %s", len(self._records), path)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def _add(self, value: int, record: _Record) -> int:
+        self._records.append(record)
+        self._hashes.append(value)
+        return self._index.add(value)
+
+    def register(self, input_path: str, value: int) -> IndexedInput:
+        """Match ``value`` against known inputs, or reserve an entry for this input."""
+        with self._lock:
+            found = self._index.nearest(value)
+            if found is None:
+                return IndexedInput(entry=self._add(value, _Record(input_path, None)))
+            entry, distance = found
+            record = self._records[entry]
+            if record.input != input_path and (
+                record.outputs is None or _outputs_exist(record.outputs)
+            ):
+                return IndexedInput(entry=entry, duplicate_of=record.input, distance=distance)
+            # The same input seen again, or a match whose outputs are gone: regenerate.
+            if record.input != input_path:
+                # The new input takes over the entry; drop the dead row so it is not reloaded.
+                self._db.execute(
+                    "DELETE FROM hashes WHERE input = ? AND settings = ?",
+                    (record.input, self._settings),
+                )
+                self._db.commit()
+            if self._hashes[entry] != value:
+                self._index.replace(entry, value)
+                self._hashes[entry] = value
+            self._records[entry] = _Record(input_path, None)
+            return IndexedInput(entry=entry)
+
+    def outputs(self, entry: int) -> list[str] | None:
+        """Outputs recorded for ``entry``; ``None`` while it is still being generated."""
+        with self._lock:
+            return self._records[entry].outputs
+
+    def complete(self, entry: int, outputs: Sequence[str]) -> None:
+        """Record the outputs generated for the input owning ``entry`` and persist it."""
+        with self._lock:
+            record = self._records[entry]
+            record.outputs = list(outputs)
+            self._db.execute(
+                "INSERT OR REPLACE INTO hashes (input, settings, hash, outputs) "
+                "VALUES (?, ?, ?, ?)",
+                (
+                    record.input,
+                    self._settings,
+                    _signed(self._hashes[entry]),
+                    json.dumps(record.outputs),
+                ),
+            )
+            self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def link_or_copy(source: Path, target: Path) -> Path:
+    """Hard-link ``source`` to ``target``, copying when linking is not possible."""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    if target.exists():
+        target.unlink()
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+    return target
@@ -0,0 +1,311 @@
+"""Staged execution engine that overlaps pipeline stages."""
+
+from __future__ import annotations
+
+import multiprocessing
+import queue
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from .logging_utils import configure_logging, get_logger
+from .memory import MemoryBudget
+
+logger = get_logger(__name__)
+
+STAGE_MODES = {"inline", "thread", "process"}
+
+_END = object()
+_DUE = object()
+_POLL_INTERVAL = 0.1
+
+# Stage callables installed in process-pool workers, keyed by stage name.
+_PROCESS_STAGES: dict[str, Callable[[Any], Any]] = {}
+
+
+@dataclass
+class _BatchDeadline:
+    """When the batch being filled is due, ``max_wait`` after its first item arrived."""
+
+    max_wait: float | None
+    at: float | None = None
+
+
+def _batched(
+    values: Iterable[Any], size: int, deadline: _BatchDeadline | None = None
+) -> Iterator[list[Any]]:
+    """Yield consecutive lists of at most ``size`` values, cut short wherever one fell due.
+
+    ``values`` must be the reader that shares ``deadline``: the deadline is set when a batch
+    receives its first value and cleared when the batch is yielded.
+    """
+    batch: list[Any] = []
+    for value in values:
+        if value is not _DUE:
+            batch.append(value)
+            if len(batch) == 1 and deadline is not None and deadline.max_wait is not None:
+                deadline.at = time.monotonic() + deadline.max_wait
+        if batch and (len(batch) == size or value is _DUE):
+            if deadline is not None:
+                deadline.at = None
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+@dataclass
+class Stage:
+    """A pipeline stage executed by its own worker pool.
+
+    ``fn`` receives one item (or a list of up to ``batch_size`` items when ``batch_size > 1``)
+    and returns the result (or a list of results, one per item). Items for which a stage
+    returns ``None`` are dropped. ``inline`` stages run on the stage's dispatcher thread, which
+    suits components that must not be shared, such as a loaded generator model. With
+    ``max_wait`` set, a batched stage runs a partial batch once that many seconds have passed
+    since its first item arrived, instead of waiting for the batch to fill.
+    """
+
+    name: str
+    fn: Callable[[Any], Any]
+    workers: int = 1
+    mode: str = "thread"
+    batch_size: int = 1
+    max_wait: float | None = None
+
+    def __post_init__(self) -> None:
+        if self.mode not in STAGE_MODES:
+            raise ValueError(f"Stage mode must be one of {STAGE_MODES}")
+        if self.workers < 1 or self.batch_size < 1:
+            raise ValueError("Stage workers and batch_size must be positive")
+
+
+@dataclass
+class _Pending:
+    future: Future
+    expand: bool
+
+
+@dataclass
+class _Failure:
+    error: BaseException
+
+
+def _install_process_stage(
+    name: str, fn: Callable[[Any], Any], log_config: tuple[str, Path] | None
+) -> None:
+    # Spawned workers start with loguru's defaults, not the parent's sinks.
+    if log_config is not None:
+        configure_logging(*log_config)
+    _PROCESS_STAGES[name] = fn
+
+
+def _call_process_stage(name: str, payload: Any) -> Any:
+    return _PROCESS_STAGES[name](payload)
+
+
+def _get(inbox: queue.Queue, stop: threading.Event, deadline: float | None = None) -> Any:
+    """Next entry of ``inbox``; ``_DUE`` once the monotonic ``deadline`` passes without one."""
+    while not stop.is_set():
+        timeout = _POLL_INTERVAL
+        if deadline is not None:
+            timeout = min(timeout, deadline - time.monotonic())
+            if timeout <= 0:
+                return _DUE
+        try:
+            return inbox.get(timeout=timeout)
+        except queue.Empty:
+            continue
+    return _END
+
+
+def _put(outbox: queue.Queue, entry: Any, stop: threading.Event) -> bool:
+    while not stop.is_set():
+        try:
+            outbox.put(entry, timeout=_POLL_INTERVAL)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _resolved(
+    inbox: queue.Queue,
+    stop: threading.Event,
+    on_drop: Callable[[], None] | None = None,
+    deadline: _BatchDeadline | None = None,
+) -> Iterator[Any]:
+    """Yield upstream results in submission order, waiting on pending futures.
+
+    ``on_drop`` is called once for every ``None`` result that is dropped. With a ``deadline``,
+    ``_DUE`` is yielded whenever it passes before the next entry arrives.
+    """
+    while True:
+        entry = _get(inbox, stop, deadline.at if deadline is not None else None)
+        if entry is _END:
+            return
+        if entry is _DUE:
+            yield entry
+            continue
+        if isinstance(entry, _Failure):
+            raise entry.error
+        if isinstance(entry, _Pending):
+            result = entry.future.result()
+            values = result if entry.expand else [result]
+        else:
+            values = [entry]
+        for value in values:
+            if value is not None:
+                yield value
+            elif on_drop is not None:
+                on_drop()
+
+
+class StagedExecutor:
+    """Run items through a chain of stages connected by bounded queues.
+
+    Every stage has a dispatcher thread that submits work to the stage's pool as soon as
+    upstream results arrive, so decoding, preprocessing, generation and encoding overlap.
+    Results are forwarded in submission order, which keeps the output order identical to the
+    input order regardless of worker counts. At most ``queue_size`` entries wait between two
+    stages, bounding the memory held by in-flight images. With a ``budget``, new items are only
+    fed while it admits them; an item stops counting against it once it leaves the last stage
+    or is dropped. ``log_config`` is the ``(level, log_dir)`` that process-pool workers pass
+    to :func:`configure_logging`.
+    """
+
+    def __init__(
+        self,
+        stages: Sequence[Stage],
+        queue_size: int = 8,
+        budget: MemoryBudget | None = None,
+        log_config: tuple[str, Path] | None = None,
+    ) -> None:
+        if not stages:
+            raise ValueError("StagedExecutor requires at least one stage")
+        largest_batch = max(stage.batch_size for stage in stages)
+        if budget is not None and budget.min_in_flight < largest_batch:
+            # A batched stage waits for a full batch, which a smaller budget would never admit.
+            raise ValueError("budget.min_in_flight must cover the largest stage batch_size")
+        self._stages = list(stages)
+        self._queue_size = queue_size
+        self._budget = budget
+        self._log_config = log_config
+
+    def _make_pool(self, stage: Stage) -> Executor | None:
+        if stage.mode == "thread":
+            return ThreadPoolExecutor(max_workers=stage.workers, thread_name_prefix=stage.name)
+        if stage.mode == "process":
+            return ProcessPoolExecutor(
+                max_workers=stage.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_install_process_stage,
+                initargs=(stage.name, stage.fn, self._log_config),
+            )
+        return None
+
+    def run(self, items: Iterable[Any]) -> Iterator[Any]:
+        """Yield the final stage's results for ``items``, in input order."""
+        stop = threading.Event()
+        queues: list[queue.Queue] = [
+            queue.Queue(maxsize=self._queue_size) for _ in range(len(self._stages) + 1)
+        ]
+        pools = [self._make_pool(stage) for stage in self._stages]
+        logger.debug(
+            "Starting staged executor: %s",
+            ", ".join(f"{stage.name}[{stage.mode}x{stage.workers}]" for stage in self._stages),
+        )
+        on_drop = self._budget.release if self._budget is not None else None
+        threads = [
+            threading.Thread(
+                target=self._feed,
+                args=(items, queues[0], stop, self._budget),
+                name="feed",
+                daemon=True,
+            )
+        ]
+        for idx, stage in enumerate(self._stages):
+            threads.append(
+                threading.Thread(
+                    target=self._dispatch,
+                    args=(stage, pools[idx], queues[idx], queues[idx + 1], stop, on_drop),
+                    name=f"{stage.name}-dispatch",
+                    daemon=True,
+                )
+            )
+
+        for thread in threads:
+            thread.start()
+        try:
+            for value in _resolved(queues[-1], stop, on_drop):
+                if self._budget is not None:
+                    self._budget.release()
+                yield value
+        finally:
+            stop.set()
+            for pool in pools:
+                if pool is not None:
+                    pool.shutdown(wait=False, cancel_futures=True)
+            for thread in threads[1:]:
+                thread.join()
+            # A feed blocked in an open-ended source, such as a watched folder, only notices
+            # the stop on its next item; it is a daemon thread and is not waited for.
+            threads[0].join(timeout=_POLL_INTERVAL)
+            for pool in pools:
+                if pool is not None:
+                    pool.shutdown(wait=True)
+
+    @staticmethod
+    def _feed(
+        items: Iterable[Any],
+        outbox: queue.Queue,
+        stop: threading.Event,
+        budget: MemoryBudget | None,
+    ) -> None:
+        try:
+            for item in items:
+                if budget is not None and not budget.acquire(stop):
+                    return
+                if not _put(outbox, item, stop):
+                    return
+        except Exception as exc:
+            _put(outbox, _Failure(exc), stop)
+            return
+        _put(outbox, _END, stop)
+
+    @staticmethod
+    def _dispatch(
+        stage: Stage,
+        pool: Executor | None,
+        inbox: queue.Queue,
+        outbox: queue.Queue,
+        stop: threading.Event,
+        on_drop: Callable[[], None] | None = None,
+    ) -> None:
+        expand = stage.batch_size > 1
+        try:
+            deadline = _BatchDeadline(stage.max_wait) if expand else None
+            upstream = _resolved(inbox, stop, on_drop, deadline)
+            payloads = _batched(upstream, stage.batch_size, deadline) if expand else upstream
+            for payload in payloads:
+                if pool is None:
+                    result = stage.fn(payload)
+                    for value in result if expand else [result]:
+                        if not _put(outbox, value, stop):
+                            return
+                    continue
+
+                if isinstance(pool, ProcessPoolExecutor):
+                    future = pool.submit(_call_process_stage, stage.name, payload)
+                else:
+                    future = pool.submit(stage.fn, payload)
+                if not _put(outbox, _Pending(future, expand), stop):
+                    return
+        except Exception as exc:
+            _put(outbox, _Failure(exc), stop)
+            return
+        _put(outbox, _END, stop)
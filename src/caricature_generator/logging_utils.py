@@ -3,7 +3,6 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Optional
 
 from loguru import logger
 
@@ -23,7 +22,7 @@ def configure_logging(level: str, log_dir: Path) -> None:
     logger.add(log_dir / "pipeline.log", level=level.upper(), rotation="10 MB", retention=5)
 
 
-def get_logger(name: Optional[str] = None):
+def get_logger(name: str | None = None):
     """Return a child logger for module-scoped logging."""
     return logger.bind(module=name or __name__)
 
@@ -0,0 +1,118 @@
+"""Append-only run manifest used to resume interrupted runs."""
+
+from __future__ import annotations
+
+import json
+import os
+from collections.abc import Sequence
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+from .archives import archive_member_path
+from .logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+MANIFEST_NAME = "manifest.jsonl"
+
+
+def manifest_name(shard_index: int = 0, shard_count: int = 1) -> str:
+    """Manifest file of one shard; unsharded runs use :data:`MANIFEST_NAME`."""
+    if shard_count == 1:
+        return MANIFEST_NAME
+    return f"manifest.shard-{shard_index}-of-{shard_count}.jsonl"
+
+
+def file_fingerprint(path: Path, settings_digest: str) -> str:
+    """Cheap identity of an input file version under a given set of output settings."""
+    stat = path.stat()
+    return f"{stat.st_size}:{stat.st_mtime_ns}:{settings_digest}"
+
+
+def content_fingerprint(size: int, content_hash: str, settings_digest: str) -> str:
+    """Identity of an input without a file of its own, such as a tar shard member."""
+    return f"{size}:{content_hash}:{settings_digest}"
+
+
+def _output_exists(output: str) -> bool:
+    path = Path(output)
+    shard = archive_member_path(path)
+    return path.exists() or (shard is not None and shard.is_file())
+
+
+@dataclass
+class ManifestRecord:
+    """One completed input and the outputs generated for it."""
+
+    input: str
+    fingerprint: str
+    outputs: list[str]
+    metadata: list[dict[str, Any]] = field(default_factory=list)
+
+
+class RunManifest:
+    """JSON Lines log of completed inputs stored in the output directory.
+
+    A record is appended and flushed as soon as an input's outputs are written, so a crashed
+    run loses at most the inputs that were still in flight. Later records for the same input
+    supersede earlier ones.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._handle: Any | None = None
+
+    def load(self) -> dict[str, ManifestRecord]:
+        """Return the latest record per input, skipping a truncated trailing line."""
+        records: dict[str, ManifestRecord] = {}
+        if not self.path.exists():
+            return records
+        with self.path.open("r", encoding="utf-8") as fh:
+            for line_number, line in enumerate(fh, start=1):
+                try:
+                    record = ManifestRecord(**json.loads(line))
+                except (json.JSONDecodeError, TypeError) as exc:
+                    logger.warning("Ignoring manifest line %s: %s", line_number, exc)
+                    continue
+                records[record.input] = record
+        return records
+
+    @classmethod
+    def load_directory(cls, directory: Path) -> dict[str, ManifestRecord]:
+        """Latest records across every manifest in ``directory``, including shard manifests."""
+        records: dict[str, ManifestRecord] = {}
+        for path in sorted(directory.glob("manifest*.jsonl")):
+            records.update(cls(path).load())
+        return records
+
+    @staticmethod
+    def is_complete(record: ManifestRecord | None, fingerprint: str) -> bool:
+        """Whether ``record`` covers this input version and all of its outputs still exist."""
+        return (
+            record is not None
+            and record.fingerprint == fingerprint
+            and all(_output_exists(output) for output in record.outputs)
+        )
+
+    def append(self, record: ManifestRecord) -> None:
+        if self._handle is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._handle = self.path.open("a", encoding="utf-8")
+        self._handle.write(json.dumps(asdict(record), default=str) + "\n")
+        self._handle.flush()
+        os.fsync(self._handle.fileno())
+
+    def merge(self, paths: Sequence[Path]) -> None:
+        """Append every record of the manifests at ``paths`` to this one, then delete them."""
+        for path in paths:
+            if path == self.path or not path.exists():
+                continue
+            for record in RunManifest(path).load().values():
+                self.append(record)
+            path.unlink()
+
+    def close(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
@@ -0,0 +1,74 @@
+"""Process memory readings and an RSS budget that limits how many inputs are in flight."""
+
+from __future__ import annotations
+
+import os
+import resource
+import sys
+import threading
+
+_MIB = 1024 * 1024
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kibibytes, macOS reports bytes.
+    return peak / _MIB if sys.platform == "darwin" else peak / 1024
+
+
+def current_rss_mb() -> float:
+    """Current resident set size in MiB; the peak on platforms without ``/proc``."""
+    try:
+        with open("/proc/self/statm", "rb") as fh:
+            resident_pages = int(fh.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return peak_rss_mb()
+    return resident_pages * _PAGE_SIZE / _MIB
+
+
+class MemoryBudget:
+    """Admit new inputs only while the process stays below ``limit_mb`` of resident memory.
+
+    Above the limit, admission waits until an in-flight input completes and memory has dropped
+    again. Up to ``min_in_flight`` inputs are always admitted, so a budget below the model's
+    own footprint degrades to one batch at a time instead of stalling the run; it must be at
+    least the largest batch a stage waits for.
+    """
+
+    def __init__(
+        self, limit_mb: float, min_in_flight: int = 1, poll_interval: float = 0.05
+    ) -> None:
+        self.limit_mb = limit_mb
+        self.min_in_flight = max(1, min_in_flight)
+        self._poll_interval = poll_interval
+        self._condition = threading.Condition()
+        self._in_flight = 0
+        self.peak_in_flight = 0
+        self.throttled = 0
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def acquire(self, stop: threading.Event) -> bool:
+        """Wait for room for one more input; ``False`` when ``stop`` is set while waiting."""
+        with self._condition:
+            waited = False
+            while self._in_flight >= self.min_in_flight and current_rss_mb() >= self.limit_mb:
+                if stop.is_set():
+                    return False
+                waited = True
+                # Memory can also drop without a release, e.g. after garbage collection.
+                self._condition.wait(timeout=self._poll_interval)
+            self.throttled += waited
+            self._in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self._in_flight)
+            return True
+
+    def release(self) -> None:
+        """Mark one admitted input as finished or dropped."""
+        with self._condition:
+            self._in_flight = max(0, self._in_flight - 1)
+            self._condition.notify_all()
@@ -0,0 +1,165 @@
+"""Per-stage timing spans, counters and latency histograms for pipeline runs."""
+
+from __future__ import annotations
+
+import json
+import re
+import threading
+import time
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+METRIC_PREFIX = "caricature"
+
+
+@dataclass
+class Histogram:
+    """Cumulative-bucket latency histogram in seconds, compatible with Prometheus."""
+
+    buckets: Sequence[float] = DEFAULT_BUCKETS
+    counts: list[int] = field(default_factory=list)
+    total: float = 0.0
+    count: int = 0
+
+    def __post_init__(self) -> None:
+        if not self.counts:
+            self.counts = [0] * len(self.buckets)
+
+    def observe(self, value: float) -> None:
+        for idx, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[idx] += 1
+        self.total += value
+        self.count += 1
+
+    def merge(self, other: Histogram) -> None:
+        for idx, value in enumerate(other.counts):
+            self.counts[idx] += value
+        self.total += other.total
+        self.count += other.count
+
+
+class PipelineMetrics:
+    """Thread-safe collection of stage spans, counters and gauges.
+
+    Components record into their own instance; stage functions running in worker pools call
+    :meth:`drain` and ship the result back with the work item so it can be merged into the
+    run-level instance, which keeps spans recorded inside worker processes.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.histograms: dict[str, Histogram] = {}
+        self.counters: dict[str, float] = {}
+        self.gauges: dict[str, float] = {}
+
+    def __getstate__(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "histograms": self.histograms,
+                "counters": self.counters,
+                "gauges": self.gauges,
+            }
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.histograms.setdefault(stage, Histogram()).observe(seconds)
+
+    @contextmanager
+    def span(self, stage: str) -> Iterator[None]:
+        """Time the enclosed block and record it under ``stage``."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def increment(self, name: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0.0) + amount
+
+    def set_max(self, name: str, value: float) -> None:
+        """Keep the largest value seen for gauge ``name``."""
+        with self._lock:
+            self.gauges[name] = max(self.gauges.get(name, value), value)
+
+    def drain(self) -> PipelineMetrics:
+        """Move everything recorded so far into a new instance and reset this one."""
+        drained = PipelineMetrics()
+        with self._lock:
+            drained.histograms, self.histograms = self.histograms, {}
+            drained.counters, self.counters = self.counters, {}
+            drained.gauges, self.gauges = self.gauges, {}
+        return drained
+
+    def merge(self, other: PipelineMetrics) -> None:
+        state = other.__getstate__()
+        with self._lock:
+            for stage, histogram in state["histograms"].items():
+                self.histograms.setdefault(stage, Histogram(buckets=histogram.buckets)).merge(
+                    histogram
+                )
+            for name, value in state["counters"].items():
+                self.counters[name] = self.counters.get(name, 0.0) + value
+            for name, value in state["gauges"].items():
+                self.gauges[name] = max(self.gauges.get(name, value), value)
+
+    def to_dict(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "stages": {
+                    stage: {
+                        "count": histogram.count,
+                        "total_seconds": histogram.total,
+                        "mean_seconds": (
+                            histogram.total / histogram.count if histogram.count else 0.0
+                        ),
+                        "buckets": dict(
+                            zip(map(str, histogram.buckets), histogram.counts, strict=True)
+                        ),
+                    }
+                    for stage, histogram in sorted(self.histograms.items())
+                },
+                "counters": dict(sorted(self.counters.items())),
+                "gauges": dict(sorted(self.gauges.items())),
+            }
+
+    def to_prometheus(self) -> str:
+        """Render the metrics in the Prometheus text exposition format."""
+        name = f"{METRIC_PREFIX}_stage_seconds"
+        lines = [f"# HELP {name} Time spent per pipeline stage.", f"# TYPE {name} histogram"]
+        with self._lock:
+            for stage, histogram in sorted(self.histograms.items()):
+                for bound, value in zip(histogram.buckets, histogram.counts, strict=True):
+                    lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {value}')
+                lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+                lines.append(f'{name}_sum{{stage="{stage}"}} {histogram.total}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {histogram.count}')
+            for counter, value in sorted(self.counters.items()):
+                metric = f"{METRIC_PREFIX}_{_sanitise(counter)}_total"
+                lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+            for gauge, value in sorted(self.gauges.items()):
+                metric = f"{METRIC_PREFIX}_{_sanitise(gauge)}"
+                lines += [f"# TYPE {metric} gauge", f"{metric} {value}"]
+        return "\n".join(lines) + "\n"
+
+    def export(self, directory: Path) -> tuple[Path, Path]:
+        """Write ``metrics.json`` and ``metrics.prom`` into ``directory``."""
+        directory.mkdir(parents=True, exist_ok=True)
+        json_path = directory / "metrics.json"
+        prom_path = directory / "metrics.prom"
+        json_path.write_text(json.dumps(self.to_dict(), indent=2), encoding="utf-8")
+        prom_path.write_text(self.to_prometheus(), encoding="utf-8")
+        return json_path, prom_path
+
+
+def _sanitise(name: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_]", "_", name)
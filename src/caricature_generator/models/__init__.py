@@ -1,6 +1,38 @@
-"""Model backends for caricature generation."""
+"""Model backends for caricature generation.
 
-from .diffusers_wrapper import DiffusersCaricatureModel
+Backends are imported on first attribute access so that importing the package (for example to
+validate a config) never pulls in torch or diffusers.
+"""
 
-__all__ = ["DiffusersCaricatureModel"]
+from __future__ import annotations
 
+from importlib import import_module
+from typing import Any
+
+__all__ = [
+    "CaricatureGenerator",
+    "ClassicalCaricatureModel",
+    "DiffusersCaricatureModel",
+    "DiffusersInput",
+    "StubCaricatureModel",
+    "available_backends",
+    "create_generator",
+    "register_backend",
+]
+
+_EXPORTS = {
+    "CaricatureGenerator": ".base",
+    "ClassicalCaricatureModel": ".classical",
+    "DiffusersCaricatureModel": ".diffusers_wrapper",
+    "DiffusersInput": ".diffusers_wrapper",
+    "StubCaricatureModel": ".stub",
+    "available_backends": ".registry",
+    "create_generator": ".registry",
+    "register_backend": ".registry",
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name in _EXPORTS:
+        return getattr(import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(name)
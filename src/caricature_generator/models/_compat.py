@@ -0,0 +1,19 @@
+"""Compatibility shims applied before importing diffusers."""
+
+from __future__ import annotations
+
+
+def patch_huggingface_hub() -> None:
+    """Provide ``huggingface_hub.cached_download`` for diffusers releases that still import it."""
+    try:  # pragma: no cover - defensive shim for newer huggingface_hub
+        import huggingface_hub
+
+        if not hasattr(huggingface_hub, "cached_download"):
+            from huggingface_hub import hf_hub_download
+
+            def _cached_download(*args, **kwargs):
+                return hf_hub_download(*args, **kwargs)
+
+            huggingface_hub.cached_download = _cached_download  # type: ignore[attr-defined]
+    except Exception:  # pragma: no cover - best effort shim
+        pass
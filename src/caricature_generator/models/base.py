@@ -0,0 +1,38 @@
+"""Interface shared by every caricature generator backend."""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Sequence
+from typing import TYPE_CHECKING, Protocol, runtime_checkable
+
+from PIL import Image
+
+from ..metrics import PipelineMetrics
+
+if TYPE_CHECKING:
+    from .diffusers_wrapper import DiffusersInput
+
+
+@runtime_checkable
+class CaricatureGenerator(Protocol):
+    """What the pipeline and the server expect from a backend.
+
+    ``generate_batch`` receives one prompt entry (a bundle or an iterable of bundles) per base
+    image and returns the stylised outputs per base image, in bundle order. Backends record
+    their own spans and counters in ``metrics``; callers drain them into the run metrics.
+    ``warmup`` starts any expensive loading without blocking; generation waits for it.
+    """
+
+    metrics: PipelineMetrics
+
+    def warmup(self) -> None: ...
+
+    def generate(
+        self, base_image: Image.Image, prompts: DiffusersInput | Iterable[DiffusersInput]
+    ) -> list[Image.Image]: ...
+
+    def generate_batch(
+        self,
+        base_images: Sequence[Image.Image],
+        prompts: Sequence[DiffusersInput | Iterable[DiffusersInput]],
+    ) -> list[list[Image.Image]]: ...
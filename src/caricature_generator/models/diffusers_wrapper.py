@@ -2,54 +2,176 @@
 
 from __future__ import annotations
 
+import json
+import threading
+from collections import Counter, OrderedDict
+from collections.abc import Iterable, Sequence
+from contextlib import AbstractContextManager, nullcontext
 from dataclasses import dataclass
-from typing import Iterable, Optional
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
 
-import torch
-from diffusers import DPMSolverMultistepScheduler, StableDiffusionImg2ImgPipeline
 from PIL import Image
 
 from ..config import ModelConfig
 from ..logging_utils import get_logger
+from ..metrics import PipelineMetrics
+from ._compat import patch_huggingface_hub
+
+if TYPE_CHECKING:
+    from diffusers import StableDiffusionImg2ImgPipeline
 
 logger = get_logger(__name__)
 
+# Written last by :meth:`DiffusersCaricatureModel.save_snapshot`, so only complete snapshots load.
+SNAPSHOT_MARKER = "caricature_snapshot.json"
+
 
 @dataclass
 class DiffusersInput:
     """Container for inputs passed to the diffusers pipeline."""
 
     prompt: str
-    negative_prompt: Optional[str]
+    negative_prompt: str | None
     strength: float
-    guidance_scale: Optional[float] = None
+    guidance_scale: float | None = None
+
+
+class PromptEmbeddingCache:
+    """Least-recently-used cache of text-encoder outputs keyed by model id and prompt text."""
+
+    def __init__(self, max_entries: int) -> None:
+        self._max_entries = max_entries
+        self._entries: OrderedDict[tuple[str, str], Any] = OrderedDict()
+
+    def get(self, key: tuple[str, str]) -> Any | None:
+        embeds = self._entries.get(key)
+        if embeds is not None:
+            self._entries.move_to_end(key)
+        return embeds
+
+    def put(self, key: tuple[str, str], embeds: Any) -> None:
+        if self._max_entries <= 0:
+            return
+        self._entries[key] = embeds
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
 
 
 class DiffusersCaricatureModel:
-    """Wrapper around a Diffusers pipeline geared towards caricature generation."""
+    """Wrapper around a Diffusers pipeline geared towards caricature generation.
 
-    def __init__(self, config: ModelConfig, device: str = "cuda") -> None:
+    Prompts repeat across images, so their text embeddings are computed once and kept in a
+    :class:`PromptEmbeddingCache` of ``config.prompt_cache_size`` entries; the pipeline then
+    receives ``prompt_embeds``/``negative_prompt_embeds`` instead of strings.
+
+    The model is loaded on first use, or earlier on a background thread by :meth:`warmup`.
+    When ``config.snapshot_dir`` holds a snapshot written by :meth:`save_snapshot`, it is loaded
+    from local memory-mapped safetensors instead of resolving ``pretrained_model``.
+    ``config.acceleration`` selects optional speed-ups, applied once after loading.
+    """
+
+    def __init__(
+        self,
+        config: ModelConfig,
+        device: str = "cuda",
+        batch_size: int = 1,
+        metrics: PipelineMetrics | None = None,
+    ) -> None:
         self._config = config
-        self._device = self._resolve_device(device)
-        self._pipeline: Optional[StableDiffusionImg2ImgPipeline] = None
+        self._batch_size = max(1, batch_size)
+        self._requested_device = device
+        self._device = device
+        self._pipeline: StableDiffusionImg2ImgPipeline | None = None
+        self._load_lock = threading.Lock()
+        self._warmup_thread: threading.Thread | None = None
+        self._prompt_cache = PromptEmbeddingCache(config.prompt_cache_size)
+        self.metrics = metrics or PipelineMetrics()
 
     @staticmethod
     def _resolve_device(device: str) -> str:
+        import torch
+
         if device == "cuda" and not torch.cuda.is_available():
             logger.warning("CUDA requested but not available. Falling back to CPU.")
             return "cpu"
         return device
 
+    def warmup(self) -> None:
+        """Start loading the model on a background thread; generation waits for it to finish."""
+        if self._pipeline is not None or self._warmup_thread is not None:
+            return
+        self._warmup_thread = threading.Thread(
+            target=self._background_load, name="model-warmup", daemon=True
+        )
+        self._warmup_thread.start()
+
+    def _background_load(self) -> None:
+        try:
+            self._load_pipeline()
+        except Exception as exc:  # the first generate call retries and raises
+            logger.warning("Background model load failed: %s", exc)
+
     def _load_pipeline(self) -> StableDiffusionImg2ImgPipeline:
-        if self._pipeline:
+        if self._pipeline is not None:
             return self._pipeline
+        with self._load_lock:
+            if self._pipeline is None:
+                with self.metrics.span("model_load"):
+                    self._pipeline = self._build_pipeline()
+        return self._pipeline
 
-        logger.info("Loading diffusers pipeline %s", self._config.pretrained_model)
-        pipe = StableDiffusionImg2ImgPipeline.from_pretrained(
-            self._config.pretrained_model,
-            safety_checker=None,
-            torch_dtype=torch.float16 if self._device == "cuda" else torch.float32,
-        )
+    def _snapshot_source(self) -> Path | None:
+        """The configured snapshot directory, if it holds a snapshot of ``pretrained_model``."""
+        directory = self._config.snapshot_dir
+        if directory is None:
+            return None
+        marker = directory / SNAPSHOT_MARKER
+        if not marker.is_file():
+            logger.warning("No model snapshot in %s; loading from the hub instead", directory)
+            return None
+        source = json.loads(marker.read_text(encoding="utf-8")).get("pretrained_model")
+        if source != self._config.pretrained_model:
+            logger.warning(
+                "Snapshot in %s was made from %s, not %s; ignoring it",
+                directory,
+                source,
+                self._config.pretrained_model,
+            )
+            return None
+        return directory
+
+    def _build_pipeline(self) -> StableDiffusionImg2ImgPipeline:
+        # torch and diffusers take seconds to import, so they are only loaded with the model.
+        import torch
+
+        patch_huggingface_hub()
+        from diffusers import DPMSolverMultistepScheduler, StableDiffusionImg2ImgPipeline
+
+        self._device = self._resolve_device(self._requested_device)
+        dtype = torch.float16 if self._device == "cuda" else torch.float32
+        snapshot = self._snapshot_source()
+        if snapshot is not None:
+            logger.info("Loading diffusers snapshot %s", snapshot)
+            # Safetensors are memory-mapped and low_cpu_mem_usage skips the random init, so each
+            # weight is read once, straight from the page cache when other processes share it.
+            pipe = StableDiffusionImg2ImgPipeline.from_pretrained(
+                snapshot,
+                safety_checker=None,
+                torch_dtype=dtype,
+                use_safetensors=True,
+                low_cpu_mem_usage=True,
+                local_files_only=True,
+            )
+        else:
+            logger.info("Loading diffusers pipeline %s", self._config.pretrained_model)
+            pipe = StableDiffusionImg2ImgPipeline.from_pretrained(
+                self._config.pretrained_model,
+                safety_checker=None,
+                torch_dtype=dtype,
+                low_cpu_mem_usage=True,
+            )
 
         if self._config.scheduler != "DPMSolverMultistepScheduler":
             logger.warning(
@@ -57,31 +179,210 @@ class DiffusersCaricatureModel:
                 self._config.scheduler,
             )
 
-        pipe.scheduler = DPMSolverMultistepScheduler.from_config(pipe.scheduler.config)
+        # Snapshots already store the DPM-Solver scheduler.
+        if not isinstance(pipe.scheduler, DPMSolverMultistepScheduler):
+            pipe.scheduler = DPMSolverMultistepScheduler.from_config(pipe.scheduler.config)
 
         pipe.to(self._device)
-        self._pipeline = pipe
+        self._accelerate(pipe)
         return pipe
 
+    def _autocast(self) -> AbstractContextManager[Any]:
+        """bfloat16 autocast on CPU when enabled; GPUs already run in float16."""
+        if not self._config.acceleration.bf16_autocast or self._device != "cpu":
+            return nullcontext()
+        import torch
+
+        return torch.autocast("cpu", dtype=torch.bfloat16)
+
+    def _accelerate(self, pipe: StableDiffusionImg2ImgPipeline) -> None:
+        """Apply the configured memory-format, attention and compilation options."""
+        import torch
+
+        options = self._config.acceleration
+        if options.channels_last:
+            pipe.unet.to(memory_format=torch.channels_last)
+            pipe.vae.to(memory_format=torch.channels_last)
+        if options.attention_slicing:
+            pipe.enable_attention_slicing()
+        if not options.compile:
+            return
+
+        pipe.unet = torch.compile(pipe.unet, mode=options.compile_mode)
+        pipe.vae.decode = torch.compile(pipe.vae.decode, mode=options.compile_mode)
+        # Compilation happens on the first call, per input shape; pay for it here instead of on
+        # the first real batch. Classifier-free guidance doubles the UNet batch, as in real runs.
+        size = options.compile_warmup_size
+        with self.metrics.span("compile_warmup"), self._autocast():
+            pipe(
+                prompt=[""] * self._batch_size,
+                image=[Image.new("RGB", (size, size))] * self._batch_size,
+                strength=1.0,
+                guidance_scale=self._config.guidance_scale,
+                num_inference_steps=2,
+            )
+
+    def save_snapshot(self, directory: Path) -> Path:
+        """Save the loaded pipeline to ``directory`` as safetensors for fast local loading.
+
+        Weights are stored in the dtype used on this model's device, so loading needs no cast.
+        """
+        pipe = self._load_pipeline()
+        directory.mkdir(parents=True, exist_ok=True)
+        pipe.save_pretrained(directory, safe_serialization=True)
+        marker = {
+            "pretrained_model": self._config.pretrained_model,
+            "dtype": str(pipe.dtype),
+            "scheduler": type(pipe.scheduler).__name__,
+        }
+        (directory / SNAPSHOT_MARKER).write_text(json.dumps(marker, indent=2), encoding="utf-8")
+        logger.info("Saved model snapshot to %s", directory)
+        return directory
+
+    def _embed(self, pipe: StableDiffusionImg2ImgPipeline, text: str) -> Any:
+        """Text-encoder output for ``text``, computed at most once while it stays cached."""
+        key = (self._config.pretrained_model, text)
+        embeds = self._prompt_cache.get(key)
+        if embeds is not None:
+            self.metrics.increment("prompt_cache_hits")
+            return embeds
+        self.metrics.increment("prompt_cache_misses")
+        with self.metrics.span("encode_prompt"):
+            embeds, _ = pipe.encode_prompt(
+                text,
+                device=self._device,
+                num_images_per_prompt=1,
+                do_classifier_free_guidance=False,
+            )
+        self._prompt_cache.put(key, embeds)
+        return embeds
+
+    def _prompt_kwargs(
+        self,
+        pipe: StableDiffusionImg2ImgPipeline,
+        bundles: Sequence[DiffusersInput],
+        guidance: float,
+    ) -> dict[str, Any]:
+        """Prompt arguments for one batched call, from cached embeddings when enabled."""
+        negatives = [bundle.negative_prompt for bundle in bundles]
+        if self._config.prompt_cache_size <= 0:
+            return {
+                "prompt": [bundle.prompt for bundle in bundles],
+                "negative_prompt": (
+                    None
+                    if all(neg is None for neg in negatives)
+                    else [neg or "" for neg in negatives]
+                ),
+            }
+
+        import torch
+
+        kwargs = {
+            "prompt_embeds": torch.cat([self._embed(pipe, bundle.prompt) for bundle in bundles])
+        }
+        # Without classifier-free guidance the unconditional branch is never evaluated.
+        if guidance > 1.0:
+            kwargs["negative_prompt_embeds"] = torch.cat(
+                [self._embed(pipe, neg or "") for neg in negatives]
+            )
+        return kwargs
+
+    def _encode_images(
+        self, pipe: StableDiffusionImg2ImgPipeline, images: Sequence[Image.Image]
+    ) -> Any:
+        """Scaled VAE latents of equally sized ``images``, which img2img accepts as ``image``."""
+        import torch
+
+        with self.metrics.span("vae_encode"), torch.no_grad(), self._autocast():
+            pixels = pipe.image_processor.preprocess(list(images)).to(
+                device=self._device, dtype=pipe.vae.dtype
+            )
+            latents = pipe.vae.encode(pixels).latent_dist.sample()
+        return latents * pipe.vae.config.scaling_factor
+
+    def _shared_latents(
+        self, pipe: StableDiffusionImg2ImgPipeline, base_images: Sequence[Image.Image]
+    ) -> list[Any]:
+        """Latents of every base image, encoded once in same-size batches of ``batch_size``."""
+        by_size: dict[tuple[int, int], list[int]] = {}
+        for idx, image in enumerate(base_images):
+            by_size.setdefault(image.size, []).append(idx)
+        latents: list[Any] = [None] * len(base_images)
+        for indices in by_size.values():
+            for start in range(0, len(indices), self._batch_size):
+                chunk = indices[start : start + self._batch_size]
+                encoded = self._encode_images(pipe, [base_images[idx] for idx in chunk])
+                for offset, idx in enumerate(chunk):
+                    latents[idx] = encoded[offset : offset + 1]
+        return latents
+
     def generate(
         self, base_image: Image.Image, prompts: DiffusersInput | Iterable[DiffusersInput]
     ) -> list[Image.Image]:
         """Generate caricatures given one base image and one or more prompt bundles."""
+        return self.generate_batch([base_image], [prompts])[0]
+
+    def generate_batch(
+        self,
+        base_images: Sequence[Image.Image],
+        prompts: Sequence[DiffusersInput | Iterable[DiffusersInput]],
+    ) -> list[list[Image.Image]]:
+        """Generate caricatures for several base images with as few pipeline calls as possible.
+
+        ``prompts[i]`` holds the prompt bundle(s) for ``base_images[i]``. Requests that share a
+        strength, guidance scale and image size are stacked and denoised together in batches of
+        up to ``batch_size``. Outputs are returned per base image, in prompt bundle order.
+
+        When an image has several prompt variants, every base image is VAE-encoded once up front
+        and all of its variants start from those latents, so the encoder cost no longer grows
+        with the number of variants.
+        """
+        if len(base_images) != len(prompts):
+            raise ValueError("generate_batch expects one prompt entry per base image")
+
+        requests: list[tuple[int, DiffusersInput]] = []
+        for image_idx, bundles in enumerate(prompts):
+            if isinstance(bundles, DiffusersInput):
+                bundles = [bundles]
+            requests.extend((image_idx, bundle) for bundle in bundles)
+        if not requests:
+            return [[] for _ in base_images]
+
         pipe = self._load_pipeline()
-        if isinstance(prompts, DiffusersInput):
-            prompts = [prompts]
-
-        outputs: list[Image.Image] = []
-        for prompt_bundle in prompts:
-            logger.debug("Generating stylised image for prompt: %s", prompt_bundle.prompt)
-            images = pipe(
-                prompt=prompt_bundle.prompt,
-                negative_prompt=prompt_bundle.negative_prompt,
-                image=base_image,
-                strength=prompt_bundle.strength,
-                guidance_scale=prompt_bundle.guidance_scale
-                or self._config.guidance_scale,
-                num_inference_steps=self._config.num_inference_steps,
-            ).images
-            outputs.extend(images)
+        groups: dict[tuple[float, float, tuple[int, int]], list[int]] = {}
+        for position, (image_idx, bundle) in enumerate(requests):
+            guidance = bundle.guidance_scale or self._config.guidance_scale
+            key = (bundle.strength, guidance, base_images[image_idx].size)
+            groups.setdefault(key, []).append(position)
+
+        variants = Counter(image_idx for image_idx, _ in requests)
+        latents = self._shared_latents(pipe, base_images) if max(variants.values()) > 1 else None
+
+        results: list[Image.Image | None] = [None] * len(requests)
+        for (strength, guidance, _), positions in groups.items():
+            for start in range(0, len(positions), self._batch_size):
+                chunk = positions[start : start + self._batch_size]
+                bundles = [requests[pos][1] for pos in chunk]
+                if latents is None:
+                    image: Any = [base_images[requests[pos][0]] for pos in chunk]
+                else:
+                    import torch
+
+                    image = torch.cat([latents[requests[pos][0]] for pos in chunk])
+                logger.debug("Generating %s stylised image(s) in one batch", len(chunk))
+                with self._autocast():
+                    images = pipe(
+                        **self._prompt_kwargs(pipe, bundles, guidance),
+                        image=image,
+                        strength=strength,
+                        guidance_scale=guidance,
+                        num_inference_steps=self._config.num_inference_steps,
+                    ).images
+                for pos, image in zip(chunk, images, strict=True):
+                    results[pos] = image
+
+        outputs: list[list[Image.Image]] = [[] for _ in base_images]
+        for (image_idx, _), image in zip(requests, results, strict=True):
+            assert image is not None  # every request belongs to exactly one batch
+            outputs[image_idx].append(image)
         return outputs
@@ -0,0 +1,53 @@
+"""Backend registry mapping ``ModelConfig.backend`` names to generator factories."""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from importlib import import_module
+
+from ..config import ModelConfig
+from ..metrics import PipelineMetrics
+from .base import CaricatureGenerator
+
+GeneratorFactory = Callable[..., CaricatureGenerator]
+
+# Built-in backends are referenced by import path so that choosing one never imports another
+# backend's dependencies (torch and diffusers in particular).
+_BACKENDS: dict[str, str | GeneratorFactory] = {
+    "diffusers": ".diffusers_wrapper:DiffusersCaricatureModel",
+    "classical": ".classical:ClassicalCaricatureModel",
+    "stub": ".stub:StubCaricatureModel",
+}
+
+
+def register_backend(name: str, factory: GeneratorFactory) -> None:
+    """Make ``factory(config, device=..., batch_size=..., metrics=...)`` selectable by name."""
+    _BACKENDS[name] = factory
+
+
+def available_backends() -> list[str]:
+    return sorted(_BACKENDS)
+
+
+def _resolve(name: str) -> GeneratorFactory:
+    try:
+        target = _BACKENDS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown model backend {name!r}; expected one of {available_backends()}"
+        ) from None
+    if isinstance(target, str):
+        module, _, attr = target.partition(":")
+        target = getattr(import_module(module, __package__), attr)
+    return target
+
+
+def create_generator(
+    config: ModelConfig,
+    device: str = "cuda",
+    batch_size: int = 1,
+    metrics: PipelineMetrics | None = None,
+) -> CaricatureGenerator:
+    """Instantiate the backend named by ``config.backend``."""
+    factory = _resolve(config.backend)
+    return factory(config, device=device, batch_size=batch_size, metrics=metrics)
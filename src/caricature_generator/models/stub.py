@@ -0,0 +1,60 @@
+"""Deterministic CPU stand-in for the diffusion backend."""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Sequence
+from typing import TYPE_CHECKING
+
+from PIL import Image, ImageFilter, ImageOps
+
+from ..config import ModelConfig
+from ..metrics import PipelineMetrics
+
+if TYPE_CHECKING:
+    from .diffusers_wrapper import DiffusersInput
+
+
+class StubCaricatureModel:
+    """Cheap, reproducible generator with the same interface as ``DiffusersCaricatureModel``.
+
+    Each prompt bundle yields a posterised, edge-enhanced copy of the base image blended in by
+    the bundle's ``strength``. It needs no weights or accelerator, which makes it suitable for
+    benchmarks and tests of the stages surrounding generation.
+    """
+
+    def __init__(
+        self,
+        config: ModelConfig,
+        device: str = "cpu",
+        batch_size: int = 1,
+        metrics: PipelineMetrics | None = None,
+    ) -> None:
+        self._config = config
+        self._batch_size = max(1, batch_size)
+        self.metrics = metrics or PipelineMetrics()
+
+    def _stylise(self, image: Image.Image, strength: float) -> Image.Image:
+        stylised = ImageOps.posterize(image.convert("RGB"), 3).filter(ImageFilter.EDGE_ENHANCE)
+        return Image.blend(image.convert("RGB"), stylised, alpha=min(max(strength, 0.0), 1.0))
+
+    def warmup(self) -> None:
+        """Nothing to load ahead of time."""
+
+    def generate(
+        self, base_image: Image.Image, prompts: DiffusersInput | Iterable[DiffusersInput]
+    ) -> list[Image.Image]:
+        return self.generate_batch([base_image], [prompts])[0]
+
+    def generate_batch(
+        self,
+        base_images: Sequence[Image.Image],
+        prompts: Sequence[DiffusersInput | Iterable[DiffusersInput]],
+    ) -> list[list[Image.Image]]:
+        if len(base_images) != len(prompts):
+            raise ValueError("generate_batch expects one prompt entry per base image")
+        outputs: list[list[Image.Image]] = []
+        for image, bundles in zip(base_images, prompts, strict=True):
+            if not isinstance(bundles, Iterable):
+                bundles = [bundles]
+            outputs.append([self._stylise(image, bundle.strength) for bundle in bundles])
+        return outputs
@@ -2,15 +2,37 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+import hashlib
+import io
+import json
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from dataclasses import asdict, dataclass, field, replace
+from functools import partial
 from pathlib import Path
-from typing import List, Sequence
+from typing import Any
 
+from PIL import Image
+
+from .archives import TarShardWriter, archive_member_path
+from .cache import ResultCache
 from .config import PipelineConfig
+from .dedup import DuplicateIndex, IndexedInput, dhash, link_or_copy
+from .executor import Stage, StagedExecutor
 from .logging_utils import configure_logging, get_logger
-from .models.diffusers_wrapper import DiffusersCaricatureModel, DiffusersInput
+from .manifest import (
+    ManifestRecord,
+    RunManifest,
+    content_fingerprint,
+    file_fingerprint,
+    manifest_name,
+)
+from .memory import MemoryBudget, current_rss_mb, peak_rss_mb
+from .metrics import PipelineMetrics
+from .models.diffusers_wrapper import DiffusersInput
+from .models.registry import create_generator
 from .postprocessing import PostProcessingPipeline
-from .preprocessing import ImageLoader, PreprocessingPipeline
+from .preprocessing import ImageBatch, ImageLoader, PreprocessingPipeline, RawImage
+from .preprocessing.transforms import ProcessedImage
 
 logger = get_logger(__name__)
 
@@ -24,6 +46,159 @@ class PipelineArtifact:
     metadata: dict[str, object]
 
 
+@dataclass
+class _WorkItem:
+    """State of one input image as it moves through the pipeline stages.
+
+    ``artifacts`` is set once the outputs exist, either restored from the result cache or
+    written by the postprocess stage; later stages pass such items through untouched. Each
+    image is dropped by the first stage that no longer needs it: the decoded original after
+    preprocessing, the preprocessed crop after blending. Near-duplicates of an earlier input
+    get empty ``artifacts`` and ``indexed.duplicate_of`` set; their outputs are resolved once
+    that input is complete.
+    """
+
+    path: Path
+    fingerprint: str
+    raw: RawImage | None = None
+    batch: ImageBatch | None = None
+    processed: ProcessedImage | None = None
+    metadata: dict[str, object] = field(default_factory=dict)
+    generated: list[Image.Image] = field(default_factory=list)
+    composed: list[Image.Image] = field(default_factory=list)
+    artifacts: list[PipelineArtifact] | None = None
+    cache_key: str | None = None
+    cache_hit: bool = False
+    phash: int | None = None
+    indexed: IndexedInput | None = None
+    metrics: PipelineMetrics = field(default_factory=PipelineMetrics)
+
+
+def default_prompts(config: PipelineConfig) -> Sequence[DiffusersInput]:
+    """Prompt bundles applied to every input image."""
+    return [
+        DiffusersInput(
+            prompt="Tasteful, artistic caricature, clean lines, professional illustration",
+            negative_prompt="distorted, grotesque, low quality, nsfw",
+            strength=0.65,
+            guidance_scale=config.model.guidance_scale,
+        )
+    ]
+
+
+def _output_stem(output_dir: Path, input_path: Path, idx: int) -> Path:
+    return output_dir / f"{input_path.stem}_caricature_{idx}"
+
+
+def _read_stage(loader: ImageLoader, item: _WorkItem) -> _WorkItem | None:
+    if item.raw is not None:  # streamed from a tar shard
+        return item
+    with item.metrics.span("read"):
+        item.raw = loader.read(item.path)
+    return item if item.raw is not None else None
+
+
+def _decode_stage(loader: ImageLoader, hash_inputs: bool, item: _WorkItem) -> _WorkItem | None:
+    if item.artifacts is not None:
+        return item
+    assert item.raw is not None  # set by the read stage
+    with item.metrics.span("decode"):
+        item.batch = loader.decode(item.raw)
+    item.raw = None
+    if item.batch is None:
+        return None
+    if hash_inputs:
+        with item.metrics.span("phash"):
+            item.phash = dhash(item.batch.image)
+    return item
+
+
+def _preprocess_stage(preprocess: PreprocessingPipeline, item: _WorkItem) -> _WorkItem:
+    if item.artifacts is not None:
+        return item
+    assert item.batch is not None  # set by the decode stage
+    logger.info("Processing %s", item.path.name)
+    item.processed = preprocess.process(item.batch)
+    item.metadata = item.processed.metadata
+    item.batch = None
+    item.metrics.merge(preprocess.metrics.drain())
+    return item
+
+
+def _postprocess_stage(
+    postprocess: PostProcessingPipeline, items: list[_WorkItem]
+) -> list[_WorkItem]:
+    # Composite every output of the generation batch in one call, so same-sized outputs share
+    # the blend buffers.
+    pending = [item for item in items if item.artifacts is None]
+    if not pending:
+        return items
+    stylised: list[Image.Image] = []
+    originals: list[Image.Image] = []
+    for item in pending:
+        assert item.processed is not None  # set by the preprocess stage
+        stylised += item.generated
+        originals += [item.processed.image] * len(item.generated)
+    composed = postprocess.apply_batch(stylised, originals)
+    start = 0
+    for item in pending:
+        item.composed = composed[start : start + len(item.generated)]
+        start += len(item.generated)
+        item.generated = []
+        item.processed = None
+    pending[0].metrics.merge(postprocess.metrics.drain())
+    return items
+
+
+def _postprocess_one(postprocess: PostProcessingPipeline, item: _WorkItem) -> _WorkItem:
+    return _postprocess_stage(postprocess, [item])[0]
+
+
+def _save_stage(
+    postprocess: PostProcessingPipeline,
+    output_dir: Path,
+    prompts: Sequence[DiffusersInput],
+    archive: TarShardWriter | None,
+    item: _WorkItem,
+) -> _WorkItem:
+    if item.artifacts is not None:
+        return item
+    artifacts: list[PipelineArtifact] = []
+    for idx, composed in enumerate(item.composed):
+        output_path = _output_stem(output_dir, item.path, idx)
+        metadata = {**item.metadata, "prompt": prompts[idx % len(prompts)].prompt}
+        if archive is None:
+            saved_path = postprocess.save(composed, output_path)
+        else:
+            buffer = io.BytesIO()
+            with item.metrics.span("save"):
+                postprocess.encode(composed, buffer)
+                saved_path = archive.write(
+                    f"{output_path.name}.{postprocess.extension}", buffer.getvalue(), metadata
+                )
+        artifacts.append(
+            PipelineArtifact(input_path=item.path, output_path=saved_path, metadata=metadata)
+        )
+        logger.info("Saved caricature to %s", saved_path)
+    item.artifacts = artifacts
+    item.composed = []
+    item.metrics.merge(postprocess.metrics.drain())
+    return item
+
+
+def _probe_memory(name: str, fn: Callable[[Any], Any], payload: Any) -> Any:
+    """Run a stage function, then record the RSS of the process that ran it on every item.
+
+    The gauges keep the largest reading, giving the peak resident memory per stage.
+    """
+    result = fn(payload)
+    rss = current_rss_mb()
+    for item in result if isinstance(result, list) else [result]:
+        if item is not None:
+            item.metrics.set_max(f"peak_rss_mb_{name}", rss)
+    return result
+
+
 class CaricaturePipeline:
     """Coordinates ingestion, pre-processing, generation and post-processing."""
 
@@ -31,47 +206,376 @@ class CaricaturePipeline:
         self._config = config
         configure_logging(config.logging.level, config.logging.log_dir)
 
-        self._loader = ImageLoader(config.input_dir)
+        self._loader = ImageLoader(
+            config.input_dir,
+            decode_size=config.preprocessing.decode_size,
+            shard_index=config.execution.shard_index,
+            shard_count=config.execution.shard_count,
+        )
+        self.metrics = PipelineMetrics()
         self._preprocess = PreprocessingPipeline(config.preprocessing)
-        self._generator = DiffusersCaricatureModel(config.model, device=config.device)
+        self._generator = create_generator(
+            config.model, device=config.device, batch_size=config.batch_size
+        )
         self._postprocess = PostProcessingPipeline(config.postprocessing)
+        if config.cache.enabled and config.archives.write:
+            raise ValueError("the result cache restores loose files; disable it for tar output")
+        # Opened by each run, like the manifest.
+        self._cache: ResultCache | None = None
+        self._dedup: DuplicateIndex | None = None
 
     def _prompts(self) -> Sequence[DiffusersInput]:
-        return [
-            DiffusersInput(
-                prompt="Tasteful, artistic caricature, clean lines, professional illustration",
-                negative_prompt="distorted, grotesque, low quality, nsfw",
-                strength=0.65,
-                guidance_scale=self._config.model.guidance_scale,
+        return default_prompts(self._config)
+
+    def _cache_settings(self) -> dict[str, Any]:
+        """Settings that change the generated output and therefore the cache key."""
+        return {
+            "model": self._config.model.model_dump(
+                mode="json", exclude={"prompt_cache_size", "snapshot_dir"}
+            ),
+            "preprocessing": self._config.preprocessing.model_dump(
+                mode="json", exclude={"landmark_cache_dir"}
+            ),
+            "postprocessing": self._config.postprocessing.model_dump(
+                mode="json", exclude={"atomic_writes"}
+            ),
+            "prompts": [asdict(bundle) for bundle in self._prompts()],
+        }
+
+    def _lookup_stage(self, item: _WorkItem) -> _WorkItem:
+        assert self._cache is not None and item.raw is not None
+        item.cache_key = self._cache.make_key(item.raw.sha256, self._cache_settings())
+        entry = self._cache.lookup(item.cache_key)
+        if entry is None:
+            self.metrics.increment("cache_misses")
+            return item
+        self.metrics.increment("cache_hits")
+
+        destinations = [
+            _output_stem(self._config.output_dir, item.path, idx) for idx in range(len(entry.files))
+        ]
+        restored = self._cache.restore(entry, destinations)
+        item.artifacts = [
+            PipelineArtifact(
+                input_path=item.path,
+                output_path=path,
+                metadata={**metadata, "cache_hit": True},
+            )
+            for path, metadata in zip(restored, entry.metadata, strict=True)
+        ]
+        item.cache_hit = True
+        item.raw = None
+        logger.info("Restored %s output(s) for %s from cache", len(restored), item.path.name)
+        return item
+
+    def _dedup_stage(self, item: _WorkItem) -> _WorkItem:
+        if item.artifacts is not None or item.phash is None:
+            return item
+        assert self._dedup is not None
+        with item.metrics.span("dedup_lookup"):
+            item.indexed = self._dedup.register(str(item.path), item.phash)
+        if item.indexed.duplicate_of is not None:
+            item.metrics.increment("duplicates")
+            item.batch = None
+            item.artifacts = []
+        return item
+
+    def _resolve_duplicate(self, item: _WorkItem) -> list[PipelineArtifact]:
+        """Outputs of a near-duplicate: links to the matched input's outputs, or none."""
+        assert self._dedup is not None and item.indexed is not None
+        info = {
+            "duplicate_of": item.indexed.duplicate_of,
+            "hamming_distance": item.indexed.distance,
+        }
+        sources = self._dedup.outputs(item.indexed.entry)
+        if sources is None:
+            logger.warning(
+                "%s duplicates %s, which produced no outputs", item.path.name, info["duplicate_of"]
+            )
+            return []
+        logger.info(
+            "%s is a near-duplicate of %s (distance %s)",
+            item.path.name,
+            info["duplicate_of"],
+            item.indexed.distance,
+        )
+        if self._config.dedup.action == "report":
+            return []
+        artifacts = []
+        for idx, source in enumerate(map(Path, sources)):
+            if archive_member_path(source) is None:
+                stem = _output_stem(self._config.output_dir, item.path, idx)
+                output_path = link_or_copy(source, stem.with_suffix(source.suffix))
+            else:
+                # Members of a tar shard cannot be linked; refer to the original's output.
+                output_path = source
+            artifacts.append(
+                PipelineArtifact(input_path=item.path, output_path=output_path, metadata=info)
+            )
+        return artifacts
+
+    def _generate_stage(self, items: list[_WorkItem]) -> list[_WorkItem]:
+        pending = [item for item in items if item.artifacts is None]
+        if not pending:
+            return items
+        prompts = self._prompts()
+        with self.metrics.span("generate"):
+            generated_per_image = self._generator.generate_batch(
+                [item.processed.image for item in pending if item.processed is not None],
+                [prompts] * len(pending),
             )
+        self.metrics.increment("generated_images", len(pending))
+        self.metrics.merge(self._generator.metrics.drain())
+        for item, generated in zip(pending, generated_per_image, strict=True):
+            item.generated = generated
+        return items
+
+    def _generate_one(self, item: _WorkItem) -> _WorkItem:
+        # Stages with a batch_size of 1 receive single items rather than lists.
+        return self._generate_stage([item])[0]
+
+    def _stages(
+        self, archive: TarShardWriter | None = None, max_batch_wait: float | None = None
+    ) -> list[Stage]:
+        execution = self._config.execution
+        stages = [
+            Stage(
+                "read",
+                partial(_read_stage, self._loader),
+                workers=execution.decode_workers,
+            )
+        ]
+        if self._cache is not None:
+            stages.append(Stage("cache", self._lookup_stage, mode="inline"))
+        stages += [
+            Stage(
+                "decode",
+                partial(_decode_stage, self._loader, self._dedup is not None),
+                workers=execution.decode_workers,
+                mode=execution.pool,
+            ),
+        ]
+        if self._dedup is not None:
+            stages.append(Stage("dedup", self._dedup_stage, mode="inline"))
+        stages += [
+            Stage(
+                "preprocess",
+                partial(_preprocess_stage, self._preprocess),
+                workers=execution.preprocess_workers,
+                mode=execution.pool,
+            ),
+            Stage(
+                "generate",
+                self._generate_stage if self._config.batch_size > 1 else self._generate_one,
+                mode="inline",
+                batch_size=self._config.batch_size,
+                max_wait=max_batch_wait,
+            ),
+            Stage(
+                "postprocess",
+                partial(
+                    _postprocess_stage if self._config.batch_size > 1 else _postprocess_one,
+                    self._postprocess,
+                ),
+                workers=execution.postprocess_workers,
+                mode=execution.pool,
+                batch_size=self._config.batch_size,
+                max_wait=max_batch_wait,
+            ),
+            Stage(
+                "save",
+                partial(
+                    _save_stage,
+                    self._postprocess,
+                    self._config.output_dir,
+                    self._prompts(),
+                    archive,
+                ),
+                workers=execution.encode_workers,
+                # Shard writers hold open files, so they are shared by threads only.
+                mode=execution.pool if archive is None else "thread",
+            ),
         ]
+        return [replace(stage, fn=partial(_probe_memory, stage.name, stage.fn)) for stage in stages]
 
-    def run(self) -> List[PipelineArtifact]:
+    def _settings_digest(self) -> str:
+        encoded = json.dumps(self._cache_settings(), sort_keys=True, default=str)
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:16]
+
+    def _input_items(self, digest: str, paths: Iterable[Path] | None = None) -> Iterator[_WorkItem]:
+        """Work items for every input of this shard: loose files or tar shard members.
+
+        Explicit ``paths`` replace the scan of the input directory.
+        """
+        if paths is None and self._config.archives.read:
+            for member in self._loader.read_archives(prefetch=self._config.archives.prefetch):
+                raw = RawImage(path=member.path, data=member.data, sha256=member.sha256)
+                fingerprint = content_fingerprint(len(member.data), member.sha256, digest)
+                yield _WorkItem(path=member.path, fingerprint=fingerprint, raw=raw)
+            return
+        for path in self._loader.list_files() if paths is None else paths:
+            try:
+                fingerprint = file_fingerprint(path, digest)
+            except OSError as exc:
+                logger.warning("Skipping %s: %s", path, exc)
+                continue
+            yield _WorkItem(path=path, fingerprint=fingerprint)
+
+    def _pending_items(
+        self, resume: bool, paths: Iterable[Path] | None = None
+    ) -> Iterator[_WorkItem]:
+        """Yield work items for inputs that still need processing."""
+        digest = self._settings_digest()
+        completed = RunManifest.load_directory(self._config.output_dir) if resume else {}
+        skipped = 0
+        for item in self._input_items(digest, paths):
+            if resume and RunManifest.is_complete(completed.get(str(item.path)), item.fingerprint):
+                skipped += 1
+                continue
+            yield item
+        if skipped:
+            logger.info("Resume: skipped %s input(s) already completed", skipped)
+
+    def iter_run(
+        self,
+        resume: bool = False,
+        paths: Iterable[Path] | None = None,
+        max_batch_wait: float | None = None,
+    ) -> Iterator[PipelineArtifact]:
+        """Run the pipeline, yielding artifacts as soon as each input's outputs are written.
+
+        Every completed input is appended to ``manifest.jsonl`` in the output directory, or to a
+        per-shard manifest when the inputs are sharded. With ``resume`` set, inputs whose record
+        in any manifest matches the current file and settings fingerprint, and whose outputs
+        still exist, are skipped.
+
+        ``paths`` processes the given files instead of scanning ``input_dir``; it may be an
+        open-ended iterator that blocks until new files arrive. ``max_batch_wait`` then bounds
+        how many seconds a partial generation batch waits for more inputs.
+        """
         logger.info("Starting caricature generation pipeline")
-        artifacts: List[PipelineArtifact] = []
-
-        for batch in self._loader.load():
-            logger.info("Processing %s", batch.path.name)
-            processed = self._preprocess.process(batch)
-            prompts = self._prompts()
-            generated_images = self._generator.generate(processed.image, prompts)
-
-            for idx, generated in enumerate(generated_images):
-                composed = self._postprocess.apply(generated, batch.image)
-                base_name = batch.path.stem
-                name = f"{base_name}_caricature_{idx}"
-                output_path = self._config.output_dir / name
-                saved_path = self._postprocess.save(composed, output_path)
-
-                metadata = {
-                    **batch.metadata,
-                    **processed.metadata,
-                    "prompt": prompts[idx % len(prompts)].prompt,
-                }
-                artifacts.append(
-                    PipelineArtifact(input_path=batch.path, output_path=saved_path, metadata=metadata)
+        # The model loads in the background while the first inputs are read and preprocessed.
+        self._generator.warmup()
+        execution = self._config.execution
+        manifest = RunManifest(
+            self._config.output_dir / manifest_name(execution.shard_index, execution.shard_count)
+        )
+        archive = (
+            TarShardWriter(
+                self._config.output_dir,
+                prefix=(
+                    "caricatures"
+                    if execution.shard_count == 1
+                    else f"caricatures.shard-{execution.shard_index}-of-{execution.shard_count}"
+                ),
+                max_members=self._config.archives.shard_max_members,
+                max_bytes=self._config.archives.shard_max_mb * 1024 * 1024,
+            )
+            if self._config.archives.write
+            else None
+        )
+        cache = self._config.cache
+        self._cache = (
+            ResultCache(
+                cache.directory,
+                max_bytes=cache.max_size_mb * 1024 * 1024,
+                link_mode=cache.link_mode,
+            )
+            if cache.enabled
+            else None
+        )
+        dedup = self._config.dedup
+        self._dedup = (
+            DuplicateIndex(dedup.index_path, dedup.threshold, self._settings_digest())
+            if dedup.enabled
+            else None
+        )
+        budget = (
+            MemoryBudget(execution.memory_budget_mb, min_in_flight=self._config.batch_size)
+            if execution.memory_budget_mb
+            else None
+        )
+        executor = StagedExecutor(
+            self._stages(archive, max_batch_wait),
+            queue_size=execution.queue_size,
+            budget=budget,
+            log_config=(self._config.logging.level, self._config.logging.log_dir),
+        )
+        produced_count = 0
+        try:
+            for item in executor.run(self._pending_items(resume, paths)):
+                produced = item.artifacts or []
+                metadata = [artifact.metadata for artifact in produced]
+                if item.indexed is not None and self._dedup is not None:
+                    if item.indexed.duplicate_of is None:
+                        self._dedup.complete(
+                            item.indexed.entry, [str(artifact.output_path) for artifact in produced]
+                        )
+                    else:
+                        produced = self._resolve_duplicate(item)
+                        metadata = [artifact.metadata for artifact in produced] or [
+                            {
+                                "duplicate_of": item.indexed.duplicate_of,
+                                "hamming_distance": item.indexed.distance,
+                            }
+                        ]
+                self.metrics.merge(item.metrics)
+                self.metrics.increment("images")
+                self.metrics.increment("artifacts", len(produced))
+                if self._cache is not None and item.cache_key and not item.cache_hit and produced:
+                    self._cache.store(
+                        item.cache_key,
+                        [artifact.output_path for artifact in produced],
+                        [artifact.metadata for artifact in produced],
+                    )
+                manifest.append(
+                    ManifestRecord(
+                        input=str(item.path),
+                        fingerprint=item.fingerprint,
+                        outputs=[str(artifact.output_path) for artifact in produced],
+                        metadata=metadata,
+                    )
                 )
-                logger.info("Saved caricature to %s", saved_path)
+                produced_count += len(produced)
+                yield from produced
+        finally:
+            manifest.close()
+            if archive is not None:
+                archive.close()
+            if self._cache is not None:
+                self._cache.close()
+            if self._dedup is not None:
+                self._dedup.close()
 
-        logger.info("Pipeline completed with %s artifacts", len(artifacts))
-        return artifacts
+        self.metrics.set_max("peak_rss_mb", peak_rss_mb())
+        if budget is not None:
+            self.metrics.set_max("peak_in_flight_images", budget.peak_in_flight)
+            self.metrics.increment("memory_budget_waits", budget.throttled)
+            logger.info(
+                "Memory budget %s MiB: at most %s image(s) in flight, %s wait(s)",
+                budget.limit_mb,
+                budget.peak_in_flight,
+                budget.throttled,
+            )
+
+        if self._cache is not None:
+            stats = self._cache.stats
+            logger.info(
+                "Result cache: %s hit(s), %s miss(es), %s eviction(s)",
+                stats.hits,
+                stats.misses,
+                stats.evictions,
+            )
+        if self._dedup is not None:
+            logger.info(
+                "Duplicate index: %s input(s) indexed, %s near-duplicate(s) in this run",
+                len(self._dedup),
+                self.metrics.counters.get("duplicates", 0),
+            )
+        if self._config.metrics_dir is not None:
+            json_path, prom_path = self.metrics.export(self._config.metrics_dir)
+            logger.info("Exported run metrics to %s and %s", json_path, prom_path)
+        logger.info("Pipeline completed with %s artifacts", produced_count)
+
+    def run(self, resume: bool = False) -> list[PipelineArtifact]:
+        return list(self.iter_run(resume=resume))
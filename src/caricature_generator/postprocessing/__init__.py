@@ -1,6 +1,6 @@
 """Post-processing utilities."""
 
-from .compositing import PostProcessingPipeline
+from .compositing import UPSCALE_FILTERS, PostProcessingPipeline
 
-__all__ = ["PostProcessingPipeline"]
+__all__ = ["PostProcessingPipeline", "UPSCALE_FILTERS"]
 
@@ -2,43 +2,174 @@
 
 from __future__ import annotations
 
+import os
+import threading
+from collections.abc import Sequence
 from pathlib import Path
-from typing import Optional
+from typing import IO, Any
 
+import numpy as np
 from PIL import Image
 
 from ..config import PostprocessingConfig
 from ..logging_utils import get_logger
+from ..metrics import PipelineMetrics
 
 logger = get_logger(__name__)
 
+UPSCALE_FILTERS = {
+    "nearest": Image.Resampling.NEAREST,
+    "bilinear": Image.Resampling.BILINEAR,
+    "bicubic": Image.Resampling.BICUBIC,
+    "lanczos": Image.Resampling.LANCZOS,
+}
+
+_PIL_FORMATS = {"png": "PNG", "jpg": "JPEG", "webp": "WEBP"}
+# Encoder effort per preset; "balanced" matches Pillow's defaults.
+ENCODE_PRESETS: dict[str, dict[str, Any]] = {
+    "fast": {"png_compress_level": 1, "webp_method": 0, "optimize": False},
+    "balanced": {"png_compress_level": 6, "webp_method": 4, "optimize": False},
+    "small": {"png_compress_level": 9, "webp_method": 6, "optimize": True},
+}
+
 
 class PostProcessingPipeline:
-    """Apply compositing and exporting to generator outputs."""
+    """Apply compositing and exporting to generator outputs.
 
-    def __init__(self, config: PostprocessingConfig) -> None:
+    Blending runs on same-sized groups of outputs stacked into float32/uint8 work buffers that
+    are allocated once per thread and reused, so compositing a batch costs one arithmetic pass
+    plus one resize per image when upscaling.
+    """
+
+    def __init__(
+        self, config: PostprocessingConfig, metrics: PipelineMetrics | None = None
+    ) -> None:
         self._config = config
+        self.metrics = metrics or PipelineMetrics()
+        self._local = threading.local()
+        self._format = _PIL_FORMATS[config.output_format]
+        self._encode_params = self._encoder_params(config)
+        self._created_dirs: set[Path] = set()
+
+    @staticmethod
+    def _encoder_params(config: PostprocessingConfig) -> dict[str, Any]:
+        preset = ENCODE_PRESETS[config.encode_preset]
+        if config.output_format == "png":
+            level = config.png_compress_level
+            return {"compress_level": preset["png_compress_level"] if level is None else level}
+        if config.output_format == "jpg":
+            return {"quality": config.quality or 75, "optimize": preset["optimize"]}
+        return {"quality": config.quality or 80, "method": preset["webp_method"]}
+
+    def __getstate__(self) -> dict[str, Any]:
+        state = self.__dict__.copy()
+        del state["_local"]
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    def _buffers(self, count: int, height: int, width: int) -> tuple[np.ndarray, np.ndarray]:
+        """This thread's work buffers, grown when a larger batch or image size arrives."""
+        buffers = getattr(self._local, "buffers", None)
+        if buffers is None or buffers[0].shape[1:3] != (height, width) or len(buffers[0]) < count:
+            buffers = (
+                np.empty((count, height, width, 3), dtype=np.float32),
+                np.empty((count, height, width, 3), dtype=np.uint8),
+            )
+            self._local.buffers = buffers
+        return buffers[0][:count], buffers[1][:count]
 
-    def apply(self, stylised: Image.Image, original: Optional[Image.Image] = None) -> Image.Image:
-        result = stylised.convert("RGB")
+    def apply(self, stylised: Image.Image, original: Image.Image | None = None) -> Image.Image:
+        return self.apply_batch([stylised], [original])[0]
 
-        if original and self._config.blend_alpha < 1.0:
-            logger.debug("Blending stylised output with original at alpha=%s", self._config.blend_alpha)
-            resized_original = original.resize(result.size)
-            result = Image.blend(resized_original, result, alpha=self._config.blend_alpha)
+    def apply_batch(
+        self,
+        stylised: Sequence[Image.Image],
+        originals: Sequence[Image.Image | None],
+    ) -> list[Image.Image]:
+        """Blend each output with its original, then upscale.
 
-        if self._config.upscale > 1:
-            new_size = tuple(dim * self._config.upscale for dim in result.size)
-            logger.debug("Upscaling output to %s", new_size)
-            result = result.resize(new_size, Image.Resampling.LANCZOS)
+        Pass the preprocessed crop the output was generated from as the original: it already
+        has the output's size, so no resize is needed before blending.
+        """
+        if len(stylised) != len(originals):
+            raise ValueError("apply_batch expects one original per stylised image")
+        alpha = self._config.blend_alpha
+        resample = UPSCALE_FILTERS[self._config.upscale_filter]
+        results: list[Image.Image | None] = [None] * len(stylised)
 
-        return result
+        groups: dict[tuple[int, int], list[int]] = {}
+        for idx, image in enumerate(stylised):
+            groups.setdefault(image.size, []).append(idx)
+
+        for (width, height), indices in groups.items():
+            blend = [idx for idx in indices if originals[idx] is not None and alpha < 1.0]
+            blended = set(blend)
+            for idx in indices:
+                if idx not in blended:
+                    results[idx] = stylised[idx].convert("RGB")
+            if blend:
+                logger.debug("Blending %s output(s) with originals at alpha=%s", len(blend), alpha)
+                with self.metrics.span("blend"):
+                    work, staged = self._buffers(len(blend), height, width)
+                    for slot, idx in enumerate(blend):
+                        original = originals[idx]
+                        assert original is not None
+                        if original.size != (width, height):
+                            original = original.resize((width, height), resample)
+                        work[slot] = np.asarray(stylised[idx].convert("RGB"))
+                        staged[slot] = np.asarray(original.convert("RGB"))
+                    # work = original + alpha * (stylised - original), in place over the batch.
+                    work -= staged
+                    work *= alpha
+                    work += staged
+                    work += 0.5
+                    np.copyto(staged, work, casting="unsafe")
+                    for slot, idx in enumerate(blend):
+                        # RGB arrays are copied into the image, so the buffers can be reused.
+                        results[idx] = Image.fromarray(staged[slot])
+
+        factor = self._config.upscale
+        if factor > 1:
+            with self.metrics.span("upscale"):
+                for idx, image in enumerate(results):
+                    assert image is not None
+                    results[idx] = image.resize(
+                        (image.width * factor, image.height * factor), resample
+                    )
+
+        return [image for image in results if image is not None]
+
+    @property
+    def extension(self) -> str:
+        return self._config.output_format.lower()
+
+    def encode(self, image: Image.Image, target: str | Path | IO[bytes]) -> None:
+        """Encode ``image`` in the configured format and encoder settings."""
+        image.save(target, format=self._format, **self._encode_params)
 
     def save(self, image: Image.Image, destination: Path) -> Path:
-        destination.parent.mkdir(parents=True, exist_ok=True)
-        fmt = self._config.output_format.upper()
-        result_path = destination.with_suffix(f".{self._config.output_format.lower()}")
+        result_path = destination.with_suffix(f".{self.extension}")
+        directory = result_path.parent
+        if directory not in self._created_dirs:
+            directory.mkdir(parents=True, exist_ok=True)
+            self._created_dirs.add(directory)
         logger.debug("Saving post-processed image to %s", result_path)
-        image.save(result_path, format=fmt)
+        with self.metrics.span("save"):
+            if self._config.atomic_writes:
+                # A crash never leaves a truncated output behind; the rename also replaces
+                # rather than overwrites, like the unlink below.
+                temporary = directory / f".{result_path.name}.{os.getpid()}.{threading.get_ident()}"
+                try:
+                    self.encode(image, temporary)
+                    os.replace(temporary, result_path)
+                finally:
+                    temporary.unlink(missing_ok=True)
+            else:
+                # Replace rather than overwrite so hard links restored from the result cache stay
+                # intact.
+                result_path.unlink(missing_ok=True)
+                self.encode(image, result_path)
         return result_path
-
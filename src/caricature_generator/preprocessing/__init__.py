@@ -1,8 +1,16 @@
 """Pre-processing utilities for caricature generation."""
 
+from .exaggeration import FeatureExaggerator
 from .facial_landmarks import FacialLandmarkDetector
-from .image_loader import ImageBatch, ImageLoader
+from .image_loader import ImageBatch, ImageLoader, RawImage
 from .transforms import PreprocessingPipeline
 
-__all__ = ["FacialLandmarkDetector", "ImageBatch", "ImageLoader", "PreprocessingPipeline"]
+__all__ = [
+    "FacialLandmarkDetector",
+    "FeatureExaggerator",
+    "ImageBatch",
+    "ImageLoader",
+    "PreprocessingPipeline",
+    "RawImage",
+]
 
@@ -0,0 +1,177 @@
+"""Landmark-driven feature exaggeration with a piecewise-affine mesh warp."""
+
+from __future__ import annotations
+
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from ..logging_utils import get_logger
+from .facial_landmarks import _import_mediapipe
+
+logger = get_logger(__name__)
+
+# Face Mesh landmarks without the refined iris points, which follow the surrounding eye mesh.
+MESH_LANDMARKS = 468
+# Fixed anchors on a ring around the face keep the warp local: pixels outside stay put.
+_RING_POINTS = 24
+_RING_RADIUS = 1.6
+_CANONICAL_MODEL = Path("modules/face_geometry/data/canonical_face_model.obj")
+
+
+def _read_obj_vertices(path: Path) -> np.ndarray:
+    vertices = [
+        [float(value) for value in line.split()[1:3]]
+        for line in path.read_text(encoding="utf-8").splitlines()
+        if line.startswith("v ")
+    ]
+    # OBJ y points up, image y points down.
+    return np.asarray(vertices, dtype=np.float64) * np.array([1.0, -1.0])
+
+
+def load_mean_face(path: Path | None = None) -> np.ndarray:
+    """Mean face as ``(468, 2)`` points, centred on the origin with unit RMS radius.
+
+    ``path`` may be an ``.npy`` array or a Wavefront ``.obj`` mesh in Face Mesh vertex order;
+    by default the canonical face model shipped with MediaPipe is used.
+    """
+    if path is None:
+        mp = _import_mediapipe()
+        if mp is None:
+            raise RuntimeError("mediapipe is not installed; set preprocessing.mean_face_path")
+        path = Path(mp.__file__).parent / _CANONICAL_MODEL
+    points = np.load(path) if path.suffix == ".npy" else _read_obj_vertices(path)
+    points = np.asarray(points, dtype=np.float64)[:MESH_LANDMARKS, :2]
+    if len(points) < MESH_LANDMARKS:
+        raise ValueError(f"mean face {path} has {len(points)} points, need {MESH_LANDMARKS}")
+    points = points - points.mean(axis=0)
+    return points / np.sqrt((points**2).sum(axis=1).mean())
+
+
+def _delaunay(points: np.ndarray) -> np.ndarray:
+    """Delaunay triangles of ``points`` as an ``(T, 3)`` array of vertex indices."""
+    import cv2
+
+    low = points.min(axis=0)
+    scale = 1000.0 / float((points.max(axis=0) - low).max())
+    scaled = (points - low) * scale + 1.0
+    subdiv = cv2.Subdiv2D((0, 0, 1002, 1002))
+    subdiv.insert([(float(x), float(y)) for x, y in scaled])
+    corners = subdiv.getTriangleList().reshape(-1, 3, 2).astype(np.float64)
+    distances = np.linalg.norm(corners[:, :, None, :] - scaled[None, None], axis=-1)
+    indices = distances.argmin(axis=-1)
+    # Triangles touching Subdiv2D's virtual outer vertices match no input point.
+    valid = (distances.min(axis=-1) < 1e-2).all(axis=1)
+    return indices[valid].astype(np.int32)
+
+
+@lru_cache(maxsize=4)
+def mesh_topology(mean_face_path: Path | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """Mean face plus anchor ring, and its triangulation; computed once per mean face."""
+    mean_face = load_mean_face(mean_face_path)
+    angles = np.linspace(0.0, 2.0 * np.pi, _RING_POINTS, endpoint=False)
+    radius = _RING_RADIUS * float(np.linalg.norm(mean_face, axis=1).max())
+    ring = radius * np.stack([np.cos(angles), np.sin(angles)], axis=1)
+    vertices = np.vstack([mean_face, ring])
+    return vertices, _delaunay(vertices)
+
+
+def _rasterise(triangles: np.ndarray, barycentric: np.ndarray, size: tuple[int, int]) -> np.ndarray:
+    """Label every pixel with the index of the triangle covering it, or -1.
+
+    All candidate pixels inside the triangles' bounding boxes are enumerated at once and tested
+    with the per-triangle barycentric matrices, so there is no Python loop over triangles.
+    """
+    width, height = size
+    low = np.clip(np.floor(triangles.min(axis=1)), 0, [width - 1, height - 1]).astype(np.int64)
+    high = np.clip(np.ceil(triangles.max(axis=1)), 0, [width - 1, height - 1]).astype(np.int64)
+    spans = np.maximum(high - low + 1, 0)
+    counts = spans[:, 0] * spans[:, 1]
+
+    owner = np.repeat(np.arange(len(triangles), dtype=np.int32), counts)
+    local = np.arange(int(counts.sum()), dtype=np.int32) - np.repeat(
+        (np.cumsum(counts) - counts).astype(np.int32), counts
+    )
+    row_length = spans[owner, 0].astype(np.int32)
+    xs = low[owner, 0].astype(np.int32) + local % row_length
+    ys = low[owner, 1].astype(np.int32) + local // row_length
+
+    # The third barycentric weight is 1 - w0 - w1, so two rows of each matrix suffice.
+    rows = barycentric[:, :2].astype(np.float32)[owner]
+    xs_f, ys_f = xs.astype(np.float32), ys.astype(np.float32)
+    w0 = rows[:, 0, 0] * xs_f + rows[:, 0, 1] * ys_f + rows[:, 0, 2]
+    w1 = rows[:, 1, 0] * xs_f + rows[:, 1, 1] * ys_f + rows[:, 1, 2]
+    eps = np.float32(1e-4)
+    inside = (w0 >= -eps) & (w1 >= -eps) & (w0 + w1 <= 1 + eps)
+    labels = np.full((height, width), -1, dtype=np.int32)
+    labels[ys[inside], xs[inside]] = owner[inside]
+    return labels
+
+
+class FeatureExaggerator:
+    """Push facial landmarks away from the mean face and warp the image to match.
+
+    The mean face is fitted to the detected landmarks with a least-squares similarity
+    transform; every landmark's offset from the fitted mean is then scaled by ``1 + strength``.
+    The image is warped piecewise-affinely over a triangulation of the mean face that is
+    computed once, using per-triangle affine matrices and a single ``cv2.remap`` pass.
+    """
+
+    def __init__(self, strength: float, mean_face_path: Path | None = None) -> None:
+        self._strength = strength
+        self._mean_face_path = mean_face_path
+
+    def _targets(self, landmarks: np.ndarray, vertices: np.ndarray) -> tuple[np.ndarray, ...]:
+        """Source and exaggerated destination positions for every mesh vertex."""
+        points = landmarks[:MESH_LANDMARKS].astype(np.float64)
+        mean = vertices[:MESH_LANDMARKS]
+        # Similarity fit in complex form: z_point ~ a * z_mean + b.
+        z_mean = mean[:, 0] + 1j * mean[:, 1]
+        z_points = points[:, 0] + 1j * points[:, 1]
+        centred_mean = z_mean - z_mean.mean()
+        a = np.vdot(centred_mean, z_points - z_points.mean()) / np.vdot(centred_mean, centred_mean)
+        b = z_points.mean() - a * z_mean.mean()
+
+        z_vertices = a * (vertices[:, 0] + 1j * vertices[:, 1]) + b
+        fitted = np.stack([z_vertices.real, z_vertices.imag], axis=1)
+        source = fitted.copy()
+        source[:MESH_LANDMARKS] = points
+        target = fitted.copy()
+        target[:MESH_LANDMARKS] = points + self._strength * (points - fitted[:MESH_LANDMARKS])
+        return source, target
+
+    def warp(self, image: Image.Image, landmarks: np.ndarray) -> Image.Image:
+        import cv2
+
+        vertices, triangles = mesh_topology(self._mean_face_path)
+        source, target = self._targets(landmarks, vertices)
+
+        target_tris = target[triangles]
+        homogeneous = np.concatenate(
+            [target_tris.transpose(0, 2, 1), np.ones((len(triangles), 1, 3))], axis=1
+        )
+        # Maps a destination pixel to its barycentric weights within each triangle.
+        barycentric = np.linalg.pinv(homogeneous)
+        # Destination pixel -> source position, one 2x3 affine matrix per triangle.
+        affine = source[triangles].transpose(0, 2, 1) @ barycentric
+
+        labels = _rasterise(target_tris, barycentric, image.size)
+        height, width = labels.shape
+        grid_y, grid_x = np.mgrid[0:height, 0:width].astype(np.float32)
+        map_x, map_y = grid_x.copy(), grid_y.copy()
+        covered = labels >= 0
+        owner = labels[covered]
+        xs, ys = grid_x[covered], grid_y[covered]
+        map_x[covered] = affine[owner, 0, 0] * xs + affine[owner, 0, 1] * ys + affine[owner, 0, 2]
+        map_y[covered] = affine[owner, 1, 0] * xs + affine[owner, 1, 1] * ys + affine[owner, 1, 2]
+
+        warped = cv2.remap(
+            np.asarray(image.convert("RGB")),
+            map_x,
+            map_y,
+            interpolation=cv2.INTER_LINEAR,
+            borderMode=cv2.BORDER_REFLECT,
+        )
+        return Image.fromarray(warped)
@@ -2,13 +2,18 @@
 
 from __future__ import annotations
 
+import hashlib
+import io
+import os
+from collections.abc import Generator, Iterator
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Generator, Iterable
 
 from PIL import Image, UnidentifiedImageError
 
+from ..archives import ARCHIVE_SUFFIX, ArchiveMember, TarShardReader
 from ..logging_utils import get_logger
+from ..sharding import shard_of
 
 logger = get_logger(__name__)
 
@@ -25,30 +30,106 @@ class ImageBatch:
     metadata: dict[str, object]
 
 
+@dataclass
+class RawImage:
+    """Undecoded file contents together with their content hash."""
+
+    path: Path
+    data: bytes
+    sha256: str
+
+
 class ImageLoader:
-    """Load images from disk into PIL objects with metadata."""
+    """Load images from disk into PIL objects with metadata.
 
-    def __init__(self, root: Path) -> None:
-        self.root = root
+    With ``shard_count > 1`` only files whose path relative to ``root`` hashes to
+    ``shard_index`` are listed, so independent runs can split one input tree.
+    """
 
-    def list_files(self) -> Iterable[Path]:
-        return sorted(
-            path for path in self.root.rglob("*") if path.suffix.lower() in SUPPORTED_EXTENSIONS
-        )
+    def __init__(
+        self, root: Path, decode_size: int = 0, shard_index: int = 0, shard_count: int = 1
+    ) -> None:
+        self.root = root
+        self._decode_size = decode_size
+        self._shard_index = shard_index
+        self._shard_count = shard_count
+
+    def list_files(self) -> Iterator[Path]:
+        """Walk ``root`` lazily, yielding this shard's supported files in sorted path order."""
+        yield from self._owned(self._scan(self.root, SUPPORTED_EXTENSIONS))
+
+    def list_archives(self) -> Iterator[Path]:
+        """Like :meth:`list_files`, for ``.tar`` shards; each shard goes to one run shard."""
+        yield from self._owned(self._scan(self.root, {ARCHIVE_SUFFIX}))
+
+    def read_archives(self, prefetch: int = 32) -> Iterator[ArchiveMember]:
+        """Stream supported images out of this run shard's ``.tar`` shards, in order."""
+        return iter(TarShardReader(self.list_archives(), SUPPORTED_EXTENSIONS, prefetch=prefetch))
+
+    def _owned(self, paths: Iterator[Path]) -> Iterator[Path]:
+        for path in paths:
+            if self._shard_count == 1 or (
+                shard_of(path.relative_to(self.root).as_posix(), self._shard_count)
+                == self._shard_index
+            ):
+                yield path
+
+    def _scan(self, directory: Path, extensions: set[str]) -> Iterator[Path]:
+        try:
+            with os.scandir(directory) as scanner:
+                entries = sorted(scanner, key=lambda entry: entry.name)
+        except OSError as exc:
+            logger.warning("Cannot scan %s: %s", directory, exc)
+            return
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from self._scan(Path(entry.path), extensions)
+            elif os.path.splitext(entry.name)[1].lower() in extensions:
+                yield Path(entry.path)
+
+    def read(self, path: Path) -> RawImage | None:
+        """Read a file's bytes and hash them, returning ``None`` when it cannot be read."""
+        try:
+            data = path.read_bytes()
+        except OSError as exc:
+            logger.warning("Skipping %s: %s", path, exc)
+            return None
+        return RawImage(path=path, data=data, sha256=hashlib.sha256(data).hexdigest())
+
+    def decode(self, raw: RawImage) -> ImageBatch | None:
+        """Decode previously read bytes, returning ``None`` for unreadable images.
+
+        ``width``/``height`` in the metadata come from the file header. JPEGs are decoded in
+        draft mode at the smallest DCT scale whose sides are still at least ``decode_size``.
+        """
+        try:
+            with Image.open(io.BytesIO(raw.data)) as source:
+                width, height = source.size
+                if self._decode_size and source.format == "JPEG":
+                    source.draft("RGB", (self._decode_size, self._decode_size))
+                image = source.convert("RGB")
+        except (UnidentifiedImageError, OSError) as exc:
+            logger.warning("Skipping %s: %s", raw.path, exc)
+            return None
+
+        metadata = {
+            "width": width,
+            "height": height,
+            "decoded_width": image.width,
+            "decoded_height": image.height,
+            "filesize": len(raw.data),
+            "sha256": raw.sha256,
+        }
+        logger.debug("Loaded %s (%sx%s)", raw.path.name, image.width, image.height)
+        return ImageBatch(path=raw.path, image=image, metadata=metadata)
+
+    def load_path(self, path: Path) -> ImageBatch | None:
+        """Read and decode a single file, returning ``None`` when it cannot be loaded."""
+        raw = self.read(path)
+        return self.decode(raw) if raw is not None else None
 
     def load(self) -> Generator[ImageBatch, None, None]:
         for path in self.list_files():
-            try:
-                image = Image.open(path).convert("RGB")
-            except (FileNotFoundError, UnidentifiedImageError) as exc:
-                logger.warning("Skipping %s: %s", path, exc)
-                continue
-
-            metadata = {
-                "width": image.width,
-                "height": image.height,
-                "filesize": path.stat().st_size,
-            }
-            logger.debug("Loaded %s (%sx%s)", path.name, image.width, image.height)
-            yield ImageBatch(path=path, image=image, metadata=metadata)
-
+            batch = self.load_path(path)
+            if batch is not None:
+                yield batch
@@ -0,0 +1,133 @@
+"""Persistent binary store for facial landmark detections."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from collections.abc import Iterator, Mapping
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from ..logging_utils import get_logger
+from .facial_landmarks import LandmarkResult
+
+logger = get_logger(__name__)
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    fcntl = None
+
+
+class LandmarkStore:
+    """Cache landmark detections keyed by image content hash and detector settings.
+
+    Landmarks for all images are appended to a single float32 file that is read through a
+    memory map, while ``index.jsonl`` records each key's offset, point count and score.
+    Images without a detected face are stored with a count of zero so they also skip
+    detection. Appends take an exclusive file lock, so several worker processes can share
+    one store; entries written by other processes are picked up on the next miss.
+    """
+
+    DATA_FILE = "landmarks.f32"
+    INDEX_FILE = "index.jsonl"
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self._init_state()
+
+    def _init_state(self) -> None:
+        self._lock = threading.Lock()
+        self._index: dict[str, tuple[int, int, float]] = {}
+        self._index_position = 0
+        self._data: np.memmap | None = None
+
+    def __getstate__(self) -> dict[str, Any]:
+        return {"directory": self.directory, "hits": self.hits, "misses": self.misses}
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._init_state()
+
+    @staticmethod
+    def make_key(content_hash: str, settings: Mapping[str, Any]) -> str:
+        encoded = json.dumps(settings, sort_keys=True)
+        return hashlib.sha256(f"{content_hash}:{encoded}".encode()).hexdigest()
+
+    @property
+    def _data_path(self) -> Path:
+        return self.directory / self.DATA_FILE
+
+    @property
+    def _index_path(self) -> Path:
+        return self.directory / self.INDEX_FILE
+
+    def _refresh_index(self) -> None:
+        if not self._index_path.exists():
+            return
+        with self._index_path.open("r", encoding="utf-8") as fh:
+            fh.seek(self._index_position)
+            for line in iter(fh.readline, ""):
+                if not line.endswith("\n"):
+                    break  # partially written by a concurrent process
+                record = json.loads(line)
+                self._index[record["key"]] = (record["offset"], record["count"], record["score"])
+                self._index_position = fh.tell()
+
+    def _points(self, offset: int, count: int) -> np.ndarray:
+        end = offset + count * 2
+        if self._data is None or self._data.shape[0] < end:
+            self._data = np.memmap(self._data_path, dtype=np.float32, mode="r")
+        return np.asarray(self._data[offset:end]).reshape(count, 2)
+
+    def get(self, key: str) -> tuple[bool, LandmarkResult | None]:
+        """Return ``(found, result)``; ``result`` is ``None`` when no face was detected."""
+        with self._lock:
+            if key not in self._index:
+                self._refresh_index()
+            record = self._index.get(key)
+            if record is None:
+                self.misses += 1
+                return False, None
+            self.hits += 1
+            offset, count, score = record
+            if count == 0:
+                return True, None
+            points = self._points(offset, count)
+        return True, LandmarkResult(landmarks=points, score=score)
+
+    @contextmanager
+    def _exclusive(self) -> Iterator[None]:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with (self.directory / ".lock").open("a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def put(self, key: str, result: LandmarkResult | None) -> None:
+        """Append a detection result (or the absence of a face) for ``key``."""
+        points = (
+            np.ascontiguousarray(result.landmarks, dtype=np.float32).reshape(-1)
+            if result is not None
+            else np.empty(0, dtype=np.float32)
+        )
+        score = result.score if result is not None else 0.0
+        with self._lock, self._exclusive():
+            with self._data_path.open("ab") as fh:
+                offset = fh.tell() // points.itemsize
+                fh.write(points.tobytes())
+            record = {"key": key, "offset": offset, "count": points.size // 2, "score": score}
+            with self._index_path.open("a", encoding="utf-8") as fh:
+                fh.write(json.dumps(record) + "\n")
+            self._index[key] = (offset, record["count"], score)
+        logger.debug("Stored %s landmarks under %s", record["count"], key)
@@ -3,17 +3,24 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Optional
 
+import numpy as np
 from PIL import Image, ImageFilter, ImageOps
 
 from ..config import PreprocessingConfig
 from ..logging_utils import get_logger
+from ..metrics import PipelineMetrics
+from .exaggeration import FeatureExaggerator
 from .facial_landmarks import FacialLandmarkDetector, LandmarkResult
 from .image_loader import ImageBatch
+from .landmark_store import LandmarkStore
 
 logger = get_logger(__name__)
 
+# MediaPipe Face Mesh indices of the eye corners on the image-left and image-right side.
+LEFT_EYE_CORNERS = (33, 133)
+RIGHT_EYE_CORNERS = (362, 263)
+
 
 @dataclass
 class ProcessedImage:
@@ -26,21 +33,84 @@ class ProcessedImage:
 class PreprocessingPipeline:
     """Apply alignment, resizing and cosmetic filters before generation."""
 
-    def __init__(self, config: PreprocessingConfig) -> None:
+    def __init__(self, config: PreprocessingConfig, metrics: PipelineMetrics | None = None) -> None:
         self._config = config
-        self._landmark_detector: Optional[FacialLandmarkDetector] = (
-            FacialLandmarkDetector() if config.align_faces else None
+        self.metrics = metrics or PipelineMetrics()
+        self._landmark_detector: FacialLandmarkDetector | None = (
+            FacialLandmarkDetector(detection_size=config.detection_size)
+            if config.align_faces
+            else None
+        )
+        self._landmark_store: LandmarkStore | None = (
+            LandmarkStore(config.landmark_cache_dir)
+            if config.align_faces and config.landmark_cache_dir is not None
+            else None
+        )
+        self._exaggerator: FeatureExaggerator | None = (
+            FeatureExaggerator(config.exaggeration, config.mean_face_path)
+            if config.align_faces and config.exaggeration > 0
+            else None
         )
 
-    def _align_face(self, image: Image.Image, landmarks: LandmarkResult) -> Image.Image:
-        """Align the face by simply centering the bounding box."""
-        xs = [x for x, _ in landmarks.landmarks]
-        ys = [y for _, y in landmarks.landmarks]
-        min_x, max_x = min(xs), max(xs)
-        min_y, max_y = min(ys), max(ys)
-        crop = image.crop((min_x, min_y, max_x, max_y))
-        logger.debug("Cropping face to region (%s, %s, %s, %s)", min_x, min_y, max_x, max_y)
-        return crop
+    def _detect_landmarks(
+        self, image: Image.Image, content_hash: str | None, metadata: dict[str, object]
+    ) -> LandmarkResult | None:
+        """Run face detection, consulting the landmark store first when one is configured."""
+        assert self._landmark_detector is not None
+        if self._landmark_store is None or content_hash is None:
+            return self._landmark_detector.detect(image)
+
+        # Landmarks are pixel coordinates, so the decoded resolution is part of the key.
+        settings = {**self._landmark_detector.settings, "image_size": list(image.size)}
+        key = LandmarkStore.make_key(content_hash, settings)
+        found, landmarks = self._landmark_store.get(key)
+        metadata["landmarks_cached"] = found
+        self.metrics.increment("landmark_cache_hits" if found else "landmark_cache_misses")
+        if not found:
+            landmarks = self._landmark_detector.detect(image)
+            self._landmark_store.put(key, landmarks)
+        return landmarks
+
+    def _alignment_matrix(self, landmarks: LandmarkResult) -> np.ndarray:
+        """Return the 2x3 similarity transform from image to aligned output coordinates.
+
+        The transform rotates the eye line to horizontal, then scales and translates the
+        rotated landmark bounding box (grown by ``align_margin`` on every side) so it fills
+        an ``image_size`` square.
+        """
+        points = landmarks.landmarks
+        left_eye = points[list(LEFT_EYE_CORNERS)].mean(axis=0)
+        right_eye = points[list(RIGHT_EYE_CORNERS)].mean(axis=0)
+        dx, dy = right_eye - left_eye
+        angle = np.arctan2(dy, dx)
+        cos, sin = np.cos(angle), np.sin(angle)
+        rotation = np.array([[cos, sin], [-sin, cos]], dtype=np.float64)
+
+        center = points.mean(axis=0, dtype=np.float64)
+        rotated = (points - center) @ rotation.T
+        low, high = rotated.min(axis=0), rotated.max(axis=0)
+        side = float((high - low).max()) * (1.0 + 2.0 * self._config.align_margin)
+        scale = self._config.image_size / max(side, 1.0)
+
+        linear = rotation * scale
+        offset = self._config.image_size / 2.0 - linear @ center - scale * (low + high) / 2.0
+        return np.hstack([linear, offset[:, None]])
+
+    def _align_face(
+        self, image: Image.Image, landmarks: LandmarkResult
+    ) -> tuple[Image.Image, np.ndarray]:
+        """Warp the face into an upright ``image_size`` square with a single affine resample."""
+        matrix = self._alignment_matrix(landmarks)
+        inverse = np.linalg.inv(np.vstack([matrix, [0.0, 0.0, 1.0]]))[:2]
+        size = self._config.image_size
+        aligned = image.transform(
+            (size, size),
+            Image.Transform.AFFINE,
+            data=tuple(inverse.ravel()),
+            resample=Image.Resampling.BICUBIC,
+        )
+        logger.debug("Aligned face with similarity transform %s", matrix.tolist())
+        return aligned, matrix
 
     def _background_filter(self, image: Image.Image) -> Image.Image:
         mode = self._config.background_mode
@@ -52,14 +122,28 @@ class PreprocessingPipeline:
         return image
 
     def process(self, batch: ImageBatch) -> ProcessedImage:
-        image = batch.image.copy()
+        # Every step below returns a new image, so the decoded original is never modified.
+        image = batch.image
         metadata = dict(batch.metadata)
+        aligned = False
 
         if self._landmark_detector:
             try:
-                landmarks = self._landmark_detector.detect(image)
+                content_hash = batch.metadata.get("sha256")
+                with self.metrics.span("detect"):
+                    landmarks = self._detect_landmarks(
+                        image, str(content_hash) if content_hash else None, metadata
+                    )
                 if landmarks:
-                    image = self._align_face(image, landmarks)
+                    with self.metrics.span("fit"):
+                        image, matrix = self._align_face(image, landmarks)
+                    aligned = True
+                    if self._exaggerator is not None:
+                        points = landmarks.landmarks @ matrix[:, :2].T + matrix[:, 2]
+                        with self.metrics.span("exaggerate"):
+                            image = self._exaggerator.warp(image, points)
+                        metadata["exaggeration"] = self._config.exaggeration
+                    self.metrics.increment("faces_found")
                     metadata["landmarks_detected"] = True
                 else:
                     metadata["landmarks_detected"] = False
@@ -67,11 +151,16 @@ class PreprocessingPipeline:
                 logger.warning("Landmark detection skipped: %s", exc)
                 metadata["landmarks_detected"] = False
 
-        image = ImageOps.fit(
-            image, (self._config.image_size, self._config.image_size), Image.Resampling.LANCZOS
-        )
+        if not aligned:
+            with self.metrics.span("fit"):
+                image = ImageOps.fit(
+                    image,
+                    (self._config.image_size, self._config.image_size),
+                    Image.Resampling.LANCZOS,
+                )
 
-        image = self._background_filter(image)
+        with self.metrics.span("background_filter"):
+            image = self._background_filter(image)
 
         metadata["preprocessed"] = True
         metadata["target_size"] = self._config.image_size
@@ -0,0 +1,92 @@
+"""Profiler wrappers for whole pipeline runs."""
+
+from __future__ import annotations
+
+import cProfile
+import pstats
+import sys
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+from .logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+PROFILERS = {"cprofile", "torch"}
+
+
+@contextmanager
+def _cprofile(output: Path) -> Iterator[None]:
+    """Profile the calling thread and every thread started inside the block.
+
+    Stage work runs on executor threads. From Python 3.12 a profiler observes every thread, and
+    only one may be active at a time; before that, each new thread installs its own profiler
+    and the per-thread statistics are merged into one ``pstats`` dump at the end.
+    """
+    if sys.version_info >= (3, 12):
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            _dump(pstats.Stats(profile), output)
+        return
+
+    profiles: list[cProfile.Profile] = []
+    lock = threading.Lock()
+
+    def _start_thread_profile(*_: Any) -> None:
+        profile = cProfile.Profile()
+        with lock:
+            profiles.append(profile)
+        profile.enable()
+
+    main_profile = cProfile.Profile()
+    threading.setprofile(_start_thread_profile)
+    main_profile.enable()
+    try:
+        yield
+    finally:
+        main_profile.disable()
+        threading.setprofile(None)  # type: ignore[arg-type]
+        stats = pstats.Stats(main_profile)
+        with lock:
+            for profile in profiles:
+                profile.create_stats()
+                stats.add(profile)
+        _dump(stats, output)
+
+
+def _dump(stats: pstats.Stats, output: Path) -> None:
+    output.parent.mkdir(parents=True, exist_ok=True)
+    stats.dump_stats(output)
+    logger.info("Wrote cProfile statistics to %s", output)
+
+
+@contextmanager
+def _torch_profile(output: Path) -> Iterator[None]:
+    import torch
+    from torch.profiler import ProfilerActivity, profile
+
+    activities = [ProfilerActivity.CPU]
+    if torch.cuda.is_available():
+        activities.append(ProfilerActivity.CUDA)
+    with profile(activities=activities, record_shapes=True) as profiler:
+        yield
+    output.parent.mkdir(parents=True, exist_ok=True)
+    profiler.export_chrome_trace(str(output))
+    logger.info("Wrote torch profiler trace to %s", output)
+
+
+@contextmanager
+def profile_run(mode: str, output: Path) -> Iterator[None]:
+    """Wrap a run in ``cProfile`` (pstats dump) or the torch profiler (Chrome trace)."""
+    if mode not in PROFILERS:
+        raise ValueError(f"profiler must be one of {PROFILERS}")
+    context = _cprofile(output) if mode == "cprofile" else _torch_profile(output)
+    with context:
+        yield
@@ -0,0 +1,344 @@
+"""Online serving mode: an asyncio HTTP server with dynamic micro-batching."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import io
+import json
+from collections.abc import Callable, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from PIL import Image
+
+from .config import PipelineConfig
+from .logging_utils import configure_logging, get_logger
+from .metrics import PipelineMetrics
+from .postprocessing import PostProcessingPipeline
+from .preprocessing import ImageBatch, ImageLoader, PreprocessingPipeline, RawImage
+
+if TYPE_CHECKING:
+    from .models.base import CaricatureGenerator
+
+logger = get_logger(__name__)
+
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    411: "Length Required",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+_CONTENT_TYPES = {"png": "image/png", "jpg": "image/jpeg", "webp": "image/webp"}
+
+
+class OverloadedError(RuntimeError):
+    """Raised when the request queue is full and a request is rejected."""
+
+
+@dataclass
+class _Request:
+    payload: Any
+    future: asyncio.Future
+
+
+class MicroBatcher:
+    """Group queued requests into batches for a handler that processes a list at once.
+
+    A batch is dispatched when ``max_batch_size`` requests are waiting or ``max_wait_ms`` has
+    passed since its first request arrived, whichever comes first, so latency stays bounded at
+    low load while batches fill up under high load. Batches run one at a time on a dedicated
+    thread, keeping the event loop free. When a batch fails, its requests are retried one at a
+    time, so a single bad request only fails itself. Requests beyond ``max_queue_size`` waiting ones are
+    rejected with :class:`OverloadedError` instead of growing the queue without bound.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[list[Any]], Sequence[Any]],
+        max_batch_size: int,
+        max_wait_ms: float,
+        max_queue_size: int,
+    ) -> None:
+        self._handler = handler
+        self._max_batch_size = max_batch_size
+        self._max_wait = max_wait_ms / 1000.0
+        self._queue: asyncio.Queue[_Request] = asyncio.Queue(maxsize=max_queue_size)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="generate")
+        self._worker: asyncio.Task | None = None
+        self.metrics = PipelineMetrics()
+
+    @property
+    def queued(self) -> int:
+        return self._queue.qsize()
+
+    def start(self) -> None:
+        if self._worker is None:
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Finish queued requests, then stop the batching loop."""
+        if self._worker is None:
+            return
+        await self._queue.join()
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        self._executor.shutdown(wait=True)
+
+    async def submit(self, payload: Any) -> Any:
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait(_Request(payload=payload, future=future))
+        except asyncio.QueueFull:
+            self.metrics.increment("rejected_requests")
+            raise OverloadedError("request queue is full") from None
+        return await future
+
+    async def _next_batch(self) -> list[_Request]:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self._max_wait
+        while len(batch) < self._max_batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except TimeoutError:
+                break
+        return batch
+
+    async def _dispatch(self, batch: list[_Request]) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            with self.metrics.span("batch"):
+                results = await loop.run_in_executor(
+                    self._executor, self._handler, [request.payload for request in batch]
+                )
+            for request, result in zip(batch, results, strict=True):
+                if not request.future.done():
+                    request.future.set_result(result)
+        except Exception as exc:
+            pending = [request for request in batch if not request.future.done()]
+            if len(batch) > 1:
+                logger.warning(
+                    "Batch of %s request(s) failed (%s); retrying one at a time", len(batch), exc
+                )
+                self.metrics.increment("batch_retries")
+                for request in pending:
+                    await self._dispatch([request])
+                return
+            logger.exception("Request failed")
+            for request in pending:
+                request.future.set_exception(exc)
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            self.metrics.observe("batch_size", float(len(batch)))
+            try:
+                await self._dispatch(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+
+class CaricatureService:
+    """In-memory request path: preprocess, generate and post-process a batch of images.
+
+    Each request returns the first prompt variant, encoded in the configured output format.
+    """
+
+    def __init__(
+        self, config: PipelineConfig, generator: CaricatureGenerator | None = None
+    ) -> None:
+        from .pipeline import default_prompts
+
+        self._config = config
+        self._loader = ImageLoader(Path("."), decode_size=config.preprocessing.decode_size)
+        self._preprocess = PreprocessingPipeline(config.preprocessing)
+        self._postprocess = PostProcessingPipeline(config.postprocessing)
+        if generator is None:
+            from .models.registry import create_generator
+
+            generator = create_generator(
+                config.model, device=config.device, batch_size=config.batch_size
+            )
+        self._generator = generator
+        self._prompts = default_prompts(config)
+
+    @property
+    def content_type(self) -> str:
+        return _CONTENT_TYPES[self._config.postprocessing.output_format]
+
+    def warmup(self) -> None:
+        """Load the model and run one request so the first real request is not a cold start."""
+        size = self._config.preprocessing.image_size
+        self.process_batch([Image.new("RGB", (size, size), "gray")])
+
+    def decode(self, body: bytes) -> Image.Image | None:
+        """Decode an uploaded image like a file input; ``None`` when it is not an image."""
+        raw = RawImage(path=Path("request"), data=body, sha256=hashlib.sha256(body).hexdigest())
+        batch = self._loader.decode(raw)
+        return batch.image if batch is not None else None
+
+    def process_batch(self, images: list[Image.Image]) -> list[bytes]:
+        batches = [
+            ImageBatch(path=Path(f"request-{idx}"), image=image, metadata={})
+            for idx, image in enumerate(images)
+        ]
+        processed = [self._preprocess.process(batch) for batch in batches]
+        generated = self._generator.generate_batch(
+            [item.image for item in processed], [self._prompts] * len(processed)
+        )
+        composed_images = self._postprocess.apply_batch(
+            [outputs[0] for outputs in generated], [item.image for item in processed]
+        )
+        encoded: list[bytes] = []
+        for composed in composed_images:
+            buffer = io.BytesIO()
+            self._postprocess.encode(composed, buffer)
+            encoded.append(buffer.getvalue())
+        return encoded
+
+
+class CaricatureServer:
+    """Minimal HTTP/1.1 front end around a warm :class:`CaricatureService`.
+
+    ``POST /v1/caricatures`` takes raw image bytes and returns the encoded caricature;
+    ``GET /healthz`` reports queue depth. Connections are closed after each response.
+    """
+
+    def __init__(self, config: PipelineConfig, service: CaricatureService | None = None) -> None:
+        self._config = config
+        self._service = service or CaricatureService(config)
+        serving = config.serving
+        self.batcher = MicroBatcher(
+            self._service.process_batch,
+            max_batch_size=config.batch_size,
+            max_wait_ms=serving.max_batch_wait_ms,
+            max_queue_size=serving.max_queue_size,
+        )
+        self._server: asyncio.AbstractServer | None = None
+
+    @property
+    def port(self) -> int:
+        assert self._server is not None and self._server.sockets
+        return self._server.sockets[0].getsockname()[1]
+
+    async def start(self) -> None:
+        serving = self._config.serving
+        if serving.warmup:
+            logger.info("Warming up generator before accepting requests")
+            await asyncio.get_running_loop().run_in_executor(None, self._service.warmup)
+        self.batcher.start()
+        self._server = await asyncio.start_server(self._handle, serving.host, serving.port)
+        logger.info("Serving caricatures on %s:%s", serving.host, self.port)
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        await self.batcher.stop()
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        assert self._server is not None
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            status, content_type, body, headers = await self._respond(reader)
+        except Exception:
+            logger.exception("Unhandled error while serving request")
+            status, content_type, body, headers = _json(500, {"error": "internal error"})
+        head = [f"HTTP/1.1 {status} {_REASONS[status]}", f"Content-Type: {content_type}"]
+        head += [f"Content-Length: {len(body)}", "Connection: close"]
+        head += [f"{name}: {value}" for name, value in headers.items()]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def _respond(
+        self, reader: asyncio.StreamReader
+    ) -> tuple[int, str, bytes, dict[str, str]]:
+        request_line = (await reader.readline()).decode("latin-1").strip()
+        try:
+            method, target, _ = request_line.split(" ", 2)
+        except ValueError:
+            return _json(400, {"error": "malformed request line"})
+
+        headers: dict[str, str] = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        path = target.split("?", 1)[0]
+        if path == "/healthz":
+            return _json(200, {"status": "ok", "queued": self.batcher.queued})
+        if path != "/v1/caricatures":
+            return _json(404, {"error": "not found"})
+        if method != "POST":
+            return _json(405, {"error": "use POST"})
+
+        if "content-length" not in headers:
+            return _json(411, {"error": "Content-Length is required"})
+        try:
+            length = int(headers["content-length"])
+        except ValueError:
+            length = -1
+        if length < 0:
+            return _json(400, {"error": "invalid Content-Length"})
+        if length > self._config.serving.max_body_mb * 1024 * 1024:
+            return _json(413, {"error": "image too large"})
+        try:
+            body = await reader.readexactly(length)
+        except asyncio.IncompleteReadError:
+            return _json(400, {"error": "body is shorter than Content-Length"})
+        # Decoding a large photo takes long enough to stall every other connection.
+        loop = asyncio.get_running_loop()
+        try:
+            image = await loop.run_in_executor(None, self._service.decode, body)
+        except Image.DecompressionBombError:
+            return _json(413, {"error": "image has too many pixels"})
+        if image is None:
+            return _json(400, {"error": "body is not a supported image"})
+
+        try:
+            encoded = await self.batcher.submit(image)
+        except OverloadedError:
+            status, content_type, payload, _ = _json(503, {"error": "server overloaded"})
+            return status, content_type, payload, {"Retry-After": "1"}
+        return 200, self._service.content_type, encoded, {}
+
+
+def _json(status: int, payload: dict[str, Any]) -> tuple[int, str, bytes, dict[str, str]]:
+    return status, "application/json", json.dumps(payload).encode("utf-8"), {}
+
+
+def serve(config: PipelineConfig) -> None:
+    """Run the HTTP server until interrupted."""
+    configure_logging(config.logging.level, config.logging.log_dir)
+    server = CaricatureServer(config)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        logger.info("Server stopped")
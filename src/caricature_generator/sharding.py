@@ -0,0 +1,140 @@
+"""Deterministic input sharding and local multi-process runs."""
+
+from __future__ import annotations
+
+import hashlib
+import importlib.util
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING
+
+from .config import PipelineConfig
+from .logging_utils import configure_logging, get_logger
+from .metrics import PipelineMetrics
+
+if TYPE_CHECKING:
+    from .pipeline import PipelineArtifact
+
+logger = get_logger(__name__)
+
+_THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+
+def parse_shard(spec: str) -> tuple[int, int]:
+    """Parse ``"i/N"`` into ``(i, N)`` with ``0 <= i < N``."""
+    index, sep, count = spec.partition("/")
+    try:
+        shard_index, shard_count = int(index), int(count)
+    except ValueError:
+        raise ValueError(f"shard must look like i/N, got {spec!r}") from None
+    if not sep or shard_count < 1 or not 0 <= shard_index < shard_count:
+        raise ValueError(f"shard must satisfy 0 <= i < N, got {spec!r}")
+    return shard_index, shard_count
+
+
+def shard_of(relative_path: str, shard_count: int) -> int:
+    """Shard owning ``relative_path``; stable across machines, processes and Python versions."""
+    digest = hashlib.blake2b(relative_path.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % shard_count
+
+
+def limit_threads(threads: int, interop_threads: int = 0) -> None:
+    """Cap intra-op threads of the numeric libraries used by this process.
+
+    ``interop_threads`` also sets torch's inter-op pool, which only works before torch has run
+    any parallel work. A value of 0 leaves either setting alone.
+    """
+    if threads:
+        for name in _THREAD_ENV_VARS:
+            os.environ[name] = str(threads)
+    if importlib.util.find_spec("torch") is not None:
+        import torch
+
+        if threads:
+            torch.set_num_threads(threads)
+        if interop_threads:
+            torch.set_num_interop_threads(interop_threads)
+
+
+def _worker_threads(config: PipelineConfig) -> int:
+    execution = config.execution
+    return execution.torch_threads or max(1, (os.cpu_count() or 1) // execution.workers)
+
+
+def _run_worker(
+    config: PipelineConfig, resume: bool
+) -> tuple[list[PipelineArtifact], PipelineMetrics]:
+    from .pipeline import CaricaturePipeline
+
+    pipeline = CaricaturePipeline(config)
+    artifacts = pipeline.run(resume=resume)
+    return artifacts, pipeline.metrics
+
+
+def run_workers(config: PipelineConfig, resume: bool = False) -> list[PipelineArtifact]:
+    """Split this run's shard across ``execution.workers`` processes and merge their results.
+
+    Worker ``j`` of shard ``i/N`` processes sub-shard ``i + N * j`` of ``N * workers``, so the
+    union of all workers is exactly shard ``i/N``. Each worker owns a model instance and its own
+    manifest file; once all have finished, their manifests are folded into this shard's manifest
+    and their metrics are merged and exported once.
+    """
+    from .manifest import RunManifest, manifest_name
+
+    configure_logging(config.logging.level, config.logging.log_dir)
+    execution = config.execution
+    workers = execution.workers
+    shard_count = execution.shard_count * workers
+    worker_configs = [
+        config.model_copy(
+            update={
+                "execution": execution.model_copy(
+                    update={
+                        "workers": 1,
+                        "shard_count": shard_count,
+                        "shard_index": execution.shard_index + execution.shard_count * worker,
+                    }
+                ),
+                "metrics_dir": None,
+            }
+        )
+        for worker in range(workers)
+    ]
+    manifest = RunManifest(
+        config.output_dir / manifest_name(execution.shard_index, execution.shard_count)
+    )
+    worker_manifests = [
+        config.output_dir
+        / manifest_name(worker_config.execution.shard_index, worker_config.execution.shard_count)
+        for worker_config in worker_configs
+    ]
+    # Fold in manifests left behind by an interrupted multi-worker run before resuming.
+    manifest.merge(worker_manifests)
+
+    threads = _worker_threads(config)
+    logger.info("Starting %s worker process(es) with %s thread(s) each", workers, threads)
+    artifacts: list[PipelineArtifact] = []
+    metrics = PipelineMetrics()
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=limit_threads,
+            initargs=(threads, execution.interop_threads),
+        ) as pool:
+            futures = [
+                pool.submit(_run_worker, worker_config, resume) for worker_config in worker_configs
+            ]
+            for future in futures:
+                worker_artifacts, worker_metrics = future.result()
+                artifacts.extend(worker_artifacts)
+                metrics.merge(worker_metrics)
+    finally:
+        manifest.merge(worker_manifests)
+        manifest.close()
+
+    if config.metrics_dir is not None:
+        metrics.export(config.metrics_dir)
+    logger.info("Workers completed with %s artifacts", len(artifacts))
+    return artifacts
@@ -0,0 +1,354 @@
+"""Watch-folder mode: stream files into a warm pipeline as they arrive in the input directory."""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+import queue
+import select
+import signal
+import struct
+import threading
+import time
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Protocol
+
+from .config import PipelineConfig
+from .logging_utils import get_logger
+from .pipeline import CaricaturePipeline
+from .preprocessing.image_loader import SUPPORTED_EXTENSIONS
+
+logger = get_logger(__name__)
+
+WATCH_BACKENDS = {"auto", "inotify", "poll"}
+
+# inotify event bits, from <sys/inotify.h>.
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ISDIR = 0x40000000
+_WATCH_MASK = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len; followed by the name
+_READ_SIZE = 64 * 1024
+
+_END = object()
+# Emitted-file records are pruned once their count doubles, and never below this many.
+_PRUNE_MINIMUM = 1024
+
+
+class _Backend(Protocol):
+    def scan(self) -> list[Path]:
+        """Start watching and return the files already present."""
+
+    def poll(self, timeout: float) -> tuple[list[Path], list[Path]]:
+        """Wait up to ``timeout`` seconds; return files still being written and finished files."""
+
+    def close(self) -> None:
+        """Stop watching and release the backend's resources."""
+
+
+def _walk(directory: Path) -> Iterator[os.DirEntry]:
+    """Entries of ``directory``, logging rather than raising when it cannot be listed."""
+    try:
+        with os.scandir(directory) as scanner:
+            yield from list(scanner)
+    except OSError as exc:
+        logger.warning("Cannot scan %s: %s", directory, exc)
+
+
+class _InotifyBackend:
+    """Linux inotify through ctypes, with one watch per directory of the tree."""
+
+    def __init__(self, root: Path) -> None:
+        library = ctypes.util.find_library("c")
+        if library is None:
+            raise OSError("libc not found")
+        self._libc = ctypes.CDLL(library, use_errno=True)
+        if not hasattr(self._libc, "inotify_init1"):
+            raise OSError("inotify is not available on this platform")
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._root = root
+        self._watches: dict[int, Path] = {}
+
+    def _add_tree(self, directory: Path) -> list[Path]:
+        # Watch before listing, so files created in between are reported at least once.
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), _WATCH_MASK)
+        if wd < 0:
+            logger.warning("Cannot watch %s: %s", directory, os.strerror(ctypes.get_errno()))
+        else:
+            self._watches[wd] = directory
+        files = []
+        for entry in _walk(directory):
+            if entry.is_dir(follow_symlinks=False):
+                files += self._add_tree(Path(entry.path))
+            else:
+                files.append(Path(entry.path))
+        return files
+
+    def scan(self) -> list[Path]:
+        return self._add_tree(self._root)
+
+    def poll(self, timeout: float) -> tuple[list[Path], list[Path]]:
+        changed: list[Path] = []
+        finished: list[Path] = []
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return changed, finished
+        try:
+            data = os.read(self._fd, _READ_SIZE)
+        except BlockingIOError:
+            return changed, finished
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            name = data[offset + _EVENT.size : offset + _EVENT.size + length].rstrip(b"\0")
+            offset += _EVENT.size + length
+            if mask & _IN_Q_OVERFLOW:
+                logger.warning("inotify queue overflowed; rescanning %s", self._root)
+                changed += self._add_tree(self._root)
+                continue
+            if mask & _IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+            directory = self._watches.get(wd)
+            if directory is None or not name:
+                continue
+            path = directory / os.fsdecode(name)
+            if mask & _IN_ISDIR:
+                if mask & (_IN_CREATE | _IN_MOVED_TO):
+                    changed += self._add_tree(path)
+            elif mask & (_IN_CLOSE_WRITE | _IN_MOVED_TO):
+                finished.append(path)
+            else:
+                changed.append(path)
+        return changed, finished
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+class _PollingBackend:
+    """Re-list only the directories whose mtime changed since the previous poll."""
+
+    # Coarse filesystem timestamps can hide a change made within the same tick as a listing.
+    _MTIME_GRANULARITY = 2.0
+
+    def __init__(self, root: Path) -> None:
+        self._root = root
+        # Directory -> (mtime_ns, entry names, whether the mtime was recent when listed).
+        self._directories: dict[Path, tuple[int, set[str], bool]] = {}
+
+    def _rescan(self, directory: Path) -> list[Path]:
+        try:
+            mtime = directory.stat().st_mtime_ns
+        except OSError:
+            self._directories.pop(directory, None)
+            return []
+        known = self._directories.get(directory)
+        if known is not None and known[0] == mtime and not known[2]:
+            return []
+        names: set[str] = set()
+        added = []
+        for entry in _walk(directory):
+            names.add(entry.name)
+            if entry.is_dir(follow_symlinks=False):
+                if Path(entry.path) not in self._directories:
+                    added += self._rescan(Path(entry.path))
+            elif known is None or entry.name not in known[1]:
+                added.append(Path(entry.path))
+        recent = time.time() - mtime / 1e9 < self._MTIME_GRANULARITY
+        self._directories[directory] = (mtime, names, recent)
+        return added
+
+    def scan(self) -> list[Path]:
+        return self._rescan(self._root)
+
+    def poll(self, timeout: float) -> tuple[list[Path], list[Path]]:
+        time.sleep(timeout)
+        changed = []
+        for directory in list(self._directories):
+            changed += self._rescan(directory)
+        return changed, []
+
+    def close(self) -> None:
+        self._directories.clear()
+
+
+def _stamp(path: Path) -> tuple[int, int] | None:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class FolderWatcher:
+    """Yield image files added under ``root``, once each has been completely written.
+
+    The ``inotify`` backend reports a file as soon as its writer closes it or it is renamed into
+    place. The ``poll`` backend re-lists only directories whose mtime changed; ``auto`` uses
+    inotify where the C library provides it. Files not known to be closed (every file when
+    polling, and those present at startup) are yielded once their size and mtime have been
+    unchanged for ``settle_seconds``. Hidden files, such as the temporary files of ``rsync``,
+    are ignored, and each version of a file is yielded once.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        settle_seconds: float = 1.0,
+        poll_interval: float = 1.0,
+        backend: str = "auto",
+    ) -> None:
+        if backend not in WATCH_BACKENDS:
+            raise ValueError(f"backend must be one of {WATCH_BACKENDS}")
+        self.root = root
+        self._settle = settle_seconds
+        self._poll_interval = poll_interval
+        self._backend = backend
+        self._emitted: dict[Path, tuple[int, int]] = {}
+        self._prune_at = _PRUNE_MINIMUM
+
+    def _open(self) -> tuple[str, _Backend]:
+        if self._backend != "poll":
+            try:
+                return "inotify", _InotifyBackend(self.root)
+            except (OSError, AttributeError) as exc:
+                if self._backend == "inotify":
+                    raise
+                logger.info("inotify unavailable (%s); polling %s", exc, self.root)
+        return "poll", _PollingBackend(self.root)
+
+    def _remember(self, path: Path, stamp: tuple[int, int]) -> None:
+        """Record ``path`` as emitted, forgetting files that have since been removed."""
+        self._emitted[path] = stamp
+        if len(self._emitted) < self._prune_at:
+            return
+        for known in [known for known in self._emitted if _stamp(known) is None]:
+            del self._emitted[known]
+        self._prune_at = max(_PRUNE_MINIMUM, 2 * len(self._emitted))
+
+    @staticmethod
+    def _wanted(path: Path) -> bool:
+        return not path.name.startswith(".") and path.suffix.lower() in SUPPORTED_EXTENSIONS
+
+    def watch(self, stop: threading.Event) -> Iterator[Path]:
+        """Yield files as they become complete, until ``stop`` is set."""
+        name, backend = self._open()
+        logger.info("Watching %s for new images (%s)", self.root, name)
+        # Files that may still be written to: last (size, mtime) seen and since when.
+        pending: dict[Path, tuple[tuple[int, int] | None, float]] = {}
+        try:
+            for path in backend.scan():
+                if self._wanted(path):
+                    pending[path] = (None, time.monotonic())
+            while not stop.is_set():
+                if name == "poll":
+                    timeout = self._poll_interval
+                else:
+                    timeout = min(self._settle / 2, self._poll_interval) if pending else 1.0
+                changed, finished = backend.poll(max(timeout, 0.01))
+                now = time.monotonic()
+                for path in changed:
+                    if self._wanted(path):
+                        pending[path] = (None, now)
+                ready = [path for path in finished if self._wanted(path)]
+                for path in ready:
+                    pending.pop(path, None)
+                for path, (stamp, since) in list(pending.items()):
+                    current = _stamp(path)
+                    if current is None:
+                        del pending[path]
+                    elif current != stamp:
+                        pending[path] = (current, now)
+                    elif now - since >= self._settle:
+                        del pending[path]
+                        ready.append(path)
+                for path in sorted(ready):
+                    stamp = _stamp(path)
+                    if stamp is None or self._emitted.get(path) == stamp:
+                        continue
+                    self._remember(path, stamp)
+                    yield path
+        finally:
+            backend.close()
+
+
+def drain_on_signal(stop: threading.Event) -> None:
+    """Set ``stop`` on SIGINT or SIGTERM; a second signal interrupts immediately."""
+
+    def handle(signum: int, frame: object) -> None:
+        if stop.is_set():
+            raise KeyboardInterrupt
+        logger.info("Received %s; draining in-flight inputs", signal.Signals(signum).name)
+        stop.set()
+
+    signal.signal(signal.SIGINT, handle)
+    signal.signal(signal.SIGTERM, handle)
+
+
+def run_watch(config: PipelineConfig, stop: threading.Event | None = None) -> int:
+    """Process images arriving in ``input_dir`` with one warm pipeline until ``stop`` is set.
+
+    Detected files wait in a queue of ``watch.queue_size``; when it is full, detection pauses
+    until the pipeline catches up. Once ``stop`` is set no new files are accepted, and the
+    files already queued or in flight are finished before returning the number of
+    caricatures generated. Inputs completed by earlier runs are skipped via the manifest.
+    """
+    stop = stop or threading.Event()
+    settings = config.watch
+    pipeline = CaricaturePipeline(config)
+    watcher = FolderWatcher(
+        config.input_dir,
+        settle_seconds=settings.settle_seconds,
+        poll_interval=settings.poll_interval,
+        backend=settings.backend,
+    )
+    arrivals: queue.Queue = queue.Queue(maxsize=settings.queue_size)
+    # Set once the pipeline stops consuming, draining included.
+    finished = threading.Event()
+
+    def offer(item: object, give_up: threading.Event) -> bool:
+        while True:
+            try:
+                arrivals.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                if give_up.is_set():
+                    return False
+
+    def detect() -> None:
+        try:
+            for path in watcher.watch(stop):
+                if not offer(path, stop):
+                    # Not in the manifest, so the next run picks it up.
+                    logger.info("Not queueing %s during shutdown", path.name)
+        except Exception:
+            logger.exception("Watching %s failed", config.input_dir)
+            stop.set()
+        finally:
+            offer(_END, finished)
+
+    def incoming() -> Iterator[Path]:
+        while (path := arrivals.get()) is not _END:
+            yield path
+
+    detector = threading.Thread(target=detect, name="watch", daemon=True)
+    detector.start()
+    generated = 0
+    try:
+        for _ in pipeline.iter_run(
+            resume=True, paths=incoming(), max_batch_wait=settings.max_batch_wait_ms / 1000
+        ):
+            generated += 1
+    finally:
+        stop.set()
+        finished.set()
+    return generated
@@ -0,0 +1,82 @@
+import json
+import tarfile
+from pathlib import Path
+
+import pytest
+
+from caricature_generator.archives import TarShardReader, TarShardWriter, read_indexed
+from caricature_generator.manifest import ManifestRecord, RunManifest
+
+
+def test_writer_rolls_shards_and_indexes_outputs(tmp_path: Path) -> None:
+    writer = TarShardWriter(tmp_path, prefix="caricatures", max_members=2)
+    locations = [
+        writer.write(f"face{idx}_caricature_0.png", bytes([idx]) * 700, {"idx": idx})
+        for idx in range(5)
+    ]
+    writer.close()
+
+    assert sorted(path.name for path in tmp_path.glob("*.tar")) == [
+        "caricatures-000000.tar",
+        "caricatures-000001.tar",
+        "caricatures-000002.tar",
+    ]
+    assert locations[3] == tmp_path / "caricatures-000001.tar" / "face3_caricature_0.png"
+    assert read_indexed(locations[3].parent, locations[3].name) == bytes([3]) * 700
+    with tarfile.open(locations[0].parent) as archive:
+        assert archive.getnames()[:2] == ["face0_caricature_0.png", "face0_caricature_0.json"]
+        sidecar = archive.extractfile("face0_caricature_0.json")
+        assert sidecar is not None and json.loads(sidecar.read()) == {"idx": 0}
+
+    # A later run continues numbering instead of appending to existing shards, and ignores
+    # other archives that share the prefix.
+    (tmp_path / "caricatures-final.tar").write_bytes(b"")
+    (tmp_path / "caricatures-000009-old.tar").write_bytes(b"")
+    writer = TarShardWriter(tmp_path, prefix="caricatures")
+    assert writer.write("late.png", b"x", {}).parent.name == "caricatures-000003.tar"
+    writer.close()
+
+
+def test_reader_streams_images_in_order_and_stops_early(tmp_path: Path) -> None:
+    shards = []
+    for shard_idx in range(2):
+        shard = tmp_path / f"part-{shard_idx}.tar"
+        writer = TarShardWriter(tmp_path / "staging", prefix=f"p{shard_idx}")
+        for idx in range(3):
+            writer.write(f"img{shard_idx}{idx}.jpg", f"{shard_idx}{idx}".encode(), {})
+        writer.close()
+        next((tmp_path / "staging").glob(f"p{shard_idx}-*.tar")).rename(shard)
+        shards.append(shard)
+
+    members = list(TarShardReader(shards, {".jpg"}, prefetch=1))
+    assert [member.path for member in members] == [
+        shard / f"img{shard_idx}{idx}.jpg"
+        for shard_idx, shard in enumerate(shards)
+        for idx in range(3)
+    ]
+    assert members[4].data == b"11"
+
+    reader = iter(TarShardReader(shards, {".jpg"}, prefetch=1))
+    assert next(reader).data == b"00"
+    reader.close()  # joins the prefetch thread without draining the shards
+
+
+def test_reader_forwards_any_prefetch_error(tmp_path: Path) -> None:
+    with pytest.raises(FileNotFoundError):
+        list(TarShardReader([tmp_path / "missing.tar"], {".jpg"}))
+
+    def failing():
+        raise MemoryError
+        yield tmp_path
+
+    with pytest.raises(MemoryError):
+        list(TarShardReader(failing(), {".jpg"}))
+
+
+def test_archived_outputs_count_as_complete(tmp_path: Path) -> None:
+    shard = tmp_path / "caricatures-000000.tar"
+    shard.write_bytes(b"")
+    record = ManifestRecord(input="in", fingerprint="fp", outputs=[str(shard / "out.png")])
+    assert RunManifest.is_complete(record, "fp")
+    shard.unlink()
+    assert not RunManifest.is_complete(record, "fp")
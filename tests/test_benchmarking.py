@@ -0,0 +1,65 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from caricature_generator.benchmarking import (
+    BenchmarkReport,
+    compare_generator_variants,
+    image_drift,
+    run_benchmark,
+    synthesize_corpus,
+)
+from caricature_generator.config import PipelineConfig
+
+
+def test_compare_flags_regressions_beyond_tolerance() -> None:
+    report = BenchmarkReport(
+        images=10,
+        wall_seconds=10.0,
+        peak_rss_mb=500.0,
+        stages={"load": {"p50_ms": 30.0}, "save": {"p50_ms": 10.0}},
+    )
+    baseline = {
+        "images_per_second": 2.0,
+        "peak_rss_mb": 480.0,
+        "stages": {"load": {"p50_ms": 20.0}, "save": {"p50_ms": 9.5}},
+    }
+    regressions = report.compare(baseline, tolerance=0.1)
+    assert len(regressions) == 2
+    assert regressions[0].startswith("throughput")
+    assert regressions[1].startswith("load p50")
+
+
+def test_stub_benchmark_runs_offline(tmp_path: Path) -> None:
+    corpus = synthesize_corpus(tmp_path / "corpus", [(320, 240), (800, 600)], per_resolution=2)
+    config = PipelineConfig(
+        device="cpu", batch_size=2, preprocessing={"image_size": 128, "align_faces": False}
+    )
+    report = run_benchmark(config, corpus, output_dir=tmp_path / "out")
+
+    assert report.images == 4
+    assert report.stages["generate"]["count"] == 4
+    assert len(list((tmp_path / "out").glob("*.png"))) == 4
+
+
+def test_generator_variants_report_speed_and_drift() -> None:
+    pytest.importorskip("cv2")
+    config = PipelineConfig(device="cpu", batch_size=2, model={"backend": "classical"})
+    images = [Image.new("RGB", (64, 64), colour) for colour in ("orange", "teal", "gray")]
+    variants = {"float32": {}, "bf16_autocast": {"bf16_autocast": True}}
+
+    results = compare_generator_variants(config, images, variants, repeats=1)
+
+    assert [result.name for result in results] == ["float32", "bf16_autocast"]
+    assert results[0].speedup == 1.0
+    # The classical backend ignores acceleration options, so outputs match exactly.
+    assert results[1].psnr_db is None and results[1].mean_abs_error == 0.0
+
+
+def test_image_drift() -> None:
+    reference = Image.new("RGB", (4, 4), (100, 100, 100))
+    psnr, error = image_drift(reference, Image.new("RGB", (4, 4), (110, 100, 100)))
+    assert error == pytest.approx(10 / 3)
+    assert psnr == pytest.approx(10 * np.log10(255**2 / (100 / 3)))
@@ -0,0 +1,39 @@
+from pathlib import Path
+
+from caricature_generator.cache import ResultCache
+
+
+def _output(tmp_path: Path, name: str, size: int) -> Path:
+    path = tmp_path / "outputs" / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * size)
+    return path
+
+
+def test_store_lookup_and_restore(tmp_path: Path) -> None:
+    cache = ResultCache(tmp_path / "cache", max_bytes=10_000)
+    key = ResultCache.make_key("abc", {"model": {"steps": 25}})
+    assert key != ResultCache.make_key("abc", {"model": {"steps": 30}})
+    assert cache.lookup(key) is None
+
+    cache.store(key, [_output(tmp_path, "a.png", 10)], [{"prompt": "p"}])
+    entry = cache.lookup(key)
+    assert entry is not None and entry.metadata == [{"prompt": "p"}]
+
+    restored = cache.restore(entry, [tmp_path / "restored" / "a_caricature_0"])
+    assert restored == [tmp_path / "restored" / "a_caricature_0.png"]
+    assert restored[0].read_bytes() == b"x" * 10
+    assert (cache.stats.hits, cache.stats.misses, cache.stats.stores) == (1, 1, 1)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path: Path) -> None:
+    cache = ResultCache(tmp_path / "cache", max_bytes=250)
+    cache.store("first", [_output(tmp_path, "1.png", 100)], [{}])
+    cache.store("second", [_output(tmp_path, "2.png", 100)], [{}])
+    assert cache.lookup("first") is not None
+
+    cache.store("third", [_output(tmp_path, "3.png", 100)], [{}])
+    assert cache.lookup("second") is None
+    assert cache.lookup("first") is not None
+    assert cache.lookup("third") is not None
+    assert cache.stats.evictions == 1
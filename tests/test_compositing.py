@@ -0,0 +1,57 @@
+import pickle
+
+import numpy as np
+from PIL import Image
+
+from caricature_generator.config import PostprocessingConfig
+from caricature_generator.postprocessing import PostProcessingPipeline
+
+
+def _noise(size: tuple[int, int], seed: int) -> Image.Image:
+    rng = np.random.default_rng(seed)
+    return Image.fromarray(rng.integers(0, 255, size=(size[1], size[0], 3), dtype=np.uint8))
+
+
+def test_batch_blend_matches_pillow() -> None:
+    postprocess = PostProcessingPipeline(PostprocessingConfig(blend_alpha=0.7))
+    stylised = [_noise((32, 24), seed) for seed in range(3)] + [_noise((16, 16), 3)]
+    originals = [_noise((32, 24), seed + 10) for seed in range(3)] + [_noise((8, 8), 13)]
+
+    composed = postprocess.apply_batch(stylised, originals)
+
+    for image, styl, original in zip(composed, stylised, originals, strict=True):
+        resized = original.resize(styl.size, Image.Resampling.LANCZOS)
+        expected = Image.blend(resized, styl, alpha=0.7)
+        difference = np.abs(np.asarray(image, dtype=int) - np.asarray(expected, dtype=int))
+        assert difference.max() <= 1
+    # Results of earlier groups must not alias the reused work buffers.
+    again = postprocess.apply_batch(stylised[:1], originals[:1])[0]
+    assert again.tobytes() == composed[0].tobytes()
+
+
+def test_upscale_uses_configured_filter_and_survives_pickling() -> None:
+    config = PostprocessingConfig(blend_alpha=1.0, upscale=4, upscale_filter="nearest")
+    postprocess = pickle.loads(pickle.dumps(PostProcessingPipeline(config)))
+    image = _noise((10, 6), 0)
+
+    upscaled = postprocess.apply(image, image)
+
+    assert upscaled.size == (40, 24)
+    assert upscaled.tobytes() == image.resize((40, 24), Image.Resampling.NEAREST).tobytes()
+
+
+def test_save_honours_format_presets_and_atomic_writes(tmp_path) -> None:
+    image = _noise((64, 64), 0)
+    sizes = {}
+    for preset in ("fast", "small"):
+        config = PostprocessingConfig(encode_preset=preset, atomic_writes=True)
+        saved = PostProcessingPipeline(config).save(image, tmp_path / preset / "out")
+        assert saved == tmp_path / preset / "out.png"
+        assert Image.open(saved).tobytes() == image.tobytes()
+        assert [path.name for path in saved.parent.iterdir()] == ["out.png"]
+        sizes[preset] = saved.stat().st_size
+    assert sizes["small"] <= sizes["fast"]
+
+    jpeg = PostProcessingPipeline(PostprocessingConfig(output_format="jpg", quality=50))
+    saved = jpeg.save(image, tmp_path / "jpeg" / "out")
+    assert Image.open(saved).format == "JPEG"
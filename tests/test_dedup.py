@@ -0,0 +1,134 @@
+import random
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from caricature_generator.config import PipelineConfig
+from caricature_generator.dedup import DuplicateIndex, HammingIndex, dhash
+from caricature_generator.pipeline import CaricaturePipeline
+
+
+def _flip_bits(value: int, count: int, rng: random.Random) -> int:
+    for bit in rng.sample(range(64), count):
+        value ^= 1 << bit
+    return value
+
+
+def test_multi_index_matches_brute_force() -> None:
+    rng = random.Random(7)
+    index = HammingIndex(threshold=6)
+    hashes = [rng.getrandbits(64) for _ in range(5000)]
+    for value in hashes:
+        index.add(value)
+
+    for _ in range(200):
+        query = _flip_bits(rng.choice(hashes), rng.randint(0, 8), rng)
+        distances = [(value ^ query).bit_count() for value in hashes]
+        closest = min(distances)
+        found = index.nearest(query)
+        if closest > 6:
+            assert found is None
+        else:
+            assert found is not None and found[1] == closest
+
+
+def test_index_persists_outputs_per_settings(tmp_path: Path) -> None:
+    output = tmp_path / "a_caricature_0.png"
+    output.write_bytes(b"png")
+    path = tmp_path / "dedup.sqlite"
+
+    index = DuplicateIndex(path, threshold=4, settings_digest="v1")
+    original = index.register("a.jpg", 0xF0F0)
+    assert original.duplicate_of is None
+    assert index.register("b.jpg", 0xF0F1).duplicate_of == "a.jpg"
+    index.complete(original.entry, [str(output)])
+    index.close()
+
+    reopened = DuplicateIndex(path, threshold=4, settings_digest="v1")
+    match = reopened.register("c.jpg", 0xF0F3)
+    assert (match.duplicate_of, match.distance) == ("a.jpg", 2)
+    assert reopened.outputs(match.entry) == [str(output)]
+    assert reopened.register("a.jpg", 0xF0F0).duplicate_of is None
+    assert len(DuplicateIndex(path, threshold=4, settings_digest="v2")) == 0
+
+
+def test_taking_over_a_stale_entry_drops_its_row(tmp_path: Path) -> None:
+    output = tmp_path / "a_caricature_0.png"
+    output.write_bytes(b"png")
+    path = tmp_path / "dedup.sqlite"
+    index = DuplicateIndex(path, threshold=4, settings_digest="v1")
+    index.complete(index.register("a.jpg", 0xF0F0).entry, [str(output)])
+    index.close()
+
+    output.unlink()
+    index = DuplicateIndex(path, threshold=4, settings_digest="v1")
+    taken = index.register("b.jpg", 0xF0F1)
+    assert taken.duplicate_of is None
+    regenerated = tmp_path / "b_caricature_0.png"
+    regenerated.write_bytes(b"png")
+    index.complete(taken.entry, [str(regenerated)])
+    index.close()
+
+    reopened = DuplicateIndex(path, threshold=4, settings_digest="v1")
+    assert len(reopened) == 1
+    match = reopened.register("c.jpg", 0xF0F1)
+    assert (match.duplicate_of, match.distance) == ("b.jpg", 0)
+
+
+def test_taking_over_a_stale_entry_moves_it_to_the_new_hash(tmp_path: Path) -> None:
+    index = DuplicateIndex(tmp_path / "dedup.sqlite", threshold=4, settings_digest="v1")
+    gone = tmp_path / "a_caricature_0.png"
+    index.complete(index.register("a.jpg", 0x0000).entry, [str(gone)])
+
+    taken = index.register("b.jpg", 0x000F)
+    assert taken.duplicate_of is None
+    output = tmp_path / "b_caricature_0.png"
+    output.write_bytes(b"png")
+    index.complete(taken.entry, [str(output)])
+
+    # Eight bits from the old hash but four from the new one.
+    match = index.register("c.jpg", 0x00FF)
+    assert (match.entry, match.duplicate_of, match.distance) == (taken.entry, "b.jpg", 4)
+    assert index.register("d.jpg", 0x0000).distance == 4
+    index.close()
+
+
+def test_dhash_survives_resizing() -> None:
+    gradient = np.add.outer(np.arange(240), np.arange(320)) % 256
+    photo = Image.fromarray(np.stack([gradient] * 3, axis=-1).astype(np.uint8))
+    other = Image.fromarray(np.stack([gradient.T[:240, :240]] * 3, axis=-1).astype(np.uint8))
+
+    assert (dhash(photo) ^ dhash(photo.resize((160, 120)))).bit_count() <= 2
+    assert (dhash(photo) ^ dhash(other)).bit_count() > 7
+
+
+def test_pipeline_reuses_outputs_of_near_duplicates(tmp_path: Path) -> None:
+    inputs = tmp_path / "in"
+    inputs.mkdir()
+    photo = Image.linear_gradient("L").convert("RGB")
+    photo.save(inputs / "a.png")
+    photo.resize((128, 128)).save(inputs / "b.png")
+    config = PipelineConfig(
+        input_dir=inputs,
+        output_dir=tmp_path / "out",
+        device="cpu",
+        batch_size=1,
+        model={"backend": "stub"},
+        preprocessing={"image_size": 64, "align_faces": False},
+        dedup={"enabled": True, "index_path": tmp_path / "dedup.sqlite"},
+        logging={"log_dir": tmp_path / "logs"},
+    )
+
+    pipeline = CaricaturePipeline(config)
+    artifacts = pipeline.run()
+
+    assert pipeline.metrics.counters["duplicates"] == 1
+    assert pipeline.metrics.counters.get("generated_images") == 1
+    reused = artifacts[-1]
+    assert reused.metadata == {"duplicate_of": str(inputs / "a.png"), "hamming_distance": 0}
+    assert reused.output_path.read_bytes() == artifacts[0].output_path.read_bytes()
+
+    # Each run opens and closes the index, so the pipeline can run again.
+    rerun = pipeline.run()
+    assert rerun[-1].metadata["duplicate_of"] == str(inputs / "a.png")
@@ -0,0 +1,61 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from caricature_generator.preprocessing.exaggeration import (
+    MESH_LANDMARKS,
+    FeatureExaggerator,
+    mesh_topology,
+)
+
+pytest.importorskip("cv2")
+
+
+@pytest.fixture
+def mean_face(tmp_path: Path) -> Path:
+    rng = np.random.default_rng(0)
+    angle = rng.uniform(0.0, 2.0 * np.pi, MESH_LANDMARKS)
+    radius = np.sqrt(rng.uniform(0.0, 1.0, MESH_LANDMARKS))
+    path = tmp_path / "mean_face.npy"
+    np.save(path, np.stack([0.7 * radius * np.cos(angle), radius * np.sin(angle)], axis=1))
+    return path
+
+
+def _portrait() -> Image.Image:
+    rng = np.random.default_rng(1)
+    return Image.fromarray(rng.integers(0, 255, size=(128, 128, 3), dtype=np.uint8))
+
+
+def test_topology_is_computed_once_and_covers_the_mesh(mean_face: Path) -> None:
+    vertices, triangles = mesh_topology(mean_face)
+    assert mesh_topology(mean_face)[1] is triangles
+    assert vertices.shape[0] > MESH_LANDMARKS
+    assert set(np.unique(triangles)) == set(range(len(vertices)))
+
+
+def test_average_face_is_left_unchanged(mean_face: Path) -> None:
+    vertices, _ = mesh_topology(mean_face)
+    image = _portrait()
+    # A rotated, scaled and shifted copy of the mean face has no offsets to exaggerate.
+    rotation = np.array([[0.8, -0.3], [0.3, 0.8]])
+    landmarks = vertices[:MESH_LANDMARKS] @ rotation.T * 25.0 + 64.0
+
+    warped = FeatureExaggerator(1.0, mean_face).warp(image, landmarks)
+    difference = np.abs(np.asarray(warped, dtype=float) - np.asarray(image, dtype=float))
+    assert difference.max() < 1.0
+
+
+def test_distinctive_features_are_pushed_further(mean_face: Path) -> None:
+    vertices, _ = mesh_topology(mean_face)
+    image = _portrait()
+    landmarks = vertices[:MESH_LANDMARKS] * 25.0 + 64.0
+    landmarks[:, 0] += (landmarks[:, 0] - 64.0) * 0.3  # a wider-than-average face
+
+    warped = FeatureExaggerator(1.0, mean_face).warp(image, landmarks)
+    assert warped.size == image.size
+    changed = np.abs(np.asarray(warped, dtype=float) - np.asarray(image, dtype=float)) > 1.0
+    assert changed.any()
+    # Pixels beyond the anchor ring stay where they were.
+    assert not changed[:3, :3].any()
@@ -0,0 +1,117 @@
+import operator
+import random
+import time
+from pathlib import Path
+
+import pytest
+
+from caricature_generator.executor import Stage, StagedExecutor
+from caricature_generator.logging_utils import get_logger
+from caricature_generator.memory import MemoryBudget, current_rss_mb
+
+
+def _jittered_double(value: int) -> int:
+    time.sleep(random.uniform(0, 0.005))
+    return value * 2
+
+
+def test_results_keep_input_order_across_workers() -> None:
+    executor = StagedExecutor(
+        [
+            Stage("double", _jittered_double, workers=4),
+            Stage("increment", lambda value: value + 1, workers=3),
+        ],
+        queue_size=2,
+    )
+    assert list(executor.run(range(50))) == [value * 2 + 1 for value in range(50)]
+
+
+def test_batched_stage_and_dropped_items() -> None:
+    batches = []
+
+    def collect(values: list[int]) -> list[int]:
+        batches.append(list(values))
+        return [-value for value in values]
+
+    executor = StagedExecutor(
+        [
+            Stage("filter", lambda value: value if value % 3 else None, workers=2),
+            Stage("batch", collect, mode="inline", batch_size=4),
+        ]
+    )
+    assert list(executor.run(range(12))) == [-1, -2, -4, -5, -7, -8, -10, -11]
+    assert batches == [[1, 2, 4, 5], [7, 8, 10, 11]]
+
+
+def test_partial_batch_is_due_max_wait_after_its_first_item() -> None:
+    batches = []
+
+    def trickle():
+        for value in range(10):
+            time.sleep(0.05)  # well inside max_wait, so an idle timer would never fire
+            yield value
+
+    def collect(values: list[int]) -> list[int]:
+        batches.append(list(values))
+        return values
+
+    executor = StagedExecutor(
+        [Stage("batch", collect, mode="inline", batch_size=100, max_wait=0.2)]
+    )
+    assert list(executor.run(trickle())) == list(range(10))
+    assert len(batches) > 1
+
+
+def _log_value(value: int) -> int:
+    get_logger(__name__).debug("debug line from a worker")
+    get_logger(__name__).warning("warning from a worker")
+    return value
+
+
+def test_process_workers_follow_the_logging_config(tmp_path: Path, capfd) -> None:
+    stage = Stage("log", _log_value, workers=1, mode="process")
+    executor = StagedExecutor([stage], log_config=("WARNING", tmp_path))
+
+    assert list(executor.run([7])) == [7]
+
+    assert "warning from a worker" in (tmp_path / "pipeline.log").read_text()
+    assert "debug line" not in capfd.readouterr().err
+
+
+def test_process_stage() -> None:
+    executor = StagedExecutor([Stage("negate", operator.neg, workers=2, mode="process")])
+    assert list(executor.run([1, 2, 3])) == [-1, -2, -3]
+
+
+def test_stage_errors_propagate_to_consumer() -> None:
+    def explode(value: int) -> int:
+        if value == 3:
+            raise ValueError("boom")
+        return value
+
+    executor = StagedExecutor([Stage("explode", explode, workers=2)])
+    with pytest.raises(ValueError, match="boom"):
+        list(executor.run(range(10)))
+
+
+def test_memory_budget_limits_items_in_flight() -> None:
+    # A zero budget is always exceeded, so one item at a time is admitted.
+    budget = MemoryBudget(limit_mb=0, poll_interval=0.01)
+    executor = StagedExecutor(
+        [
+            Stage("filter", lambda value: value if value % 4 else None, workers=2),
+            Stage("double", _jittered_double, workers=3),
+        ],
+        budget=budget,
+    )
+    assert list(executor.run(range(12))) == [value * 2 for value in range(12) if value % 4]
+    assert budget.peak_in_flight == 1
+    assert budget.in_flight == 0
+    assert budget.throttled > 0
+
+    roomy = MemoryBudget(limit_mb=current_rss_mb() + 4096)
+    assert list(StagedExecutor([Stage("double", _jittered_double)], budget=roomy).run(range(20)))
+    assert roomy.peak_in_flight > 1
+
+    with pytest.raises(ValueError):
+        StagedExecutor([Stage("batch", lambda values: values, batch_size=4)], budget=budget)
@@ -0,0 +1,61 @@
+import pickle
+import threading
+from types import SimpleNamespace
+
+import numpy as np
+from PIL import Image
+
+from caricature_generator.preprocessing import facial_landmarks
+from caricature_generator.preprocessing.facial_landmarks import FacialLandmarkDetector
+
+
+class _FakeFaceMesh:
+    created: list["_FakeFaceMesh"] = []
+
+    def __init__(self, **options) -> None:
+        self.options = options
+        self.shapes: list[tuple[int, ...]] = []
+        _FakeFaceMesh.created.append(self)
+
+    def process(self, array: np.ndarray) -> SimpleNamespace:
+        self.shapes.append(array.shape)
+        landmark = SimpleNamespace(x=0.5, y=0.25)
+        return SimpleNamespace(multi_face_landmarks=[SimpleNamespace(landmark=[landmark] * 3)])
+
+
+def _fake_mediapipe(monkeypatch) -> None:
+    _FakeFaceMesh.created = []
+    face_mesh = SimpleNamespace(FaceMesh=_FakeFaceMesh)
+    fake = SimpleNamespace(solutions=SimpleNamespace(face_mesh=face_mesh))
+    monkeypatch.setattr(facial_landmarks, "_import_mediapipe", lambda: fake)
+
+
+def test_detects_on_proxy_and_scales_back(monkeypatch) -> None:
+    _fake_mediapipe(monkeypatch)
+    detector = FacialLandmarkDetector(detection_size=640)
+
+    result = detector.detect(Image.new("L", (4000, 3000)))
+
+    (mesh,) = _FakeFaceMesh.created
+    assert mesh.options["static_image_mode"] is True
+    assert mesh.shapes == [(480, 640, 3)]
+    assert result is not None
+    np.testing.assert_allclose(result.landmarks, [[2000.0, 750.0]] * 3)
+
+
+def test_each_thread_gets_its_own_mesh(monkeypatch) -> None:
+    _fake_mediapipe(monkeypatch)
+    detector = pickle.loads(pickle.dumps(FacialLandmarkDetector(detection_size=0)))
+    image = Image.new("RGB", (64, 48))
+
+    threads = [threading.Thread(target=detector.detect, args=(image,)) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    detector.detect(image)
+    detector.detect(image)
+
+    assert len(_FakeFaceMesh.created) == 4
+    assert [len(mesh.shapes) for mesh in _FakeFaceMesh.created] == [1, 1, 1, 2]
+    assert _FakeFaceMesh.created[-1].shapes[-1] == (48, 64, 3)
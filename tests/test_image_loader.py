@@ -0,0 +1,39 @@
+from pathlib import Path
+
+from PIL import Image
+
+from caricature_generator.preprocessing import ImageLoader
+
+
+def test_list_files_walks_tree_in_sorted_order(tmp_path: Path) -> None:
+    (tmp_path / "a").mkdir()
+    for relative in ("b.png", "a/z.jpg", "a.jpg", "notes.txt"):
+        Image.new("RGB", (8, 8)).save(tmp_path / relative, format="PNG")
+
+    files = list(ImageLoader(tmp_path).list_files())
+    assert files == [tmp_path / "a" / "z.jpg", tmp_path / "a.jpg", tmp_path / "b.png"]
+
+
+def test_jpeg_draft_decoding_keeps_header_dimensions(tmp_path: Path) -> None:
+    path = tmp_path / "portrait.jpg"
+    Image.new("RGB", (1600, 1200), "gray").save(path, format="JPEG")
+
+    batch = ImageLoader(tmp_path, decode_size=256).load_path(path)
+    assert batch is not None
+    assert (batch.metadata["width"], batch.metadata["height"]) == (1600, 1200)
+    assert batch.image.size == (400, 300)
+    assert batch.metadata["filesize"] == path.stat().st_size
+
+
+def test_shards_partition_the_tree(tmp_path: Path) -> None:
+    (tmp_path / "nested").mkdir()
+    for idx in range(12):
+        folder = tmp_path / "nested" if idx % 2 else tmp_path
+        Image.new("RGB", (8, 8)).save(folder / f"{idx:02d}.png", format="PNG")
+
+    everything = list(ImageLoader(tmp_path).list_files())
+    shards = [
+        list(ImageLoader(tmp_path, shard_index=idx, shard_count=3).list_files()) for idx in range(3)
+    ]
+    assert sorted(path for shard in shards for path in shard) == sorted(everything)
+    assert sum(len(shard) for shard in shards) == len(everything)
@@ -0,0 +1,27 @@
+import pickle
+from pathlib import Path
+
+import numpy as np
+
+from caricature_generator.preprocessing.facial_landmarks import LandmarkResult
+from caricature_generator.preprocessing.landmark_store import LandmarkStore
+
+
+def test_round_trip_across_instances(tmp_path: Path) -> None:
+    store = LandmarkStore(tmp_path)
+    settings = {"min_detection_confidence": 0.5}
+    face_key = LandmarkStore.make_key("face", settings)
+    empty_key = LandmarkStore.make_key("empty", settings)
+
+    assert store.get(face_key) == (False, None)
+    points = np.array([[1.5, 2.0], [3.0, 4.25]], dtype=np.float32)
+    store.put(face_key, LandmarkResult(landmarks=points, score=0.9))
+    store.put(empty_key, None)
+
+    reopened = pickle.loads(pickle.dumps(LandmarkStore(tmp_path)))
+    found, result = reopened.get(face_key)
+    assert found and result is not None
+    np.testing.assert_array_equal(result.landmarks, [[1.5, 2.0], [3.0, 4.25]])
+    assert result.score == 0.9
+    assert reopened.get(empty_key) == (True, None)
+    assert (reopened.hits, reopened.misses) == (2, 0)
@@ -0,0 +1,47 @@
+from pathlib import Path
+
+from caricature_generator.manifest import (
+    ManifestRecord,
+    RunManifest,
+    file_fingerprint,
+    manifest_name,
+)
+
+
+def test_latest_record_wins_and_truncated_lines_are_ignored(tmp_path: Path) -> None:
+    source = tmp_path / "face.jpg"
+    source.write_bytes(b"jpeg")
+    output = tmp_path / "face_caricature_0.png"
+    output.write_bytes(b"png")
+    fingerprint = file_fingerprint(source, "settings")
+
+    manifest = RunManifest(tmp_path / "manifest.jsonl")
+    manifest.append(ManifestRecord(input=str(source), fingerprint="stale", outputs=[]))
+    manifest.append(
+        ManifestRecord(input=str(source), fingerprint=fingerprint, outputs=[str(output)])
+    )
+    manifest.close()
+    with manifest.path.open("a", encoding="utf-8") as fh:
+        fh.write('{"input": "crashed mid-wri')
+
+    records = manifest.load()
+    assert RunManifest.is_complete(records[str(source)], fingerprint)
+    assert not RunManifest.is_complete(records[str(source)], file_fingerprint(source, "other"))
+
+    output.unlink()
+    assert not RunManifest.is_complete(records[str(source)], fingerprint)
+
+
+def test_merge_folds_shard_manifests_into_one(tmp_path: Path) -> None:
+    shard_paths = [tmp_path / manifest_name(idx, 2) for idx in range(2)]
+    for idx, path in enumerate(shard_paths):
+        shard = RunManifest(path)
+        shard.append(ManifestRecord(input=f"input-{idx}", fingerprint="fp", outputs=[]))
+        shard.close()
+
+    manifest = RunManifest(tmp_path / manifest_name())
+    manifest.merge(shard_paths)
+    manifest.close()
+
+    assert set(manifest.load()) == {"input-0", "input-1"}
+    assert not any(path.exists() for path in shard_paths)
@@ -0,0 +1,33 @@
+import pickle
+
+from caricature_generator.metrics import PipelineMetrics
+
+
+def test_drained_metrics_merge_across_pickling() -> None:
+    worker = PipelineMetrics()
+    worker.observe("detect", 0.02)
+    worker.observe("detect", 0.3)
+    worker.increment("faces_found")
+    worker.set_max("peak_rss_mb", 512.0)
+
+    run = PipelineMetrics()
+    run.increment("faces_found", 2)
+    run.merge(pickle.loads(pickle.dumps(worker.drain())))
+
+    assert worker.to_dict() == {"stages": {}, "counters": {}, "gauges": {}}
+    summary = run.to_dict()
+    assert summary["stages"]["detect"]["count"] == 2
+    assert summary["counters"] == {"faces_found": 3.0}
+    assert summary["gauges"] == {"peak_rss_mb": 512.0}
+
+
+def test_prometheus_exposition() -> None:
+    metrics = PipelineMetrics()
+    metrics.observe("save", 0.2)
+    metrics.increment("cache hits")
+    text = metrics.to_prometheus()
+
+    assert 'caricature_stage_seconds_bucket{stage="save",le="0.1"} 0' in text
+    assert 'caricature_stage_seconds_bucket{stage="save",le="0.25"} 1' in text
+    assert 'caricature_stage_seconds_count{stage="save"} 1' in text
+    assert "caricature_cache_hits_total 1.0" in text
@@ -0,0 +1,63 @@
+import json
+import threading
+import time
+from pathlib import Path
+
+from PIL import Image
+
+from caricature_generator.config import ModelConfig
+from caricature_generator.models.diffusers_wrapper import (
+    SNAPSHOT_MARKER,
+    DiffusersCaricatureModel,
+    DiffusersInput,
+)
+
+
+class _EchoPipe:
+    def __call__(self, prompt, negative_prompt, image, **_):
+        return type("Output", (), {"images": list(image)})()
+
+
+def test_warmup_loads_once_in_background(monkeypatch) -> None:
+    builds: list[str] = []
+    release = threading.Event()
+
+    def build(self) -> _EchoPipe:
+        builds.append(threading.current_thread().name)
+        release.wait(timeout=5)
+        return _EchoPipe()
+
+    monkeypatch.setattr(DiffusersCaricatureModel, "_build_pipeline", build)
+    model = DiffusersCaricatureModel(ModelConfig(prompt_cache_size=0), device="cpu")
+    model.warmup()
+    model.warmup()  # already loading
+    while not builds:
+        time.sleep(0.01)
+
+    # generate blocks on the in-flight load instead of starting another one.
+    image = Image.new("RGB", (8, 8))
+    bundle = DiffusersInput(prompt="caricature", negative_prompt=None, strength=0.5)
+    result: list[list[Image.Image]] = []
+    caller = threading.Thread(target=lambda: result.append(model.generate(image, bundle)))
+    caller.start()
+    time.sleep(0.05)
+    assert not result
+    release.set()
+    caller.join(timeout=5)
+
+    assert builds == ["model-warmup"]
+    assert len(result[0]) == 1
+    assert model.metrics.histograms["model_load"].count == 1
+
+
+def test_snapshot_is_used_only_for_its_source_model(tmp_path: Path) -> None:
+    config = ModelConfig(snapshot_dir=tmp_path)
+    model = DiffusersCaricatureModel(config, device="cpu")
+    assert model._snapshot_source() is None  # nothing saved yet
+
+    marker = tmp_path / SNAPSHOT_MARKER
+    marker.write_text(json.dumps({"pretrained_model": config.pretrained_model}))
+    assert model._snapshot_source() == tmp_path
+
+    marker.write_text(json.dumps({"pretrained_model": "someone/else"}))
+    assert model._snapshot_source() is None
@@ -0,0 +1,86 @@
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from caricature_generator.cache import ResultCache
+from caricature_generator.config import PipelineConfig
+from caricature_generator.models.stub import StubCaricatureModel
+from caricature_generator.pipeline import CaricaturePipeline
+
+
+class _RecordingStub(StubCaricatureModel):
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.batches: list[int] = []
+
+    def generate_batch(self, base_images, prompts):
+        self.batches.append(len(base_images))
+        return super().generate_batch(base_images, prompts)
+
+
+def test_batched_generation_maps_inputs_to_their_outputs(tmp_path: Path) -> None:
+    inputs = tmp_path / "in"
+    inputs.mkdir()
+    colours = {
+        "red.png": (255, 0, 0),
+        "green.jpg": (0, 255, 0),
+        "blue.png": (0, 0, 255),
+        "grey.png": (128, 128, 128),
+        "yellow.jpg": (255, 255, 0),
+    }
+    for idx, (name, colour) in enumerate(colours.items()):
+        image = Image.new("RGB", (80 + 16 * idx, 96), colour)
+        (image.convert("L") if name == "grey.png" else image).save(inputs / name)
+    config = PipelineConfig(
+        input_dir=inputs,
+        output_dir=tmp_path / "out",
+        device="cpu",
+        batch_size=3,
+        model={"backend": "stub"},
+        preprocessing={"image_size": 64, "align_faces": False},
+        logging={"log_dir": tmp_path / "logs"},
+    )
+    pipeline = CaricaturePipeline(config)
+    generator = _RecordingStub(config.model, batch_size=config.batch_size)
+    pipeline._generator = generator
+
+    artifacts = pipeline.run()
+
+    assert sorted(generator.batches) == [2, 3]
+    outputs: dict[str, list[Path]] = {}
+    for artifact in artifacts:
+        outputs.setdefault(artifact.input_path.name, []).append(artifact.output_path)
+    assert sorted(outputs) == sorted(colours)
+    assert len({path for paths in outputs.values() for path in paths}) == len(artifacts)
+    for name, paths in outputs.items():
+        assert len(paths) == len(outputs["red.png"])
+        for path in paths:
+            mean = np.asarray(Image.open(path).convert("RGB"), dtype=np.float32).mean(axis=(0, 1))
+            np.testing.assert_allclose(mean, colours[name], atol=40)
+
+
+def test_each_run_opens_and_closes_the_result_cache(tmp_path: Path, monkeypatch) -> None:
+    inputs = tmp_path / "in"
+    inputs.mkdir()
+    Image.new("RGB", (96, 96), "orange").save(inputs / "face.png")
+    config = PipelineConfig(
+        input_dir=inputs,
+        output_dir=tmp_path / "out",
+        device="cpu",
+        batch_size=1,
+        model={"backend": "stub"},
+        preprocessing={"image_size": 64, "align_faces": False},
+        cache={"enabled": True, "directory": tmp_path / "cache"},
+        logging={"log_dir": tmp_path / "logs"},
+    )
+    closed: list[ResultCache] = []
+    close = ResultCache.close
+    monkeypatch.setattr(ResultCache, "close", lambda cache: closed.append(cache) or close(cache))
+    pipeline = CaricaturePipeline(config)
+
+    pipeline.run()
+    pipeline.run()
+
+    assert len(closed) == 2 and closed[0] is not closed[1]
+    assert pipeline.metrics.counters["cache_hits"] == 1
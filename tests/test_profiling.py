@@ -0,0 +1,20 @@
+import pstats
+from pathlib import Path
+
+from caricature_generator.executor import Stage, StagedExecutor
+from caricature_generator.profiling import profile_run
+
+
+def _profiled_square(value: int) -> int:
+    return value * value
+
+
+def test_cprofile_covers_threaded_stages(tmp_path: Path) -> None:
+    output = tmp_path / "profile.pstats"
+    executor = StagedExecutor([Stage("square", _profiled_square, workers=2, mode="thread")])
+
+    with profile_run("cprofile", output):
+        assert list(executor.run(range(20))) == [value * value for value in range(20)]
+
+    functions = {name for _, _, name in pstats.Stats(str(output)).stats}
+    assert "_profiled_square" in functions
@@ -0,0 +1,47 @@
+import types
+
+import pytest
+from PIL import Image
+
+from caricature_generator.config import ModelConfig
+from caricature_generator.models.diffusers_wrapper import (
+    DiffusersCaricatureModel,
+    DiffusersInput,
+    PromptEmbeddingCache,
+)
+
+
+def test_prompt_cache_evicts_least_recently_used() -> None:
+    cache = PromptEmbeddingCache(max_entries=2)
+    cache.put(("model", "a"), "A")
+    cache.put(("model", "b"), "B")
+    assert cache.get(("model", "a")) == "A"
+    cache.put(("model", "c"), "C")
+
+    assert cache.get(("model", "b")) is None
+    assert cache.get(("model", "a")) == "A"
+    assert cache.get(("model", "c")) == "C"
+
+
+def test_generate_batch_encodes_each_prompt_once() -> None:
+    torch = pytest.importorskip("torch")
+    encoded: list[str] = []
+
+    class FakePipe:
+        def encode_prompt(self, text, device, num_images_per_prompt, do_classifier_free_guidance):
+            encoded.append(text)
+            return torch.zeros(1, 4, 8), None
+
+        def __call__(self, prompt_embeds, negative_prompt_embeds, image, **_):
+            assert prompt_embeds.shape[0] == negative_prompt_embeds.shape[0] == len(image)
+            return types.SimpleNamespace(images=list(image))
+
+    model = DiffusersCaricatureModel(ModelConfig(), device="cpu", batch_size=2)
+    model._pipeline = FakePipe()
+    bundle = DiffusersInput(prompt="caricature", negative_prompt="ugly", strength=0.5)
+    images = [Image.new("RGB", (8, 8)) for _ in range(4)]
+
+    model.generate_batch(images, [bundle] * len(images))
+
+    assert sorted(encoded) == ["caricature", "ugly"]
+    assert model.metrics.counters == {"prompt_cache_hits": 6.0, "prompt_cache_misses": 2.0}
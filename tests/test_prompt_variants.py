@@ -0,0 +1,48 @@
+from types import SimpleNamespace
+
+import pytest
+from PIL import Image
+
+from caricature_generator.config import ModelConfig
+from caricature_generator.models.diffusers_wrapper import DiffusersCaricatureModel, DiffusersInput
+
+
+def test_prompt_variants_share_one_vae_encoding() -> None:
+    torch = pytest.importorskip("torch")
+    encoded: list[int] = []
+    calls: list[tuple[tuple[int, ...], float]] = []
+
+    class FakeVae:
+        dtype = torch.float32
+        config = SimpleNamespace(scaling_factor=0.5)
+
+        def encode(self, pixels):
+            encoded.append(pixels.shape[0])
+            latents = torch.ones(pixels.shape[0], 4, 2, 2)
+            return SimpleNamespace(latent_dist=SimpleNamespace(sample=lambda: latents))
+
+    class FakePipe:
+        vae = FakeVae()
+        image_processor = SimpleNamespace(
+            preprocess=lambda images: torch.zeros(len(images), 3, 8, 8)
+        )
+
+        def __call__(self, prompt, negative_prompt, image, strength, **_):
+            assert float(image.max()) == 0.5  # scaled latents, not pixels
+            calls.append((tuple(image.shape), strength))
+            return SimpleNamespace(images=[Image.new("RGB", (8, 8))] * image.shape[0])
+
+    model = DiffusersCaricatureModel(ModelConfig(prompt_cache_size=0), device="cpu", batch_size=4)
+    model._pipeline = FakePipe()
+    variants = [
+        DiffusersInput(prompt="ink", negative_prompt=None, strength=0.5),
+        DiffusersInput(prompt="watercolour", negative_prompt=None, strength=0.5),
+        DiffusersInput(prompt="clay", negative_prompt=None, strength=0.7),
+    ]
+    images = [Image.new("RGB", (8, 8)) for _ in range(2)]
+
+    outputs = model.generate_batch(images, [variants] * len(images))
+
+    assert encoded == [2]
+    assert sorted(calls) == [((2, 4, 2, 2), 0.7), ((4, 4, 2, 2), 0.5)]
+    assert [len(per_image) for per_image in outputs] == [3, 3]
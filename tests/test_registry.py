@@ -0,0 +1,44 @@
+import pytest
+from PIL import Image
+
+from caricature_generator.config import ModelConfig
+from caricature_generator.models import (
+    CaricatureGenerator,
+    ClassicalCaricatureModel,
+    DiffusersInput,
+    StubCaricatureModel,
+    create_generator,
+    register_backend,
+)
+
+
+def test_backend_is_selected_by_config() -> None:
+    assert isinstance(create_generator(ModelConfig(backend="stub")), StubCaricatureModel)
+    classical = create_generator(ModelConfig(backend="classical"), device="cpu", batch_size=2)
+    assert isinstance(classical, ClassicalCaricatureModel)
+    assert isinstance(classical, CaricatureGenerator)
+
+    with pytest.raises(ValueError, match="Unknown model backend"):
+        create_generator(ModelConfig(backend="missing"))
+
+
+def test_registered_backend_receives_construction_arguments() -> None:
+    register_backend("custom", StubCaricatureModel)
+    generator = create_generator(ModelConfig(backend="custom"), batch_size=3)
+    assert isinstance(generator, StubCaricatureModel)
+
+
+def test_classical_backend_returns_one_output_per_bundle() -> None:
+    pytest.importorskip("cv2")
+    model = ClassicalCaricatureModel(ModelConfig(backend="classical"), batch_size=2)
+    bundles = [
+        DiffusersInput(prompt="a", negative_prompt=None, strength=0.0),
+        DiffusersInput(prompt="b", negative_prompt=None, strength=1.0),
+    ]
+    images = [Image.new("RGB", (64, 48), "orange") for _ in range(3)] + [Image.new("RGB", (32, 32))]
+
+    outputs = model.generate_batch(images, [bundles] * len(images))
+
+    assert [len(per_image) for per_image in outputs] == [2, 2, 2, 2]
+    assert outputs[0][0].tobytes() == images[0].tobytes()  # strength 0 keeps the input
+    assert outputs[3][1].size == (32, 32)
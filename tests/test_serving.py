@@ -0,0 +1,142 @@
+import asyncio
+import io
+import time
+
+import pytest
+from PIL import Image
+
+from caricature_generator.config import PipelineConfig
+from caricature_generator.models.stub import StubCaricatureModel
+from caricature_generator.serving import (
+    CaricatureServer,
+    CaricatureService,
+    MicroBatcher,
+    OverloadedError,
+)
+
+
+def test_micro_batcher_groups_concurrent_requests() -> None:
+    seen: list[int] = []
+
+    def handler(items: list[int]) -> list[int]:
+        seen.append(len(items))
+        return [item * 2 for item in items]
+
+    async def scenario() -> list[int]:
+        batcher = MicroBatcher(handler, max_batch_size=4, max_wait_ms=50, max_queue_size=16)
+        batcher.start()
+        results = await asyncio.gather(*(batcher.submit(value) for value in range(6)))
+        await batcher.stop()
+        return list(results)
+
+    assert asyncio.run(scenario()) == [0, 2, 4, 6, 8, 10]
+    assert seen == [4, 2]
+
+
+def test_micro_batcher_rejects_when_queue_is_full() -> None:
+    def handler(items: list[int]) -> list[int]:
+        time.sleep(0.2)
+        return items
+
+    async def scenario() -> None:
+        batcher = MicroBatcher(handler, max_batch_size=1, max_wait_ms=0, max_queue_size=1)
+        batcher.start()
+        first = asyncio.ensure_future(batcher.submit(1))
+        await asyncio.sleep(0.05)  # first request is now running, the queue is empty
+        second = asyncio.ensure_future(batcher.submit(2))
+        await asyncio.sleep(0)
+        with pytest.raises(OverloadedError):
+            await batcher.submit(3)
+        assert await first == 1 and await second == 2
+        await batcher.stop()
+
+    asyncio.run(scenario())
+
+
+def test_micro_batcher_isolates_failing_requests() -> None:
+    def handler(items: list[int]) -> list[int]:
+        if any(item < 0 for item in items):
+            raise ValueError("negative input")
+        return [item * 2 for item in items]
+
+    async def scenario() -> list:
+        batcher = MicroBatcher(handler, max_batch_size=4, max_wait_ms=50, max_queue_size=16)
+        batcher.start()
+        results = await asyncio.gather(
+            *(batcher.submit(value) for value in (1, -1, 3)), return_exceptions=True
+        )
+        await batcher.stop()
+        return list(results)
+
+    first, failed, last = asyncio.run(scenario())
+    assert (first, last) == (2, 6)
+    assert isinstance(failed, ValueError)
+
+
+def _stub_config() -> PipelineConfig:
+    config = PipelineConfig(batch_size=2, device="cpu")
+    config.preprocessing.align_faces = False
+    config.preprocessing.image_size = 64
+    config.serving.port = 0
+    config.serving.warmup = False
+    return config
+
+
+def test_server_returns_caricature_from_stub(tmp_path) -> None:
+    config = _stub_config()
+    service = CaricatureService(config, generator=StubCaricatureModel(config.model))
+    buffer = io.BytesIO()
+    Image.new("RGB", (96, 80), "orange").save(buffer, format="PNG")
+    payload = buffer.getvalue()
+
+    async def request(port: int) -> bytes:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        head = f"POST /v1/caricatures HTTP/1.1\r\nContent-Length: {len(payload)}\r\n\r\n"
+        writer.write(head.encode() + payload)
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        return response
+
+    async def scenario() -> list[bytes]:
+        server = CaricatureServer(config, service=service)
+        await server.start()
+        try:
+            return await asyncio.gather(request(server.port), request(server.port))
+        finally:
+            await server.stop()
+
+    for response in asyncio.run(scenario()):
+        head, _, body = response.partition(b"\r\n\r\n")
+        assert head.startswith(b"HTTP/1.1 200")
+        assert Image.open(io.BytesIO(body)).size == (64, 64)
+
+
+@pytest.mark.parametrize(
+    ("head", "body", "status"),
+    [
+        ("", b"", b"411"),
+        ("Content-Length: lots\r\n", b"", b"400"),
+        ("Content-Length: -5\r\n", b"", b"400"),
+        ("Content-Length: 100\r\n", b"short", b"400"),
+        ("Content-Length: 4\r\n", b"nope", b"400"),
+    ],
+)
+def test_server_rejects_malformed_uploads(head: str, body: bytes, status: bytes) -> None:
+    config = _stub_config()
+    service = CaricatureService(config, generator=StubCaricatureModel(config.model))
+
+    async def scenario() -> bytes:
+        server = CaricatureServer(config, service=service)
+        await server.start()
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            writer.write(f"POST /v1/caricatures HTTP/1.1\r\n{head}\r\n".encode() + body)
+            writer.write_eof()
+            response = await reader.read()
+            writer.close()
+            return response
+        finally:
+            await server.stop()
+
+    assert asyncio.run(scenario()).startswith(b"HTTP/1.1 " + status)
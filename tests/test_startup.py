@@ -0,0 +1,25 @@
+import pytest
+
+from caricature_generator.benchmarking import measure_startup
+
+CONFIG_ONLY_COMMANDS = {
+    "cli_help": (
+        "from caricature_generator.cli import app\n"
+        "try:\n"
+        "    app(['--help'])\n"
+        "except SystemExit:\n"
+        "    pass"
+    ),
+    "load_config": (
+        "from pathlib import Path\n"
+        "from caricature_generator.config import PipelineConfig\n"
+        "PipelineConfig.load(Path('configs/default.yaml'))"
+    ),
+    "import_pipeline": "import caricature_generator.pipeline",
+}
+
+
+@pytest.mark.parametrize("command", sorted(CONFIG_ONLY_COMMANDS))
+def test_config_only_commands_skip_heavy_imports(command: str) -> None:
+    report = measure_startup(CONFIG_ONLY_COMMANDS[command])
+    assert report.heavy_modules == []
@@ -0,0 +1,92 @@
+import queue
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from caricature_generator import watch
+from caricature_generator.config import PipelineConfig
+from caricature_generator.watch import FolderWatcher, run_watch
+
+
+def _collect(watcher: FolderWatcher, stop: threading.Event) -> queue.Queue:
+    found: queue.Queue = queue.Queue()
+
+    def consume() -> None:
+        for path in watcher.watch(stop):
+            found.put(path)
+
+    threading.Thread(target=consume, daemon=True).start()
+    return found
+
+
+@pytest.mark.parametrize("backend", ["inotify", "poll"])
+def test_watcher_yields_files_once_written(tmp_path: Path, backend: str) -> None:
+    (tmp_path / "existing.png").write_bytes(b"png")
+    watcher = FolderWatcher(tmp_path, settle_seconds=0.3, poll_interval=0.05, backend=backend)
+    stop = threading.Event()
+    try:
+        found = _collect(watcher, stop)
+        assert found.get(timeout=5) == tmp_path / "existing.png"
+
+        (tmp_path / "nested").mkdir()
+        partial = tmp_path / "nested" / "upload.jpg"
+        with partial.open("wb") as fh:
+            fh.write(b"first half")
+            fh.flush()
+            (tmp_path / ".upload.jpg.tmp").write_bytes(b"rsync temp")
+            (tmp_path / "notes.txt").write_bytes(b"ignored")
+            time.sleep(0.15)
+            with pytest.raises(queue.Empty):
+                found.get(timeout=0.05)
+            fh.write(b" second half")
+        assert found.get(timeout=5) == partial
+        with pytest.raises(queue.Empty):
+            found.get(timeout=0.5)
+    finally:
+        stop.set()
+
+
+def test_run_watch_processes_arrivals_and_drains(tmp_path: Path) -> None:
+    inputs = tmp_path / "in"
+    inputs.mkdir()
+    config = PipelineConfig(
+        input_dir=inputs,
+        output_dir=tmp_path / "out",
+        device="cpu",
+        batch_size=4,
+        model={"backend": "stub"},
+        preprocessing={"image_size": 64, "align_faces": False},
+        watch={"backend": "poll", "settle_seconds": 0.1, "poll_interval": 0.05},
+        logging={"log_dir": tmp_path / "logs"},
+    )
+    stop = threading.Event()
+    result: list[int] = []
+    daemon = threading.Thread(target=lambda: result.append(run_watch(config, stop)))
+    daemon.start()
+
+    Image.new("RGB", (96, 96), "orange").save(inputs / "first.png")
+    output = tmp_path / "out" / "first_caricature_0.png"
+    deadline = time.monotonic() + 10
+    # The batch of four is flushed after max_batch_wait_ms instead of waiting for more inputs.
+    while not output.exists() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert output.exists()
+
+    stop.set()
+    daemon.join(timeout=10)
+    assert not daemon.is_alive() and result == [1]
+
+
+def test_watcher_forgets_removed_files(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setattr(watch, "_PRUNE_MINIMUM", 4)
+    watcher = FolderWatcher(tmp_path, backend="poll")
+    for idx in range(4):
+        path = tmp_path / f"{idx}.png"
+        path.write_bytes(b"png")
+        watcher._remember(path, (3, idx))
+        if idx < 3:
+            path.unlink()
+    assert list(watcher._emitted) == [tmp_path / "3.png"]